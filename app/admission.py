@@ -0,0 +1,159 @@
+"""
+Admission control: bounded concurrency and load shedding per route class.
+
+Each request is classified by path:
+
+    heavy     report generation, activity, bulk writes and crawl-style routes
+    default   the other /api routes (mostly cache / snapshot reads)
+    exempt    health, metrics, admin, the push channel and /api/batch
+              (batch sub-requests are admitted one by one)
+
+A class admits at most ``concurrency`` requests at a time, and at most
+``queue`` more wait for a slot. A request is answered with 503 and a
+Retry-After header instead of piling up in two cases: the queue is full, or
+the request waited longer than ``deadline`` seconds. Health checks and cheap
+reads keep answering while a burst of report requests is shed.
+
+Tune with ADMISSION_<CLASS>_CONCURRENCY / _QUEUE / _DEADLINE_SECONDS, and
+disable with ADMISSION_CONTROL=0.
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+
+from utils import metrics
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") not in ("0", "false", "False")
+
+EXEMPT_PREFIXES = ("/metrics", "/admin", "/docs", "/redoc", "/openapi.json", "/ws",
+                   "/api/events", "/api/batch")
+HEAVY_PREFIXES = ("/api/doorloop/balance-sheet", "/api/connecteam/activity", "/api/connecteam/tasks/bulk")
+# Any path segment containing these is treated as heavy (PDF / report builders)
+HEAVY_MARKERS = ("report",)
+
+_DEFAULTS = {
+    "default": (32, 64, 2.0),
+    "heavy": (4, 8, 5.0),
+}
+
+
+def _setting(route_class: str, name: str, default):
+    value = os.getenv(f"ADMISSION_{route_class.upper()}_{name}")
+    return type(default)(value) if value else default
+
+
+def classify(path: str):
+    """Route class for `path`, or None when the request bypasses admission control."""
+    if path == "/" or path.startswith(EXEMPT_PREFIXES) or not path.startswith("/api/"):
+        return None
+    if path.startswith(HEAVY_PREFIXES) or any(marker in path for marker in HEAVY_MARKERS):
+        return "heavy"
+    return "default"
+
+
+class Shed(Exception):
+    def __init__(self, route_class: str, reason: str, retry_after: int):
+        super().__init__(f"{route_class}: {reason}")
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RouteClassLimiter:
+    """Semaphore with a bounded number of waiters and a queueing deadline."""
+
+    def __init__(self, name: str, concurrency: int, queue: int, deadline: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.deadline = deadline
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.deadline))
+
+    async def acquire(self):
+        if self._semaphore.locked() and self.waiting >= self.queue:
+            raise Shed(self.name, "queue_full", self.retry_after)
+        started = time.perf_counter()
+        self.waiting += 1
+        metrics.ADMISSION_QUEUED.labels(route_class=self.name).inc()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise Shed(self.name, "deadline", self.retry_after) from None
+        finally:
+            self.waiting -= 1
+            metrics.ADMISSION_QUEUED.labels(route_class=self.name).dec()
+            metrics.ADMISSION_WAIT_SECONDS.labels(route_class=self.name).observe(time.perf_counter() - started)
+        self.active += 1
+        metrics.ADMISSION_IN_FLIGHT.labels(route_class=self.name).inc()
+
+    def release(self):
+        self.active -= 1
+        metrics.ADMISSION_IN_FLIGHT.labels(route_class=self.name).dec()
+        self._semaphore.release()
+
+
+def build_limiters() -> dict:
+    return {
+        name: RouteClassLimiter(
+            name,
+            concurrency=_setting(name, "CONCURRENCY", concurrency),
+            queue=_setting(name, "QUEUE", queue),
+            deadline=_setting(name, "DEADLINE_SECONDS", deadline),
+        )
+        for name, (concurrency, queue, deadline) in _DEFAULTS.items()
+    }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying RouteClassLimiter per route class."""
+
+    def __init__(self, app, limiters: dict = None, enabled: bool = None):
+        self.app = app
+        self.limiters = limiters or build_limiters()
+        self.enabled = ADMISSION_CONTROL if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+        route_class = classify(scope.get("path", "")) if scope["type"] == "http" and self.enabled else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class]
+        try:
+            await limiter.acquire()
+        except Shed as shed:
+            metrics.ADMISSION_SHED.labels(route_class=shed.route_class, reason=shed.reason).inc()
+            logging.warning("Shedding %s %s (%s)", scope.get("method"), scope.get("path"), shed)
+            await _send_busy(send, shed)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+async def _send_busy(send, shed: Shed):
+    body = json.dumps({
+        "detail": "Server is busy, please retry shortly.",
+        "route_class": shed.route_class,
+        "reason": shed.reason,
+    }).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(shed.retry_after).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
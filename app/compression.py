@@ -0,0 +1,158 @@
+"""
+Negotiated gzip / brotli compression for JSON responses.
+
+Bodies below ``minimum_size`` and non-text content (PDF reports, event
+streams) pass through untouched. Responses that carry an ETag are compressed
+once per (ETag, encoding) and kept in a small LRU, so a dashboard refresh of
+an unchanged tenants or leases payload is served pre-compressed. The ETag of
+a compressed response is made encoding-specific (``http_cache.encoded_etag``),
+and a 304 echoes the variant the client revalidated with.
+"""
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from middle_layer import http_cache
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+UNBUFFERED_TYPES = ("text/event-stream",)
+
+
+def _accepted_encodings(header: str) -> dict:
+    """Map encoding -> q value from an Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header: str):
+    """Best supported encoding for an Accept-Encoding header, preferring brotli."""
+    accepted = _accepted_encodings(header)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing buffered text/JSON responses."""
+
+    def __init__(self, app, minimum_size: int = None, gzip_level: int = None, brotli_quality: int = None,
+                 cache_size: int = 256):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+        self.gzip_level = gzip_level if gzip_level is not None else int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+        self.brotli_quality = (brotli_quality if brotli_quality is not None
+                               else int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5")))
+        self.cache_size = cache_size
+        # (etag, encoding) -> (uncompressed length, compressed body)
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    def _compressed(self, body: bytes, encoding: str, etag: str = None) -> bytes:
+        if etag:
+            with self._cache_lock:
+                hit = self._cache.get((etag, encoding))
+                if hit and hit[0] == len(body):
+                    self._cache.move_to_end((etag, encoding))
+                    return hit[1]
+        compressed = self.compress(body, encoding)
+        if etag:
+            with self._cache_lock:
+                self._cache[(etag, encoding)] = (len(body), compressed)
+                self._cache.move_to_end((etag, encoding))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return compressed
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = [tag.strip() for tag in request_headers.get("if-none-match", "").split(",")]
+        start_message = None
+        body_parts = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in message.get("headers", [])}
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    "content-encoding" in headers
+                    or message["status"] in (204, 304)
+                    or content_type.startswith(UNBUFFERED_TYPES)
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)
+                )
+                if passthrough:
+                    variant = http_cache.encoded_etag(headers["etag"], encoding) if "etag" in headers else None
+                    if message["status"] == 304 and variant in if_none_match:
+                        # The client revalidated the compressed copy; confirm that validator
+                        message = {**message, "headers": [(k, variant.encode("latin-1") if k.lower() == b"etag" else v)
+                                                          for k, v in message.get("headers", [])]}
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(body_parts)
+            headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() != b"content-length"]
+            if len(body) >= self.minimum_size:
+                etag = next((v.decode("latin-1") for k, v in headers if k.lower() == b"etag"), None)
+                body = self._compressed(body, encoding, etag)
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                if etag:
+                    # A different byte sequence needs its own strong validator
+                    variant = http_cache.encoded_etag(etag, encoding).encode("latin-1")
+                    headers = [(k, variant if k.lower() == b"etag" else v) for k, v in headers]
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            vary = [v for k, v in headers if k.lower() == b"vary"]
+            if not vary:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif b"accept-encoding" not in vary[0].lower():
+                headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in headers]
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
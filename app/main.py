@@ -18,15 +18,24 @@ except Exception:
     pass
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.util import get_remote_address
 from fastapi.middleware.cors import CORSMiddleware
+from app import admission, profiling
+from app.compression import CompressionMiddleware
+from middle_layer import event_bus, snapshot_diff
+from utils import log_pipeline, metrics, tracing
+from routes.batch import router as batch_router
 from routes.connecteam import router as connecteam_router
 from routes.doorloop import router as doorloop_router
 import os
+import asyncio
+import json
 import logging
+import time
 
 # Ensure the repository root is on sys.path so imports like `from routes...`
 # work when running this module directly (python app/main.py).
@@ -34,7 +43,8 @@ import logging
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup code
-    logging.getLogger().setLevel(logging.INFO)
+    # Queue-backed, sampled JSON logging so log I/O stays off the request path (LOG_LEVEL / LOG_FORMAT)
+    log_pipeline.configure_logging()
     
     # Suppress noisy MCP async warnings (non-blocking errors)
     logging.getLogger("mcp").setLevel(logging.ERROR)
@@ -50,6 +60,44 @@ async def lifespan(app: FastAPI):
         logging.warning("Missing MCP server scripts: %s", missing)
     else:
         logging.info("All MCP server scripts present.")
+    if not os.getenv("CONNECTEAM_WEBHOOK_TOKEN"):
+        logging.warning("CONNECTEAM_WEBHOOK_TOKEN is not set; /api/connecteam/webhook is disabled")
+    
+    # Seed a cold Redis from the last-known-good snapshots so the first
+    # requests after a deploy don't have to crawl the vendors again
+    try:
+        from middle_layer import snapshot_store
+        with metrics.time_refresh("warm_cache"):
+            await asyncio.to_thread(snapshot_store.warm_cache)
+    except Exception as e:
+        logging.warning("Failed to warm cache from snapshots: %s", e)
+    
+    # Keep the local DoorLoop mirror (SQLite) in sync; set DOORLOOP_MIRROR_SYNC_MINUTES=0 to disable
+    mirror_interval = int(os.getenv("DOORLOOP_MIRROR_SYNC_MINUTES", "15"))
+    if mirror_interval > 0 and os.getenv("DOORLOOP_API_KEY"):
+        try:
+            from middle_layer import doorloop_mirror
+            doorloop_mirror.background_sync(interval_minutes=mirror_interval)
+        except Exception as e:
+            logging.warning("Failed to start DoorLoop mirror sync: %s", e)
+    
+    # Job directory (id -> title) used to label shifts and tasks; CONNECTEAM_JOBS_REFRESH_MINUTES=0 disables
+    jobs_interval = int(os.getenv("CONNECTEAM_JOBS_REFRESH_MINUTES", "60"))
+    if jobs_interval > 0 and os.getenv("CONNECTTEAM_API_KEY"):
+        try:
+            from middle_layer import job_directory
+            job_directory.background_refresh(interval_minutes=jobs_interval)
+        except Exception as e:
+            logging.warning("Failed to start job directory refresh: %s", e)
+
+    # User directory (names and skill tags); CONNECTEAM_USERS_REFRESH_MINUTES=0 disables
+    users_interval = int(os.getenv("CONNECTEAM_USERS_REFRESH_MINUTES", "30"))
+    if users_interval > 0 and os.getenv("CONNECTTEAM_API_KEY"):
+        try:
+            from middle_layer import user_directory
+            user_directory.background_refresh(interval_minutes=users_interval)
+        except Exception as e:
+            logging.warning("Failed to start user directory refresh: %s", e)
     
     # Start background refresh workers MAY BE WE CAN PUT TIMMER HERE TO RUN THIS AFTER 15 MINS
     # try:
@@ -77,6 +125,7 @@ async def lifespan(app: FastAPI):
     # Shutdown code (optional)
     # Daemon threads will automatically stop when app shuts down
     logging.info("Shutting down...")
+    log_pipeline.stop_logging()
 
 app = FastAPI(
     title="Microservices Backend API", 
@@ -103,15 +152,151 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/brotli for large JSON bodies; tune with COMPRESSION_MIN_SIZE / COMPRESSION_GZIP_LEVEL / COMPRESSION_BROTLI_QUALITY
+app.add_middleware(CompressionMiddleware)
+# X-Profile: $PROFILE_TOKEN flame reports and the SLOW_REQUEST_MS stack log (see app/profiling.py)
+app.add_middleware(profiling.ProfilingMiddleware)
+# Bounded concurrency per route class; sheds with 503 + Retry-After under bursts (see app/admission.py)
+app.add_middleware(admission.AdmissionMiddleware)
 
 # Mount routers
 app.include_router(connecteam_router, prefix="/api/connecteam", tags=["connecteam"])
 app.include_router(doorloop_router, prefix="/api/doorloop", tags=["doorloop"])
+app.include_router(batch_router, prefix="/api", tags=["batch"])
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-route latency histogram, labelled with the route template rather than the raw path."""
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        ).observe(time.perf_counter() - started)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request; continues an incoming W3C traceparent and returns the trace id."""
+    with tracing.span(f"{request.method} {request.url.path}", traceparent=request.headers.get("traceparent"),
+                      **{"http.method": request.method, "http.target": request.url.path}) as span:
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+        route = request.scope.get("route")
+        if route is not None:
+            span.set_attribute("http.route", route.path)
+        if span.traceparent:
+            response.headers["X-Trace-Id"] = span.traceparent.split("-")[1]
+        return response
+
+
+@app.get("/metrics", tags=["meta"], include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+def _require_profile_token(token: str):
+    if not profiling.token_valid(token):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Profile token")
+
+
+@app.get("/admin/profiles", tags=["meta"], include_in_schema=False)
+async def list_profiles(x_profile: str = Header(None)):
+    _require_profile_token(x_profile)
+    return {"reports": profiling.list_reports()}
+
+
+@app.get("/admin/profiles/{name}", tags=["meta"], include_in_schema=False)
+async def get_profile(name: str, x_profile: str = Header(None)):
+    """Stored flame report in folded-stack format (load into speedscope or flamegraph.pl)."""
+    _require_profile_token(x_profile)
+    path = profiling.report_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No profile named {name}")
+    return FileResponse(path, media_type="text/plain")
+
 
 @app.get("/", tags=["meta"])
 async def root():
     return {"ok": True, "service": "Microservices Backend", "version": app.version}
 
+
+# Dashboard push channel: deltas from mirror syncs, snapshot refreshes and webhooks
+# (see middle_layer/dashboard_events.py), over SSE or WebSocket
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _sse_message(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+@app.get("/api/events", tags=["events"])
+async def stream_events(request: Request, last_event_id: str = Header(None)):
+    """Server-Sent Events stream; reconnects resume from Last-Event-ID."""
+    subscription = event_bus.subscribe()
+
+    async def event_stream():
+        last_sent = 0
+        try:
+            if last_event_id and last_event_id.isdigit():
+                for event in event_bus.events_since(int(last_event_id)):
+                    last_sent = event["id"]
+                    yield _sse_message(event)
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                elif event["id"] > last_sent:
+                    yield _sse_message(event)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/api/changes/{dataset}", tags=["events"])
+async def dataset_changes(dataset: str, since: int = 0):
+    """Records added, changed and removed in `dataset` after generation `since`.
+
+    ``reset: true`` means the change log doesn't reach back that far; reload
+    the dataset through its REST route and resume from ``generation``.
+    """
+    return await asyncio.to_thread(snapshot_diff.since, dataset, since)
+
+
+@app.websocket("/ws")
+async def dashboard_socket(websocket: WebSocket):
+    """WebSocket flavour of /api/events: every event is sent as one JSON message."""
+    await websocket.accept()
+    subscription = event_bus.subscribe()
+
+    async def forward():
+        while True:
+            event = await subscription.get()
+            await websocket.send_json(event)
+
+    await websocket.send_json({"type": "connected", "data": {"subscribers": event_bus.subscriber_count()}})
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        event_bus.unsubscribe(subscription)
+
 if __name__ == "__main__":
     try:
         import uvicorn
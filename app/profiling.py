@@ -0,0 +1,279 @@
+"""
+On-demand request profiling and a slow-request stack log.
+
+Profiling a single request (admin only, needs PROFILE_TOKEN to be set):
+
+    curl -H "X-Profile: $PROFILE_TOKEN" .../api/connecteam/activity
+    # or ?profile=$PROFILE_TOKEN
+
+The request runs under a stack sampler and its flame report is stored in
+PROFILE_DIR as a ``.folded`` file (one ``frame;frame;frame count`` line per
+stack, readable by speedscope or flamegraph.pl). The response names the
+report in ``X-Profile-Report``; fetch it from ``/admin/profiles/<name>``.
+
+Slow requests: a watchdog samples stacks while any request has been running
+longer than SLOW_REQUEST_MS. When such a request finishes, its hottest stacks
+are logged and appended to ``PROFILE_DIR/slow_requests.jsonl``. Streaming
+responses (``text/event-stream``) are dropped from the watch once they start:
+they stay open by design.
+
+Both read ``sys._current_frames()`` rather than using cProfile/pyinstrument:
+route work runs in ``asyncio.to_thread`` and threadpool workers, which
+per-thread profilers do not see. Sampling is process-wide, so requests
+running concurrently show up in the same report; keep only stacks that pass
+through repository code to cut out idle server threads.
+"""
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import parse_qs
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(ROOT / ".profiles")))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# 0 disables the slow-request log
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+SLOW_SAMPLE_INTERVAL_MS = float(os.getenv("SLOW_SAMPLE_INTERVAL_MS", "100"))
+MAX_STORED_PROFILES = 50
+SLOW_LOG_TOP_STACKS = 5
+STREAMING_TYPES = (b"text/event-stream",)
+
+_REPO_PREFIX = str(ROOT) + os.sep
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_REPO_PREFIX):
+        filename = filename[len(_REPO_PREFIX):]
+    else:
+        filename = "/".join(Path(filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _fold(frame):
+    """Root-to-leaf folded stack for `frame`, or None if it never enters repository code."""
+    labels, in_repo = [], False
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename.startswith(_REPO_PREFIX) and code.co_name != "<module>":
+            in_repo = True
+        labels.append(_frame_label(code))
+        frame = frame.f_back
+    if not in_repo:
+        return None
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(exclude=()) -> list:
+    """One folded stack per thread currently running repository code."""
+    stacks = []
+    for ident, frame in sys._current_frames().items():
+        if ident in exclude:
+            continue
+        folded = _fold(frame)
+        if folded:
+            stacks.append(folded)
+    return stacks
+
+
+def format_folded(samples: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+class StackSampler:
+    """Background thread folding every thread's stack into a Counter every `interval_ms`."""
+
+    def __init__(self, interval_ms: float = None):
+        self.interval = (interval_ms if interval_ms is not None else PROFILE_INTERVAL_MS) / 1000
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples.update(sample_stacks(exclude=(own,)))
+
+
+class _SlowRequestWatch:
+    """Samples stacks only while some request is past the slow threshold."""
+
+    def __init__(self):
+        self._active = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def begin(self, method: str, path: str):
+        token = object()
+        with self._lock:
+            self._active[token] = {"start": time.perf_counter(), "method": method, "path": path,
+                                   "samples": Counter()}
+            if not self._started:
+                # Daemon thread so it doesn't block app shutdown
+                threading.Thread(target=self._run, name="slow-request-sampler", daemon=True).start()
+                self._started = True
+        return token
+
+    def cancel(self, token):
+        """Stop watching a request without logging it."""
+        with self._lock:
+            self._active.pop(token, None)
+
+    def end(self, token, status: int):
+        with self._lock:
+            entry = self._active.pop(token, None)
+        if entry is None:
+            return None
+        elapsed_ms = (time.perf_counter() - entry["start"]) * 1000
+        if elapsed_ms < SLOW_REQUEST_MS:
+            return None
+        return _log_slow_request(entry, status, elapsed_ms)
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(SLOW_SAMPLE_INTERVAL_MS / 1000)
+            if SLOW_REQUEST_MS <= 0:
+                continue
+            threshold = time.perf_counter() - SLOW_REQUEST_MS / 1000
+            with self._lock:
+                slow = [entry for entry in self._active.values() if entry["start"] <= threshold]
+            if not slow:
+                continue
+            stacks = sample_stacks(exclude=(own,))
+            for entry in slow:
+                entry["samples"].update(stacks)
+
+
+_slow_watch = _SlowRequestWatch()
+
+
+def _log_slow_request(entry: dict, status: int, elapsed_ms: float) -> dict:
+    top = entry["samples"].most_common(SLOW_LOG_TOP_STACKS)
+    record = {
+        "time": time.time(),
+        "method": entry["method"],
+        "path": entry["path"],
+        "status": status,
+        "duration_ms": round(elapsed_ms, 1),
+        "samples": sum(entry["samples"].values()),
+        "top_stacks": [{"stack": stack, "count": count} for stack, count in top],
+    }
+    logging.warning("Slow request %s %s took %.0f ms (status %s); hottest stack: %s",
+                    entry["method"], entry["path"], elapsed_ms, status,
+                    " > ".join(top[0][0].split(";")[-3:]) if top else "no samples")
+    try:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(PROFILE_DIR / "slow_requests.jsonl", "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logging.warning("Failed to write slow request log: %s", e)
+    return record
+
+
+def token_valid(candidate: str) -> bool:
+    return bool(PROFILE_TOKEN and candidate) and secrets.compare_digest(candidate, PROFILE_TOKEN)
+
+
+def _profile_requested(scope) -> bool:
+    if not PROFILE_TOKEN:
+        return False
+    for name, value in scope.get("headers") or []:
+        if name == b"x-profile":
+            return token_valid(value.decode("latin-1"))
+    query = parse_qs((scope.get("query_string") or b"").decode("latin-1"))
+    return token_valid((query.get("profile") or [""])[0])
+
+
+def _report_name(method: str, path: str) -> str:
+    slug = _SAFE_NAME.sub("_", path.strip("/")) or "root"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}-{method.lower()}-{slug[:80]}.folded"
+
+
+def report_path(name: str):
+    """Path of a stored report, or None for unknown / unsafe names."""
+    if _SAFE_NAME.search(name) or not name.endswith(".folded"):
+        return None
+    path = PROFILE_DIR / name
+    return path if path.is_file() else None
+
+
+def list_reports() -> list:
+    if not PROFILE_DIR.exists():
+        return []
+    return sorted((p.name for p in PROFILE_DIR.glob("*.folded")), reverse=True)
+
+
+def _store_report(name: str, samples: Counter):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / name).write_text(format_folded(samples), encoding="utf-8")
+    for old in sorted(PROFILE_DIR.glob("*.folded"))[:-MAX_STORED_PROFILES]:
+        old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware for admin-requested profiles and the slow-request log."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope.get("method", ""), scope.get("path", "")
+        sampler = report = None
+        if _profile_requested(scope):
+            report = _report_name(method, path)
+            sampler = StackSampler().start()
+        watch = _slow_watch.begin(method, path) if SLOW_REQUEST_MS > 0 else None
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status, watch
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                content_type = next((v for k, v in message.get("headers") or [] if k.lower() == b"content-type"), b"")
+                if watch is not None and content_type.startswith(STREAMING_TYPES):
+                    _slow_watch.cancel(watch)
+                    watch = None
+                if report:
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers") or []) + [
+                        (b"x-profile-report", report.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if watch is not None:
+                _slow_watch.end(watch, status)
+            if sampler is not None:
+                samples = sampler.stop()
+                try:
+                    _store_report(report, samples)
+                    logging.info("Profiled %s %s: %d samples -> %s", method, path, sum(samples.values()), report)
+                except OSError as e:
+                    logging.warning("Failed to store profile %s: %s", report, e)
@@ -14,6 +14,12 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Each tool call joins the caller's trace (see tracing.traced_tool)
+from utils import tracing
+from services import http_session
+# Pooled, retrying and instrumented (see services/http_session.py)
+_session = http_session.get_session("connecteam")
+
 # FastMCP instance for Connecteam
 mcp = FastMCP("connectteam_server",instructions= " Provide RESPI tools for Nest Host DB from various external entities",
     host="0.0.0.0",
@@ -44,6 +50,7 @@ async def read_root(request: Request):
     })
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_tenants():
     """Retrieve tenant data from the Conneteam API"""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -58,7 +65,7 @@ def retrieve_tenants():
         "content-type": "application/json",
     }
     try: # If the response is JSON return that, otherwise include a short text body for debugging
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -78,6 +85,7 @@ def retrieve_tenants():
     
 # --- Connecteam task CRUD MCP tools (append-only) ---------------------------------
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def list_tasks(status: str = "all", limit: int = 10, offset: int = 0, taskboard_id: str | None = None):
     """List tasks with simple pagination and status filter."""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -97,7 +105,7 @@ def list_tasks(status: str = "all", limit: int = 10, offset: int = 0, taskboard_
     params = {"status": status, "limit": limit, "offset": offset}
     headers = {"x-api-key": api_key, "accept": "application/json"}
     try:
-        resp = requests.get(endpoint, headers=headers, params=params, timeout=10)
+        resp = _session.get(endpoint, headers=headers, params=params, timeout=10)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
@@ -108,6 +116,7 @@ def list_tasks(status: str = "all", limit: int = 10, offset: int = 0, taskboard_
 
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def get_task(task_id: str):
     """Get a single task by id."""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -118,7 +127,7 @@ def get_task(task_id: str):
     endpoint = f"{base_url.rstrip('/')}/tasks/v1/tasks/{task_id}"
     headers = {"x-api-key": api_key, "accept": "application/json"}
     try:
-        resp = requests.get(endpoint, headers=headers, timeout=10)
+        resp = _session.get(endpoint, headers=headers, timeout=10)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
@@ -129,6 +138,7 @@ def get_task(task_id: str):
 
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def create_task(payload: dict):
     """Create a task. `payload` should be the task JSON body per Connecteam API."""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -139,7 +149,7 @@ def create_task(payload: dict):
     endpoint = f"{base_url.rstrip('/')}/tasks/v1/tasks"
     headers = {"x-api-key": api_key, "accept": "application/json", "content-type": "application/json"}
     try:
-        resp = requests.post(endpoint, headers=headers, json=payload, timeout=10)
+        resp = _session.post(endpoint, headers=headers, json=payload, timeout=10)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
@@ -150,6 +160,7 @@ def create_task(payload: dict):
 
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def update_task(task_id: str, payload: dict):
     """Update a task. Uses PUT (if the API supports PATCH, change method accordingly)."""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -160,7 +171,7 @@ def update_task(task_id: str, payload: dict):
     endpoint = f"{base_url.rstrip('/')}/tasks/v1/tasks/{task_id}"
     headers = {"x-api-key": api_key, "accept": "application/json", "content-type": "application/json"}
     try:
-        resp = requests.put(endpoint, headers=headers, json=payload, timeout=10)
+        resp = _session.put(endpoint, headers=headers, json=payload, timeout=10)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
@@ -171,6 +182,7 @@ def update_task(task_id: str, payload: dict):
 
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def delete_task(task_id: str):
     """Delete a task by id."""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -181,7 +193,7 @@ def delete_task(task_id: str):
     endpoint = f"{base_url.rstrip('/')}/tasks/v1/tasks/{task_id}"
     headers = {"x-api-key": api_key, "accept": "application/json"}
     try:
-        resp = requests.delete(endpoint, headers=headers, timeout=10)
+        resp = _session.delete(endpoint, headers=headers, timeout=10)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
@@ -194,6 +206,7 @@ def delete_task(task_id: str):
 
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def list_taskboards():
     """List all available taskboards to help discover taskboard IDs."""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -204,7 +217,7 @@ def list_taskboards():
     endpoint = f"{base_url.rstrip('/')}/tasks/v1/taskboards"
     headers = {"x-api-key": api_key, "accept": "application/json"}
     try:
-        resp = requests.get(endpoint, headers=headers, timeout=10)
+        resp = _session.get(endpoint, headers=headers, timeout=10)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
@@ -215,6 +228,7 @@ def list_taskboards():
 
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def list_get_jobs():
     """List all available jobs from Connecteam."""
     api_key = os.getenv("CONNECTTEAM_API_KEY")
@@ -225,7 +239,7 @@ def list_get_jobs():
     endpoint = f"{base_url.rstrip('/')}/jobs/v1/jobs?includeDeleted=true&order=asc&limit=10&offset=0"
     headers = {"x-api-key": api_key, "accept": "application/json"}
     try:
-        resp = requests.get(endpoint, headers=headers, timeout=10)
+        resp = _session.get(endpoint, headers=headers, timeout=10)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
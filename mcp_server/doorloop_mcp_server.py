@@ -15,6 +15,12 @@ from utils.Report_gen import DoorLoopReportGenerator
 # can be imported even if reportlab/fpdf are not installed in the environment.
 
 load_dotenv()
+
+# Each tool call joins the caller's trace (see tracing.traced_tool)
+from utils import tracing
+from services import http_session
+# Pooled, retrying and instrumented (see services/http_session.py)
+_session = http_session.get_session("doorloop")
 mcp = FastMCP("doorloop_server",instructions=" Provide RESPI tools for Nest Host DB from various external entities",
     host="0.0.0.0",
     port=8000)
@@ -46,6 +52,7 @@ async def read_root(request: Request):
     })
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_tenants():
     """Retrieve tenant data from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -60,7 +67,7 @@ def retrieve_tenants():
         "content-type": "application/json"
     }
     try: # If the response is JSON return that, otherwise include a short text body for debugging
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
        
         if response.ok:
@@ -86,6 +93,7 @@ def retrieve_tenants():
 
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_a_tenants(id):
     """Retrieve tenant data from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -100,7 +108,7 @@ def retrieve_a_tenants(id):
         "content-type": "application/json"
     }
     try: # If the response is JSON return that, otherwise include a short text body for debugging
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -123,6 +131,7 @@ def retrieve_a_tenants(id):
         return {"error": "Request failed", "exception": str(exc)}
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_leases():
     """Retrieve tenant data from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -137,7 +146,7 @@ def retrieve_leases():
         "content-type": "application/json"
     }
     try: # If the response is JSON return that, otherwise include a short text body for debugging
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -160,6 +169,7 @@ def retrieve_leases():
         return {"error": "Request failed", "exception": str(exc)}
     
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_properties():
     """Retrieve tenant data from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -174,7 +184,7 @@ def retrieve_properties():
         "content-type": "application/json"
     }
     try: # If the response is JSON return that, otherwise include a short text body for debugging
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -193,6 +203,7 @@ def retrieve_properties():
         return {"error": "Request failed", "exception": str(exc)}
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_doorloop_communication():
     """Retrieve tenant data from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -207,7 +218,7 @@ def retrieve_doorloop_communication():
         "content-type": "application/json"
     }
     try: # If the response is JSON return that, otherwise include a short text body for debugging
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -231,6 +242,7 @@ def retrieve_doorloop_communication():
     
     
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_properties_id(id:str):
     """Retrieve tenant data from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -245,7 +257,7 @@ def retrieve_properties_id(id:str):
         "content-type": "application/json"
     }
     try: # If the response is JSON return that, otherwise include a short text body for debugging
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -264,6 +276,7 @@ def retrieve_properties_id(id:str):
         return {"error": "Request failed", "exception": str(exc)}
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_doorloop_tasks():
     """Retrieve tasks from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -278,7 +291,7 @@ def retrieve_doorloop_tasks():
         "content-type": "application/json"
     }
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -301,6 +314,7 @@ def retrieve_doorloop_tasks():
         return {"error": "Request failed", "exception": str(exc)}
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_doorloop_lease_payment():
     """Retrieve lease payments from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -315,7 +329,7 @@ def retrieve_doorloop_lease_payment():
         "content-type": "application/json"
     }
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -338,6 +352,7 @@ def retrieve_doorloop_lease_payment():
         return {"error": "Request failed", "exception": str(exc)}
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def retrieve_doorloop_expenses():
     """Retrieve expenses from the DoorLoop API"""
     api_key = os.getenv("DOORLOOP_API_KEY")
@@ -352,7 +367,7 @@ def retrieve_doorloop_expenses():
         "content-type": "application/json"
     }
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         content_type = response.headers.get("Content-Type", "")
         if response.ok:
             if "application/json" in content_type:
@@ -375,6 +390,7 @@ def retrieve_doorloop_expenses():
         return {"error": "Request failed", "exception": str(exc)}
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def generate_report():
     """Fetch DoorLoop balancesheet (safe, debuggable)."""
     import os, requests
@@ -388,7 +404,7 @@ def generate_report():
     headers = {"Authorization": f"Bearer {api_key}", "accept": "application/json"}
 
     try:
-        resp = requests.get(endpoint, headers=headers, timeout=15)
+        resp = _session.get(endpoint, headers=headers, timeout=15)
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
@@ -448,6 +464,7 @@ def generate_report():
         return {"error": "Normalization failed", "exception": str(exc), "raw": j}
 
 @mcp.tool()
+@tracing.traced_tool(mcp)
 def generate_pdf(report, name: str, title: str):
     """Generate PDF report from DataFrame data."""
     if hasattr(report, 'values') and hasattr(report, 'columns'):
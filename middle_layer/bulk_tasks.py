@@ -0,0 +1,158 @@
+"""
+Bulk Connecteam task create / update with bounded concurrency and resumable batches.
+
+Each item is one vendor write run in a worker thread; at most ``concurrency``
+run at once, and every call is paced by the vendor token bucket in
+services/http_session.py, so a batch of hundreds finishes in seconds without
+tripping the vendor's rate limit.
+
+Results are recorded per item under a ``batch_id``, keyed by a fingerprint of
+the item (task id + payload), as soon as each vendor call returns - so a
+batch cut short by a crash or a dropped request still remembers what the
+vendor accepted. Re-submitting a batch with the same id skips the items that
+already succeeded and retries only the failed ones, so a partially failed
+batch is resumed rather than creating duplicates. Two runs of the same batch
+in one process take turns.
+"""
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from middle_layer import connecteam_redit_layer, dashboard_events, snapshot_store
+from utils import tracing
+
+BULK_CONCURRENCY = int(os.getenv("CONNECTEAM_BULK_CONCURRENCY", "8"))
+MAX_BULK_ITEMS = 1000
+# Batch results are kept this long for resuming
+BATCH_TTL_SECONDS = 86400
+# Batches remembered in process when Redis is unavailable
+MAX_LOCAL_BATCHES = 50
+
+_local_lock = threading.Lock()
+_local_batches = OrderedDict()
+# batch_id -> [asyncio.Lock, runs holding or waiting for it]
+_batch_locks = {}
+
+
+def item_key(task_id, payload) -> str:
+    """Stable fingerprint of one bulk item."""
+    body = json.dumps({"task_id": task_id, "payload": payload}, separators=(",", ":"), sort_keys=True, default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def _redis_key(batch_id: str) -> str:
+    return f"bulk_tasks:{batch_id}"
+
+
+def load_batch(batch_id: str) -> dict:
+    """item key -> recorded result for `batch_id` (empty when unknown)."""
+    cached = connecteam_redit_layer.retriev_connectam_fields(_redis_key(batch_id))
+    if cached:
+        return cached
+    with _local_lock:
+        return dict(_local_batches.get(batch_id) or {})
+
+
+def record_result(batch_id: str, key: str, result: dict):
+    """Persist one item's result in the batch record."""
+    with _local_lock:
+        _local_batches.setdefault(batch_id, {})[key] = result
+        _local_batches.move_to_end(batch_id)
+        while len(_local_batches) > MAX_LOCAL_BATCHES:
+            _local_batches.popitem(last=False)
+    connecteam_redit_layer.set_connectam_field(_redis_key(batch_id), key, result, ttl=BATCH_TTL_SECONDS)
+
+
+@contextlib.asynccontextmanager
+async def _exclusive(batch_id: str):
+    with _local_lock:
+        entry = _batch_locks.setdefault(batch_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        with _local_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                _batch_locks.pop(batch_id, None)
+
+
+def _task_id_from(resp):
+    data = resp.get("data", resp) if isinstance(resp, dict) else None
+    if isinstance(data, dict) and isinstance(data.get("task"), dict):
+        data = data["task"]
+    return data.get("id") if isinstance(data, dict) else None
+
+
+def _run_item(task_id, payload, create, update) -> dict:
+    action = "updated" if task_id else "created"
+    try:
+        resp = update(task_id, payload) if task_id else create(payload)
+    except Exception as exc:
+        logging.exception("Bulk task %s failed", action)
+        return {"status": "failed", "task_id": task_id, "error": str(exc)}
+    if not isinstance(resp, dict) or snapshot_store.is_error_payload(resp):
+        error = (resp.get("exception") or resp.get("error")) if isinstance(resp, dict) else "Invalid response"
+        return {"status": "failed", "task_id": task_id, "error": error}
+    return {"status": action, "task_id": _task_id_from(resp) or task_id}
+
+
+def _run_and_record(batch_id, key, task_id, payload, create, update) -> dict:
+    # Recorded in the worker thread, so the result is kept even if the request is cancelled meanwhile
+    result = _run_item(task_id, payload, create, update)
+    record_result(batch_id, key, result)
+    return result
+
+
+@tracing.traced()
+async def run_bulk(items: list, create, update, batch_id: str = None, concurrency: int = None) -> dict:
+    """Run `items` (dicts with ``payload`` and optional ``task_id``) against the vendor.
+
+    `create(payload)` and `update(task_id, payload)` are the blocking client
+    calls. Returns ``{"batch_id", "results", "succeeded", "failed", "skipped"}``
+    with one result per item, in item order.
+    """
+    batch_id = batch_id or uuid.uuid4().hex
+    semaphore = asyncio.Semaphore(max(1, concurrency or BULK_CONCURRENCY))
+    written = []
+
+    async def run(index, item, recorded):
+        task_id, payload = item.get("task_id"), item.get("payload") or {}
+        key = item_key(task_id, payload)
+        previous = recorded.get(key)
+        if previous and previous.get("status") != "failed":
+            return {**previous, "index": index, "skipped": True}
+        async with semaphore:
+            result = await asyncio.to_thread(_run_and_record, batch_id, key, task_id, payload, create, update)
+        if result["status"] != "failed":
+            written.append(index)
+        return {**result, "index": index}
+
+    async with _exclusive(batch_id):
+        try:
+            recorded = await asyncio.to_thread(load_batch, batch_id)
+            results = await asyncio.gather(*(run(index, item, recorded) for index, item in enumerate(items)))
+        finally:
+            if written:
+                # One re-crawl after the batch instead of rewriting the task snapshots per item
+                await asyncio.to_thread(snapshot_store.invalidate, "tasks")
+                await asyncio.to_thread(connecteam_redit_layer.drop_connectam_user_info, "tasks:all", "times:all")
+                dashboard_events.publish_dataset_invalidated("tasks")
+
+    failed = sum(1 for result in results if result["status"] == "failed")
+    skipped = sum(1 for result in results if result.get("skipped"))
+    logging.info("Bulk task batch %s: %d written, %d failed, %d skipped", batch_id, len(written), failed, skipped)
+    return {
+        "batch_id": batch_id,
+        "results": results,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "skipped": skipped,
+    }
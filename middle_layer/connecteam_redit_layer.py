@@ -1,5 +1,7 @@
 from redis import Redis
+import json
 import os, logging, sys, threading, time
+from utils import metrics, tracing
 
 # Attempt to initialize Redis client using REDIS_URL from environment variables.
 # If REDIS_URL is not set, the application will continue running without Redis.
@@ -22,6 +24,7 @@ except ModuleNotFoundError:
     )
 
 
+@tracing.traced()
 def _redis_helper(prefix: str):
     """
     Retrieve all cached JSON values whose keys start with the given prefix.
@@ -53,6 +56,7 @@ def _redis_helper(prefix: str):
         return []
 
 
+@tracing.traced()
 def connectam_user_info(data: dict, ttl: int = 60):
     """
     Cache Connecteam user data in Redis using RedisJSON with a TTL.
@@ -84,6 +88,7 @@ def connectam_user_info(data: dict, ttl: int = 60):
         return False
 
 
+@tracing.traced()
 def retriev_connectam_user_info(user_info_key: str):
     """
     Retrieve cached Connecteam user information from Redis.
@@ -99,20 +104,79 @@ def retriev_connectam_user_info(user_info_key: str):
 
     try:
         if redis:
-            key = f"property:{user_info_key}"
-            cached = redis.json().get(key)
+            cached = redis.json().get(user_info_key)
 
             if cached:
                 logging.debug("Cache hit for user %s", user_info_key)
+                metrics.record_cache(user_info_key, "hit")
                 return cached
 
             logging.debug("Cache miss for user %s", user_info_key)
+            metrics.record_cache(user_info_key, "miss")
             return None
     except Exception:
         logging.exception("Failed to retrieve user data from Redis")
         return None
 
 
+@tracing.traced()
+def drop_connectam_user_info(*keys: str) -> int:
+    """
+    Delete cached Connecteam entries (e.g. derived task rows after a write).
+
+    Returns:
+        How many keys were removed (0 when Redis is disabled).
+    """
+    if not keys or not isinstance(redis, Redis):
+        return 0
+
+    try:
+        return redis.delete(*keys)
+    except Exception:
+        logging.exception("Failed to delete cached Connecteam keys %s", keys)
+        return 0
+
+
+@tracing.traced()
+def set_connectam_field(key: str, field: str, value, ttl: int = 60) -> bool:
+    """
+    Store `value` as JSON in one field of the Redis hash `key`.
+
+    Lets records that grow item by item (e.g. bulk task results) be written
+    one field at a time instead of rewriting the whole record.
+    """
+    if not isinstance(redis, Redis):
+        return False
+
+    try:
+        pipeline = redis.pipeline()
+        pipeline.hset(key, field, json.dumps(value))
+        pipeline.expire(key, ttl)
+        pipeline.execute()
+        return True
+    except Exception:
+        logging.exception("Failed to store field %s of %s in Redis", field, key)
+        return False
+
+
+@tracing.traced()
+def retriev_connectam_fields(key: str):
+    """
+    Every field of the Redis hash `key`, JSON-decoded.
+
+    Returns:
+        A dict (empty when the key doesn't exist), or None when Redis is disabled or fails.
+    """
+    if not isinstance(redis, Redis):
+        return None
+
+    try:
+        return {field: json.loads(value) for field, value in redis.hgetall(key).items()}
+    except Exception:
+        logging.exception("Failed to retrieve fields of %s from Redis", key)
+        return None
+
+
 def background_refresh_tasks(data_fetch_fn, interval_minutes: int = 60):
     """
     Start a background thread that periodically refreshes cached tasks data.
@@ -131,7 +195,8 @@ def background_refresh_tasks(data_fetch_fn, interval_minutes: int = 60):
                 time.sleep(interval_minutes * 60)
 
                 logging.info("Background: Refreshing tasks cache...")
-                fresh_data = data_fetch_fn()
+                with metrics.time_refresh("redis_tasks"):
+                    fresh_data = data_fetch_fn()
 
                 if fresh_data:
                     connectam_user_info(fresh_data, ttl=3600)
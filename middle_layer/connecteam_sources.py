@@ -0,0 +1,148 @@
+"""
+Every Connecteam taskboard and time clock, fetched as one merged source.
+
+The account's taskboards and time clocks are discovered once (cached like the
+job directory, see ``directory_cache``) instead of being pinned to
+CONNECTEAM_TASKBOARD_ID and a hard-coded clock. Task lists and time
+activities are then fetched from all of them in one parallel round and
+merged into the payload shapes the single-board calls return, with every
+task tagged ``taskboardId`` and every shift tagged ``timeClockId``.
+
+A merged payload is all-or-nothing: when any board or clock fails, the
+first error payload is returned so a partial list is never cached as the
+whole truth.
+"""
+import contextvars
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from middle_layer.directory_cache import DirectoryCache
+from utils import tracing
+
+PROJECT_ROOT = Path(__file__).absolute().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services import connecteam_api_client
+
+SOURCE_FETCH_CONCURRENCY = int(os.getenv("CONNECTEAM_SOURCE_CONCURRENCY", "8"))
+# Boards and clocks rarely change; rediscover them this often
+SOURCES_MAX_AGE_SECONDS = 3600
+
+
+def _records(payload, *keys):
+    if isinstance(payload, dict):
+        payload = payload.get("data", payload)
+    if isinstance(payload, dict):
+        payload = next((payload[key] for key in keys if isinstance(payload.get(key), list)), None)
+    if not isinstance(payload, list):
+        return []
+    return [item for item in payload if isinstance(item, dict)]
+
+
+class SourceList:
+    """Ids of the active taskboards or time clocks in a list payload."""
+
+    def __init__(self, payload=None, list_keys=(), id_key="id"):
+        self.payload = payload
+        self.ids = []
+        for item in _records(payload, *list_keys):
+            source_id = item.get(id_key) or item.get("id")
+            if source_id is not None and not item.get("isArchived"):
+                self.ids.append(str(source_id))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _taskboards(payload=None):
+    return SourceList(payload, list_keys=("taskboards", "taskBoards"), id_key="taskboardId")
+
+
+def _time_clocks(payload=None):
+    return SourceList(payload, list_keys=("timeClocks", "timeclocks"), id_key="timeClockId")
+
+
+_boards = DirectoryCache("taskboards", _taskboards, lambda: connecteam_api_client.list_taskboards(),
+                         max_age=SOURCES_MAX_AGE_SECONDS)
+_clocks = DirectoryCache("time_clocks", _time_clocks, lambda: connecteam_api_client.list_time_clocks(),
+                         max_age=SOURCES_MAX_AGE_SECONDS)
+
+
+def taskboard_ids() -> list:
+    """Discovered taskboards, or CONNECTEAM_TASKBOARD_ID when discovery has nothing."""
+    ids = _boards.get().ids
+    if not ids and os.getenv("CONNECTEAM_TASKBOARD_ID"):
+        ids = [os.getenv("CONNECTEAM_TASKBOARD_ID")]
+    return ids
+
+
+def time_clock_ids() -> list:
+    """Discovered time clocks, or the configured default clock when discovery has nothing."""
+    return _clocks.get().ids or [connecteam_api_client._get_time_clock_id()]
+
+
+def _fan_out(fn, source_ids: list) -> list:
+    """[(source_id, fn(source_id))] run concurrently, each in the caller's context."""
+    if len(source_ids) <= 1:
+        return [(source_id, fn(source_id)) for source_id in source_ids]
+    with ThreadPoolExecutor(max_workers=min(SOURCE_FETCH_CONCURRENCY, len(source_ids))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, source_id) for source_id in source_ids]
+        return [(source_id, future.result()) for source_id, future in zip(source_ids, futures)]
+
+
+def _first_error(results):
+    return next((resp for _, resp in results if not isinstance(resp, dict) or "error" in resp), None)
+
+
+@tracing.traced()
+def list_all_tasks(status: str = "all") -> dict:
+    """Every task of every taskboard as one {"data": {"tasks": [...]}} payload."""
+    board_ids = taskboard_ids()
+    if not board_ids:
+        return {"error": "No Connecteam taskboards found", "exception": "taskboard discovery returned none"}
+    results = _fan_out(lambda board_id: connecteam_api_client.list_all_tasks(status=status, taskboard_id=board_id),
+                       board_ids)
+    error = _first_error(results)
+    if error is not None:
+        return error
+    tasks = []
+    for board_id, resp in results:
+        for task in (resp.get("data") or {}).get("tasks") or []:
+            if isinstance(task, dict):
+                tasks.append({**task, "taskboardId": task.get("taskboardId") or board_id})
+    logging.info("Fetched %d tasks (%s) from %d taskboard(s)", len(tasks), status, len(board_ids))
+    return {"data": {"tasks": tasks}}
+
+
+@tracing.traced()
+def get_time_activity(startDate: str, endDate: str) -> dict:
+    """Time activities of every time clock as one {"data": {"timeActivitiesByUsers": [...]}} payload."""
+    clock_ids = time_clock_ids()
+    results = _fan_out(
+        lambda clock_id: connecteam_api_client.get_time_activity(startDate=startDate, endDate=endDate,
+                                                                 time_clock_id=clock_id),
+        clock_ids,
+    )
+    error = _first_error(results)
+    if error is not None:
+        return error
+    entries = []
+    for clock_id, resp in results:
+        data = resp.get("data") if isinstance(resp.get("data"), dict) else resp
+        for entry in data.get("timeActivitiesByUsers") or []:
+            if not isinstance(entry, dict):
+                continue
+            shifts = [{**shift, "timeClockId": clock_id} for shift in entry.get("shifts") or [] if isinstance(shift, dict)]
+            entries.append({**entry, "shifts": shifts})
+    return {"data": {"timeActivitiesByUsers": entries}}
+
+
+def reset(boards=None, clocks=None):
+    """Replace (or drop) the discovered sources; used by tests."""
+    _boards.reset(_taskboards(boards) if boards is not None else None)
+    _clocks.reset(_time_clocks(clocks) if clocks is not None else None)
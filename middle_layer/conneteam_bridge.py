@@ -4,7 +4,8 @@ import sys
 from pathlib import Path
 from redis import Redis
 from typing import Any
-from middle_layer import connecteam_redit_layer
+from middle_layer import connecteam_redit_layer, pagination, task_index, user_directory
+from utils import tracing
 
 # Ensure the repository root is on sys.path so top-level packages import reliably
 PROJECT_ROOT = Path(__file__).absolute().parent.parent
@@ -26,7 +27,7 @@ def retrieve_data(*args):
        return args
    except Exception as e:
        
-       logging.exception(f" An internal error has occur please check the server,{e}")
+       logging.exception(" An internal error has occur please check the server,%s", e)
        return None
 
 def _helper_normalize(raw_value):
@@ -37,11 +38,18 @@ def _helper_normalize(raw_value):
         return raw_value
     return [raw_value]
 
-def get_users(user_id:int, get_user):
+@tracing.traced()
+def get_users(user_id:int, get_user, get_people=None):
+    # The synced user directory answers without a vendor call for known users
+    if get_people:
+        profile = get_people().profile(user_id)
+        if profile is not None:
+            return [profile]
+
     # Check cache first
     cached_users = connecteam_redit_layer.retriev_connectam_user_info(f"users:{user_id}")
     if cached_users:
-        logging.info(f"Returning cached users for user_id {user_id}")
+        logging.info("Returning cached users for user_id %s", user_id)
         return cached_users
     
     resp = get_user(user_id=user_id)
@@ -54,19 +62,7 @@ def get_users(user_id:int, get_user):
     for user in users:
         fname = user.get("firstName")
         lname = user.get("lastName")
-        items = ["Maintenance","Housekeeping","Inspections"]
-        values = []
-        for field in user.get("customFields",[]):
-            raw_value = field.get("value")
-            normalize = _helper_normalize(raw_value=raw_value)
-       
-            for item in normalize:
-                if isinstance(item,dict):
-                    user_item = item.get("value")
-                    if user_item in items:
-                        values.append(user_item)
-                    
-        result.append({"firstname":fname,"lastname":lname, "values":values})
+        result.append({"firstname":fname,"lastname":lname, "values":user_directory.user_tags(user)})
     
     # Cache the result
     if result:
@@ -76,6 +72,7 @@ def get_users(user_id:int, get_user):
     return result
 
 
+@tracing.traced()
 def get_times(raw_dat, get_user=None, status=None, user_id=None, title=None, duedate=None):
     if not raw_dat or not isinstance(raw_dat, dict):
         logging.error("the data object is empty or not a dict server error possible!")
@@ -94,39 +91,39 @@ def get_times(raw_dat, get_user=None, status=None, user_id=None, title=None, due
     data = raw_dat.get("data")
     if not data:
         logging.error("No 'data' key found in raw_dat")
-        logging.error(f"raw_dat keys: {list(raw_dat.keys()) if isinstance(raw_dat, dict) else 'not a dict'}")
+        logging.error("raw_dat keys: %s", list(raw_dat.keys()) if isinstance(raw_dat, dict) else 'not a dict')
         return None
     
-    logging.debug(f"data extracted, type: {type(data)}")
+    logging.debug("data extracted, type: %s", type(data))
     
     task_data = data.get("tasks") if isinstance(data, dict) else None
     
     if task_data is None:
         logging.error("No 'tasks' key found in data or data is not a dict")
-        logging.error(f"data: {data}")
+        logging.error("data: %s", data)
         return None
     
-    logging.info(f"Task data type: {type(task_data)}, length: {len(task_data) if isinstance(task_data, (list, dict)) else 'N/A'}")
+    logging.info("Task data type: %s, length: %s", type(task_data), len(task_data) if isinstance(task_data, (list, dict)) else 'N/A')
     
     if not isinstance(task_data, list):
-        logging.error(f"task_data is not a list, got type: {type(task_data)}")
+        logging.error("task_data is not a list, got type: %s", type(task_data))
         return None
     
-    logging.info(f"Processing {len(task_data)} tasks in get_times")
+    logging.info("Processing %s tasks in get_times", len(task_data))
     
     if len(task_data) == 0:
         logging.warning("task_data is an empty list")
         return []
     
     user_info = task_info(task_data, get_user=get_user)
-    logging.info(f"task_info returned {len(user_info) if user_info else 0} items")
-    logging.debug(f"task_info returned: {user_info}")
+    logging.info("task_info returned %s items", len(user_info) if user_info else 0)
+    logging.debug("task_info returned: %s", user_info)
     
     # Cache the result
     if user_info:
         cache_data = {cache_key: user_info}
         connecteam_redit_layer.connectam_user_info(cache_data, ttl=600)
-        logging.info(f"Cached {len(user_info)} tasks")
+        logging.info("Cached %s tasks", len(user_info))
     
     # Build filters dict from parameters
     filters = _build_filters(status, user_id, title, duedate)
@@ -134,7 +131,7 @@ def get_times(raw_dat, get_user=None, status=None, user_id=None, title=None, due
     # Apply filters if provided
     if filters:
         user_info = _apply_filters(user_info, filters)
-        logging.info(f"After filtering: {len(user_info) if user_info else 0} items")
+        logging.info("After filtering: %s items", len(user_info) if user_info else 0)
     
     # Project final output to omit user_id
     projected = [
@@ -147,7 +144,7 @@ def get_times(raw_dat, get_user=None, status=None, user_id=None, title=None, due
         for item in (user_info or [])
     ]
     
-    logging.info(f"get_times returning {len(projected)} items")
+    logging.info("get_times returning %s items", len(projected))
     return projected
 
 
@@ -160,42 +157,18 @@ def _apply_filters(data, filters):
     - user_id: filter by user_id (list of user IDs)
     - title: filter by title (str, partial match)
     - duedate: filter by due date (str, exact match - ISO format YYYY-MM-DD)
+
+    Matching runs on a task_index.TaskIndex; callers serving the same list
+    repeatedly should keep that index instead (see get_task_page).
     """
     if not data or not isinstance(data, list):
         return data
     
-    filtered_data = data
-    
     if not filters:
-        return filtered_data
-    
-    # Filter by status
-    if "status" in filters and filters["status"]:
-        status_filter = filters["status"]
-        status_list = status_filter if isinstance(status_filter, list) else [status_filter]
-        filtered_data = [item for item in filtered_data if item.get("status") in status_list]
-        logging.info(f"After status filter: {len(filtered_data)} items")
-    
-    # Filter by user_id (list)
-    if "user_id" in filters and filters["user_id"]:
-        user_id_filter = filters["user_id"]
-        # Ensure it's a list
-        user_id_list = user_id_filter if isinstance(user_id_filter, list) else [user_id_filter]
-        filtered_data = [item for item in filtered_data if item.get("user_id") in user_id_list]
-        logging.info(f"After user_id filter: {len(filtered_data)} items")
-    
-    # Filter by title (partial match)
-    if "title" in filters and filters["title"]:
-        title_filter = filters["title"].lower() if isinstance(filters["title"], str) else ""
-        filtered_data = [item for item in filtered_data if title_filter in (item.get("title", "").lower())]
-        logging.info(f"After title filter: {len(filtered_data)} items")
-    
-    # Filter by duedate (exact match)
-    if "duedate" in filters and filters["duedate"]:
-        duedate_filter = filters["duedate"]
-        filtered_data = [item for item in filtered_data if item.get("date") == duedate_filter]
-        logging.info(f"After duedate filter: {len(filtered_data)} items")
+        return data
     
+    filtered_data = task_index.TaskIndex(data).select(filters)
+    logging.info("After filters: %s items", len(filtered_data))
     return filtered_data
 
 
@@ -221,81 +194,140 @@ def _build_filters(status=None, user_id=None, title=None, duedate=None):
     return filters if filters else None
 
 
+def _user_name(user_id, get_user):
+    """Display name for a Connecteam user id via `get_user`, or None."""
+    if not get_user or not user_id:
+        return None
+    try:
+        user_info = get_user(user_id=user_id)
+        if isinstance(user_info, dict):
+            users = user_info.get("data", {}).get("users", [])
+            if users:
+                first_user = users[0]
+                fname = first_user.get("firstName", "")
+                lname = first_user.get("lastName", "")
+                return f"{fname} {lname}".strip()
+    except Exception as e:
+        logging.error("Error fetching user info for user_id %s: %s", user_id, e)
+    return None
+
+
+TASK_FIELDS = ["user_name", "status", "title", "date", "job_title"]
+
+
+@tracing.traced()
+def get_task_page(raw_dat, get_user=None, status=None, user_id=None, title=None, duedate=None,
+                  cursor=None, limit=pagination.DEFAULT_PAGE_SIZE, offset=0, fields=None, get_jobs=None,
+                  get_people=None, index_key=None):
+    """One page of /tasks rows, filtered before paginating and enriched after.
+
+    Filters run on the raw task fields, so user names are only looked up for
+    the rows on the returned page. `get_people` returns a
+    user_directory.UserDirectory; `get_user` is only called for ids it does not
+    know. `get_jobs` returns a job_directory.JobDirectory and is only called
+    when a row on the page has a job. `fields` projects each
+    row (default: the public task columns, without user_id). `index_key`
+    identifies the snapshot `raw_dat` came from, so its task_index.TaskIndex
+    is built once and reused by later calls. Returns the pagination.paginate
+    dict.
+    """
+    task_data = (raw_dat or {}).get("data", {}).get("tasks") if isinstance(raw_dat, dict) else None
+    if not isinstance(task_data, list):
+        logging.error("No 'data.tasks' list found in task payload")
+        return None
+
+    index = task_index.get_task_index(lambda: task_info(task_data, get_user=None), key=index_key)
+    rows = index.select(_build_filters(status, user_id, title, duedate))
+
+    page = pagination.paginate(rows, cursor=cursor, limit=limit, offset=offset)
+    # Indexed rows are shared with later requests; enrich copies
+    page["data"] = [dict(row) for row in page["data"]]
+    people = get_people() if get_people and page["data"] else None
+    for row in page["data"]:
+        user_id = row.get("user_id")
+        if people is not None and user_id in people:
+            row["user_name"] = people.name(user_id)
+        else:
+            row["user_name"] = _user_name(user_id, get_user)
+    if get_jobs and any(row.get("job_id") for row in page["data"]):
+        get_jobs().annotate(page["data"])
+    page["data"] = [pagination.project(row, fields or TASK_FIELDS) for row in page["data"]]
+    return page
+
+
+def task_row(user, get_user=None):
+    """One task_info row for a raw Connecteam task (no caching side effects)."""
+    raw_user_ids = user.get("userIds") if isinstance(user, dict) else None
+    if isinstance(raw_user_ids, list) and raw_user_ids:
+        user_id = raw_user_ids[0]
+    else:
+        user_id = raw_user_ids
+    status = user.get("status") if isinstance(user, dict) else None
+    title = user.get("title") if isinstance(user, dict) else None
+    due_date = user.get("dueDate") if isinstance(user, dict) else None
+    
+    logging.debug("Extracted - user_id: %s, status: %s, title: %s, due_date: %s", user_id, status, title, due_date)
+    
+    # Get user name from get_user function if provided
+    user_name = _user_name(user_id, get_user)
+    
+    if due_date is not None:
+        try:
+            meaningful_date = datetime.datetime.fromtimestamp(due_date).date().isoformat()
+        except Exception as e:
+            logging.error("Error converting due_date %s: %s", due_date, e)
+            meaningful_date = None
+    else:
+        meaningful_date = None
+  
+    user_data = {
+        "user_id": user_id,
+        "user_name": user_name,
+        "status": status,
+        "title": title, 
+        "date": meaningful_date
+    }
+    if isinstance(user, dict) and user.get("id") is not None:
+        user_data["task_id"] = user["id"]
+    if isinstance(user, dict) and user.get("jobId"):
+        user_data["job_id"] = user["jobId"]
+    if isinstance(user, dict) and user.get("taskboardId"):
+        user_data["taskboard_id"] = user["taskboardId"]
+    return user_data
+
+
+@tracing.traced()
 def task_info(raw_data, get_user=None):
-    logging.info(f"task_info called with raw_data type: {type(raw_data)}")
+    logging.info("task_info called with raw_data type: %s", type(raw_data))
     
     if not isinstance(raw_data, list):
-        logging.error(f"raw_data is not a list, got type: {type(raw_data)}")
+        logging.error("raw_data is not a list, got type: %s", type(raw_data))
         return []
     
     userdata = raw_data
     retur_data = []
     
-    logging.info(f"task_info processing {len(userdata)} items")
+    logging.info("task_info processing %s items", len(userdata))
     
     for idx, user in enumerate(userdata):
         try:
-            logging.debug(f"Processing item {idx}: {user}")
-            
-            raw_user_ids = user.get("userIds") if isinstance(user, dict) else None
-            if isinstance(raw_user_ids, list) and raw_user_ids:
-                user_id = raw_user_ids[0]
-            else:
-                user_id = raw_user_ids
-            status = user.get("status") if isinstance(user, dict) else None
-            title = user.get("title") if isinstance(user, dict) else None
-            due_date = user.get("dueDate") if isinstance(user, dict) else None
-            
-            logging.debug(f"Extracted - user_id: {user_id}, status: {status}, title: {title}, due_date: {due_date}")
-            
-            # Get user name from get_user function if provided
-            user_name = None
-            if get_user and user_id:
-                try:
-                    user_info = get_user(user_id=user_id)
-                    if isinstance(user_info, dict):
-                        user_data_resp = user_info.get("data", {})
-                        users = user_data_resp.get("users", [])
-                        if users:
-                            first_user = users[0]
-                            fname = first_user.get("firstName", "")
-                            lname = first_user.get("lastName", "")
-                            user_name = f"{fname} {lname}".strip()
-                            logging.debug(f"Got user_name: {user_name}")
-                except Exception as e:
-                    logging.error(f"Error fetching user info for user_id {user_id}: {e}")
-            
-            if due_date is not None:
-                try:
-                    meaningful_date = datetime.datetime.fromtimestamp(due_date).date().isoformat()
-                except Exception as e:
-                    logging.error(f"Error converting due_date {due_date}: {e}")
-                    meaningful_date = None
-            else:
-                meaningful_date = None
-          
-            user_data = {
-                "user_id": user_id,
-                "user_name": user_name,
-                "status": status,
-                "title": title, 
-                "date": meaningful_date
-            }
-            logging.debug(f"Appending user_data: {user_data}")
+            logging.debug("Processing item %s: %s", idx, user)
+            user_data = task_row(user, get_user=get_user)
+            logging.debug("Appending user_data: %s", user_data)
             retur_data.append(user_data)
 
             
         except Exception as e:
-            logging.error(f"Error processing task at index {idx}: {e}")
+            logging.error("Error processing task at index %s: %s", idx, e)
             continue
     
-    logging.info(f"task_info returning {len(retur_data)} processed tasks")
+    logging.info("task_info returning %s processed tasks", len(retur_data))
     
     # Cache the result
     if retur_data:
         cache_data = {"tasks:all": retur_data}
         connecteam_redit_layer.connectam_user_info(cache_data, ttl=600)
-        logging.info(f"Cached {len(retur_data)} tasks")
+        logging.info("Cached %s tasks", len(retur_data))
     
     return retur_data
 
@@ -0,0 +1,108 @@
+"""
+Dashboard deltas pushed over the event bus.
+
+Whenever cached data changes - a snapshot refresh, a mirror sync or a
+Connecteam webhook - only what the dashboard shows is compared and published:
+
+    tenant_balances      per-tenant overdue balance changes (from leases)
+    task_status          task status changes (from Connecteam task lists)
+    task_changed         a task created, updated or deleted through this API
+    dataset_changed      any other dataset moving to a new generation
+    dataset_invalidated  a dataset dropped from the caches; re-fetched on next read
+
+Snapshot deltas come from the record-level change sets in ``snapshot_diff``,
+so only the records that actually changed are looked at. Clients patch their
+view from these events (or fetch /api/changes/<dataset>?since=<generation>)
+instead of polling the REST routes.
+"""
+import logging
+
+from middle_layer import event_bus, snapshot_diff
+
+
+def _lease_records(payload):
+    if isinstance(payload, dict):
+        payload = payload.get("data")
+    return [item for item in payload or [] if isinstance(item, dict)] if isinstance(payload, list) else []
+
+
+def tenant_balances(lease_payload) -> dict:
+    """tenant id -> summed overdue balance of their leases."""
+    balances = {}
+    for lease in _lease_records(lease_payload):
+        tenants = lease.get("tenants") or []
+        for tenant_id in tenants if isinstance(tenants, list) else [tenants]:
+            if isinstance(tenant_id, dict):
+                tenant_id = tenant_id.get("id") or tenant_id.get("tenant")
+            if tenant_id:
+                balances[tenant_id] = balances.get(tenant_id, 0.0) + float(lease.get("overdueBalance") or 0)
+    return balances
+
+
+def tenant_balance_deltas(before: dict, after: dict) -> list:
+    """Tenants whose overdue balance differs between two tenant_balances maps."""
+    deltas = []
+    for tenant_id in sorted(set(before) | set(after)):
+        previous, current = before.get(tenant_id, 0.0), after.get(tenant_id, 0.0)
+        if round(previous, 2) != round(current, 2):
+            deltas.append({"tenant_id": tenant_id, "overdue_balance": current, "previous": previous})
+    return deltas
+
+
+def task_status_deltas(change) -> list:
+    """Tasks that are new or whose status changed, from a ``snapshot_diff.diff`` change set."""
+    pairs = [(None, task) for task in change["added"]] + list(change["changed"])
+    deltas = []
+    for before, task in pairs:
+        previous = before.get("status") if before else None
+        if before is None or previous != task.get("status"):
+            deltas.append({"task_id": task.get("id"), "title": task.get("title"), "status": task.get("status"),
+                           "previous": previous})
+    return deltas
+
+
+def publish_dataset_changed(dataset: str, generation: int):
+    event_bus.publish("dataset_changed", {"dataset": dataset, "generation": generation})
+
+
+def publish_dataset_invalidated(dataset: str):
+    event_bus.publish("dataset_invalidated", {"dataset": dataset})
+
+
+def publish_tenant_balances(before: dict, after: dict, source: str):
+    deltas = tenant_balance_deltas(before, after)
+    if deltas:
+        event_bus.publish("tenant_balances", {"source": source, "changes": deltas})
+    return deltas
+
+
+def publish_task_statuses(deltas: list, source: str):
+    if deltas:
+        event_bus.publish("task_status", {"source": source, "changes": deltas})
+    return deltas
+
+
+def publish_task_change(action: str, task_id, task, source: str):
+    """`task` is the task_info row after the write (None for deletes)."""
+    event_bus.publish("task_changed", {"source": source, "action": action, "task_id": task_id, "task": task})
+
+
+def on_snapshot_changed(dataset: str, previous, payload, generation: int, change):
+    """snapshot_diff listener: turn a dataset's change set into dashboard deltas."""
+    publish_dataset_changed(dataset, generation)
+    if change is None:
+        # First snapshot (or no per-record ids): clients load it through REST
+        return
+    if dataset == "leases":
+        if change["added"] or change["removed"] or change["changed"]:
+            publish_tenant_balances(tenant_balances(previous), tenant_balances(payload), source="snapshot")
+    elif dataset.startswith("tasks:"):
+        publish_task_statuses(task_status_deltas(change), source="snapshot")
+
+
+def register():
+    snapshot_diff.add_listener(on_snapshot_changed)
+    logging.debug("Dashboard delta publisher registered")
+
+
+register()
@@ -0,0 +1,93 @@
+"""
+In-process directories built from a crawled vendor dataset (jobs, users, ...).
+
+``DirectoryCache`` loads the dataset through ``snapshot_store.fetch_dataset``,
+which provides Redis, a last-known-good snapshot and single-flight. It builds
+an index object from the payload and serves that index from memory until it
+is ``max_age`` seconds old. A failed reload keeps the previous index, and a
+background thread can keep it warm, so request-time lookups never wait on
+the vendor.
+"""
+import logging
+import threading
+import time
+
+from middle_layer import snapshot_store
+from utils import metrics
+
+# After a failed load, wait this long before requests try the vendor again
+FAILED_RETRY_SECONDS = 60
+
+
+class DirectoryCache:
+    """Memoized `build(payload)` over the `dataset` crawled by `fetch_fn`."""
+
+    def __init__(self, dataset: str, build, fetch_fn, max_age: float = 900):
+        self.dataset = dataset
+        self.build = build
+        self.fetch_fn = fetch_fn
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, directory=None):
+        """Drop (or replace) the in-process index; the next get() reloads it."""
+        with self._lock:
+            self._directory = directory
+            self._loaded_at = time.time() if directory is not None else 0.0
+
+    def _load(self, fetch_fn):
+        payload = snapshot_store.fetch_dataset(self.dataset, fetch_fn)
+        if snapshot_store.is_error_payload(payload):
+            logging.warning("%s fetch failed: %s", self.dataset,
+                            payload.get("exception") if isinstance(payload, dict) else payload)
+            snapshot = snapshot_store.load_snapshot(self.dataset)
+            if snapshot is None:
+                raise ConnectionError(f"{self.dataset} unavailable and no snapshot on disk")
+            payload = snapshot["payload"]
+        return self.build(payload)
+
+    def get(self, max_age: float = None, fetch_fn=None):
+        """The index, reloaded when older than `max_age` seconds.
+
+        On a failed reload the previous index keeps being served; with none at
+        all an empty one (``build(None)``) is returned so lookups degrade to ids.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            directory, loaded_at = self._directory, self._loaded_at
+        if directory is not None and time.time() - loaded_at < max_age:
+            return directory
+        try:
+            directory = self._load(fetch_fn or self.fetch_fn)
+            loaded_at = time.time()
+        except Exception:
+            logging.exception("Failed to load %s directory", self.dataset)
+            directory = directory if directory is not None else self.build(None)
+            loaded_at = time.time() - self.max_age + FAILED_RETRY_SECONDS
+        with self._lock:
+            self._directory, self._loaded_at = directory, loaded_at
+        return directory
+
+    def refresh(self, fetch_fn=None):
+        """Re-crawl the dataset now, bypassing the Redis copy."""
+        snapshot_store.invalidate(self.dataset)
+        with metrics.time_refresh(f"{self.dataset}_directory"):
+            return self.get(max_age=0, fetch_fn=fetch_fn)
+
+    def background_refresh(self, interval_minutes: int = 60):
+        """Background thread that re-crawls the dataset every N minutes (first run immediately)."""
+        def refresh_loop():
+            while True:
+                try:
+                    directory = self.refresh()
+                    logging.info("Background: %s directory refreshed (%d entries)", self.dataset, len(directory))
+                except Exception:
+                    logging.exception("Background %s directory refresh failed (will retry)", self.dataset)
+                time.sleep(interval_minutes * 60)
+
+        # Start as daemon thread so it doesn't block app shutdown
+        thread = threading.Thread(target=refresh_loop, daemon=True)
+        thread.start()
+        logging.info("Started background %s directory refresh every %d minutes", self.dataset, interval_minutes)
+        return thread
@@ -19,6 +19,8 @@ try:
         start_background_refresh,
         redis
     )
+    from middle_layer import doorloop_join_index, portfolio_aggregates, snapshot_store
+    from utils import tracing
 except Exception as exc:
 	raise ImportError(f"Failed to import redis_layer. Ensure project root is correct: {PROJECT_ROOT}\nOriginal error: {exc}")
 
@@ -30,6 +32,28 @@ except Exception as exc:
 	raise ImportError(f"Failed to import doorloop_api_client. Ensure project root is correct: {PROJECT_ROOT}\nOriginal error: {exc}")
 
 
+# Snapshot/cache dataset name -> DoorLoop list resource
+DATASET_RESOURCES = {
+    "tenants": "tenants",
+    "leases": "leases",
+    "properties": "properties",
+    "lease_payments": "lease-payments",
+    "expenses": "expenses",
+    "communications": "communications",
+    "doorloop_tasks": "tasks",
+}
+
+# The tenant rows last written to the tenant_rows snapshot; memoized rows are not re-saved
+_saved_rows = {"rows": None}
+
+
+@tracing.traced()
+def fetch_doorloop_dataset(dataset: str):
+    """Whole DoorLoop list for `dataset` (every page), read through Redis and the snapshot store."""
+    resource = DATASET_RESOURCES[dataset]
+    return snapshot_store.fetch_dataset(dataset, lambda: doorloop_api.retrieve_all(resource))
+
+
 def retrieve_data(*args):
    try:
        # If a single object was passed, return it directly
@@ -37,7 +61,7 @@ def retrieve_data(*args):
            return args[0]
        return args
    except Exception as e:
-       logging.exception(f" An internal error has occur please check the MCP server,{e}")
+       logging.exception(" An internal error has occur please check the MCP server,%s", e)
        return None
 
 def get_propertys(raw_data):
@@ -120,125 +144,79 @@ def get_lease_data_cached():
     return tenant_lease_map
 
 
-def get_doorloop_tenants(raw_data):
-    """Parse tenant data and cache the results. Uses cached results if available."""
-    from middle_layer.redis_layer import redis
-   
+@tracing.traced()
+def get_doorloop_tenants(raw_data, lease_data=None, property_data=None):
+    """Build the /tenants list rows by joining tenants, leases and properties on ids.
     
+    Leases and properties are read through the dataset cache when not passed in.
+    The join index (and the rows built from it) is reused until one of the
+    three datasets gets a new snapshot generation.
+    """
     if raw_data is None:
         logging.error("No raw_data provided to parser")
         return []
 
-    # Check if we have cached parsed tenants (valid for 30 minutes)
-    # We check cache_data_retireive since that's what we return at the end
-    try:
-        cached_result = cache_data_retireive('data')
-        if cached_result and len(cached_result) > 0:
-            logging.info("Using cached parsed tenant data from Redis")
-            return cached_result
-    except Exception:
-        logging.debug("No cached data available, will fetch fresh")
-
     if isinstance(raw_data, tuple) and len(raw_data) > 0:
         payload = raw_data[0]
-        
     elif isinstance(raw_data, dict):
         payload = raw_data
     else:
         logging.error("Unexpected raw_data type: %s", type(raw_data))
         return []
 
-    tenants = payload["data"]
-    if not isinstance(tenants, list):
+    if not isinstance(payload.get("data"), list):
         logging.error("No tenant list found in payload")
         return []
+
+    if lease_data is None:
+        lease_data = fetch_doorloop_dataset("leases")
+    if property_data is None:
+        property_data = fetch_doorloop_dataset("properties")
+    for name, dataset in (("leases", lease_data), ("properties", property_data)):
+        if snapshot_store.is_error_payload(dataset):
+            logging.warning("Building tenant rows without %s: %s", name, (dataset or {}).get("error"))
+
+    generation_key = snapshot_store.generation_key("tenants", "leases", "properties")
+    parsed_obj = doorloop_join_index.get_tenant_rows(payload, lease_data, property_data,
+                                                     generation_key=generation_key)
+
+    # Keep a last-known-good copy on disk for outages and cold starts, once per rebuild
+    if parsed_obj is not _saved_rows["rows"]:
+        snapshot_store.save_snapshot("tenant_rows", parsed_obj)
+        _saved_rows["rows"] = parsed_obj
+    logging.info("Built %d tenant rows", len(parsed_obj))
+    return parsed_obj
+
+
+@tracing.traced()
+def portfolio_overview(prop_raw_data, tenant_raw_data, lease_raw_data, payment_raw_data=None):
+    """Portfolio KPIs (rent due, overdue, active leases, vacancy, monthly revenue).
     
-    property_ids = get_propertys(raw_data)
-    
-    # Fetch property addresses inline to avoid circular dependency
-    property_address_map = {}
-    removed_keys = ["state", "zip", "country", "lat", "lng", "isValidAddress"]
-    
-    for pid in property_ids:
-        try:
-            # Use pure HTTP API client (no MCP, no async)
-            prop_data = doorloop_api.retrieve_properties_id(pid)
-            if isinstance(prop_data, dict):
-                address = prop_data.get("address") or {}
-                # Get street address (the field is called 'street1')
-                street_address = address.get("street1", "N/A")
-                property_address_map[pid] = street_address
-        except Exception:
-            logging.exception("Failed to fetch property %s", pid)
-            continue
-    
-    # Get lease data from cache (refreshed every hour)
-    tenant_lease_map = get_lease_data_cached()
-    
-    parsed_obj = []
-    for idx, tenant in enumerate(tenants):
-        try:
-            # safe lookups with defaults
-            tenant_id = tenant.get("id")
-            name = tenant.get("fullName") or tenant.get("name") or ""
-
-            # extract first email address if present
-            email_addr , phone = None, None
-            for e in tenant.get("emails", []) or []:
-                if isinstance(e, dict) and e.get("address"):
-                    email_addr = e.get("address")
-                    break
-                
-            for e in tenant.get("phones",[]) or []:
-                if isinstance(e, dict) and e.get("number"):
-                    phone = e.get("number")
-                    break
-            # fallback to portal login email if available
-            if not email_addr:
-                portal = tenant.get("portalInfo") or {}
-                email_addr = portal.get("loginEmail")
-
-            status = (tenant.get("portalInfo") or {}).get("status") or tenant.get("status") or "UNKNOWN"
-           
-            # Get the property address instead of just the ID
-            prop_id = property_ids[idx] if idx < len(property_ids) else None
-            prop_address = property_address_map.get(prop_id, "N/A") if prop_id else "N/A"
-            
-            # Get rent due information from lease data
-            lease_info = tenant_lease_map.get(name, {})
-            rent_due = lease_info.get("overdueBalance", 0)
-            # total_balance = lease_info.get("totalBalanceDue", 0)
-            # monthly_rent = lease_info.get("totalRecurringRent", 0)
-           
-            parsed_obj.append({
-                # "id": tenant_id,
-                "name": name,
-                "Phone Number" : phone,
-                "email": email_addr,
-                "properties": prop_address,
-                "rent_due": f"${rent_due:,.2f}" if rent_due > 0 else "$0.00",
-                "status": status,
-                # "monthly_rent": f"${monthly_rent:,.2f}" if monthly_rent else "N/A",
-                # "total_balance_due": f"${total_balance:,.2f}" if total_balance > 0 else "$0.00",
-            })
-            
-        except Exception:
-            logging.exception("Failed to parse tenant at index %s")
-            # continue parsing remaining tenants
-            continue
-    
-    # Cache the parsed tenants to Redis (once after loop)
-    # This caches with 30 minute TTL by default
-    cache_tenants_to_redis(parsed_obj)
-    
-    # Retrieve what we just cached (ensures consistency)
-    returned_ogj = cache_data_retireive('data')
-        
-    # Print/return full parsed list
-    logging.info("Parsed %d tenants from fresh data", len(parsed_obj))
-    return returned_ogj
+    Computed in one vectorized pass by portfolio_aggregates and reused until
+    one of the underlying datasets gets a new snapshot generation.
+    """
+    generation_key = snapshot_store.generation_key("tenants", "leases", "properties", "lease_payments")
+    return portfolio_aggregates.get_overview(prop_raw_data, tenant_raw_data, lease_raw_data,
+                                             payment_raw_data, generation_key=generation_key)
+
+
+@tracing.traced()
+def fetch_accumulative_info(prop_raw_data, tenant_raw_data, lease_raw_data, payment_raw_data=None):
+    """Overview numbers as a tuple:
+    (total_properties, active_tenants_list, total_rent_due, active_leases_list, month_list, rent_list)
+    """
+    overview = portfolio_overview(prop_raw_data, tenant_raw_data, lease_raw_data, payment_raw_data)
+    return (
+        overview["total_properties"],
+        overview["active_tenant_ids"],
+        overview["total_rent_due"],
+        overview["active_lease_ids"],
+        overview["month_list"],
+        overview["rent_list"],
+    )
 
 
+@tracing.traced()
 def property_info(raw_data ):
     """Fetch property details (address) for up to `limit` property ids.
     
@@ -0,0 +1,159 @@
+"""
+Id-keyed join index over DoorLoop tenants, leases and properties.
+
+Built once per data refresh, it maps tenant id -> lease ids -> property/unit ids
+so tenant rows can be assembled with dict lookups instead of matching leases
+by display name or pairing tenants with properties by list position.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+
+def _records(payload):
+    """List of entity dicts from a DoorLoop list payload (or a bare list)."""
+    if isinstance(payload, tuple) and payload:
+        payload = payload[0]
+    if isinstance(payload, dict):
+        payload = payload.get("data")
+    if not isinstance(payload, list):
+        return []
+    return [item for item in payload if isinstance(item, dict)]
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class TenantJoinIndex:
+    """Hash indexes joining tenants to their leases, properties and units."""
+
+    def __init__(self, tenants, leases, properties):
+        self.tenants = {t["id"]: t for t in _records(tenants) if t.get("id")}
+        self.leases = {l["id"]: l for l in _records(leases) if l.get("id")}
+        self.properties = {p["id"]: p for p in _records(properties) if p.get("id")}
+
+        self.tenant_leases = defaultdict(list)
+        for lease_id, lease in self.leases.items():
+            for tenant_id in _as_list(lease.get("tenants")):
+                if isinstance(tenant_id, dict):
+                    tenant_id = tenant_id.get("id") or tenant_id.get("tenant")
+                if tenant_id:
+                    self.tenant_leases[tenant_id].append(lease_id)
+
+        # Prospects have no lease yet; their interests are the only property link
+        self.tenant_interests = defaultdict(list)
+        for tenant_id, tenant in self.tenants.items():
+            for prospect in _as_list(tenant.get("prospectInfo")):
+                for interest in (prospect or {}).get("interests") or []:
+                    prop_id = interest.get("property") if isinstance(interest, dict) else None
+                    if prop_id and prop_id not in self.tenant_interests[tenant_id]:
+                        self.tenant_interests[tenant_id].append(prop_id)
+
+        self.property_address = {}
+        for prop_id, prop in self.properties.items():
+            address = prop.get("address") or {}
+            self.property_address[prop_id] = address.get("street1") or prop.get("name") or "N/A"
+
+    def lease_ids(self, tenant_id):
+        return self.tenant_leases.get(tenant_id, [])
+
+    def property_ids(self, tenant_id):
+        """Properties of the tenant's leases, falling back to prospect interests."""
+        prop_ids = []
+        for lease_id in self.lease_ids(tenant_id):
+            prop_id = self.leases[lease_id].get("property")
+            if prop_id and prop_id not in prop_ids:
+                prop_ids.append(prop_id)
+        return prop_ids or list(self.tenant_interests.get(tenant_id, []))
+
+    def unit_ids(self, tenant_id):
+        unit_ids = []
+        for lease_id in self.lease_ids(tenant_id):
+            for unit_id in _as_list(self.leases[lease_id].get("units")):
+                if unit_id and unit_id not in unit_ids:
+                    unit_ids.append(unit_id)
+        return unit_ids
+
+    def overdue_balance(self, tenant_id) -> float:
+        return sum(float(self.leases[lease_id].get("overdueBalance") or 0) for lease_id in self.lease_ids(tenant_id))
+
+    def tenant_row(self, tenant):
+        """Build the /tenants list row for one tenant object."""
+        tenant_id = tenant.get("id")
+        name = tenant.get("fullName") or tenant.get("name") or ""
+
+        # extract first email address / phone number if present
+        email_addr, phone = None, None
+        for e in tenant.get("emails", []) or []:
+            if isinstance(e, dict) and e.get("address"):
+                email_addr = e.get("address")
+                break
+        for e in tenant.get("phones", []) or []:
+            if isinstance(e, dict) and e.get("number"):
+                phone = e.get("number")
+                break
+        portal = tenant.get("portalInfo") or {}
+        # fallback to portal login email if available
+        if not email_addr:
+            email_addr = portal.get("loginEmail")
+
+        status = portal.get("status") or tenant.get("status") or "UNKNOWN"
+        addresses = [self.property_address.get(prop_id, "N/A") for prop_id in self.property_ids(tenant_id)]
+        rent_due = self.overdue_balance(tenant_id)
+
+        return {
+            "name": name,
+            "Phone Number": phone,
+            "email": email_addr,
+            "properties": ", ".join(addresses) if addresses else "N/A",
+            "rent_due": f"${rent_due:,.2f}" if rent_due > 0 else "$0.00",
+            "status": status,
+        }
+
+    def tenant_rows(self):
+        rows = []
+        for tenant in self.tenants.values():
+            try:
+                rows.append(self.tenant_row(tenant))
+            except Exception:
+                logging.exception("Failed to build row for tenant %s", tenant.get("id"))
+        return rows
+
+
+_memo_lock = threading.Lock()
+_memo = {"key": None, "index": None, "rows": None}
+
+
+def get_join_index(tenants, leases, properties, generation_key=None):
+    """Return a TenantJoinIndex, reusing the last one while `generation_key` is unchanged.
+
+    `generation_key` identifies the data refresh the payloads came from (e.g.
+    snapshot generations); pass None to always build a fresh index.
+    """
+    with _memo_lock:
+        if generation_key is not None and _memo["key"] == generation_key:
+            return _memo["index"]
+
+    index = TenantJoinIndex(tenants, leases, properties)
+    if generation_key is not None:
+        with _memo_lock:
+            _memo.update(key=generation_key, index=index, rows=None)
+    return index
+
+
+def get_tenant_rows(tenants, leases, properties, generation_key=None):
+    """Tenant rows for /tenants, memoized alongside the index for the same refresh."""
+    index = get_join_index(tenants, leases, properties, generation_key=generation_key)
+    with _memo_lock:
+        if generation_key is not None and _memo["key"] == generation_key and _memo["rows"] is not None:
+            return _memo["rows"]
+
+    rows = index.tenant_rows()
+    if generation_key is not None:
+        with _memo_lock:
+            if _memo["key"] == generation_key:
+                _memo["rows"] = rows
+    return rows
@@ -0,0 +1,590 @@
+"""
+Local SQLite mirror of DoorLoop entities.
+
+A sync engine copies tenants, leases, properties, lease payments and expenses
+into an indexed SQLite database (WAL mode) so routes can filter, sort and
+paginate in SQL instead of pulling whole lists from DoorLoop or Redis.
+
+Each table keeps the columns we query on plus the original JSON object in
+``data``, so responses keep the vendor shape.
+
+Refreshes are incremental where DoorLoop returns ``updatedAt``: ``sync_state``
+keeps a per-entity high-water mark and only records past it are fetched and
+merged. A full reconcile, which also catches deletes, runs every
+``FULL_RECONCILE_MINUTES``. Entities without ``updatedAt`` are reconciled in
+full on every pass, since a record id says nothing about edits to existing
+records; the upsert only rewrites rows whose content changed.
+"""
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).absolute().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+try:
+    from middle_layer import dashboard_events
+    from services import doorloop_api_client as doorloop_api
+    from utils import metrics, tracing
+except Exception as exc:
+    raise ImportError(f"Failed to import doorloop_api_client. Ensure project root is correct: {PROJECT_ROOT}\nOriginal error: {exc}")
+
+MIRROR_PATH = Path(os.getenv("DOORLOOP_MIRROR_PATH", str(PROJECT_ROOT / ".mirror" / "doorloop.sqlite3")))
+FULL_RECONCILE_MINUTES = int(os.getenv("DOORLOOP_FULL_RECONCILE_MINUTES", str(24 * 60)))
+INCREMENTAL_PAGE_SIZE = 200
+
+
+def _first(items, key):
+    """First non-empty `key` from a list of dicts (emails, phones, lines...)."""
+    for item in items or []:
+        if isinstance(item, dict) and item.get(key):
+            return item.get(key)
+    return None
+
+
+def _tenant_row(obj):
+    portal = obj.get("portalInfo") or {}
+    return {
+        "name": obj.get("fullName") or obj.get("name") or "",
+        "email": _first(obj.get("emails"), "address") or portal.get("loginEmail"),
+        "status": portal.get("status") or obj.get("status"),
+    }
+
+
+def _lease_row(obj):
+    return {
+        "name": obj.get("name") or "",
+        "property_id": obj.get("property"),
+        "status": obj.get("status"),
+        "start_date": obj.get("start"),
+        "end_date": obj.get("end"),
+        "total_balance_due": obj.get("totalBalanceDue") or 0,
+        "overdue_balance": obj.get("overdueBalance") or 0,
+        "current_balance": obj.get("currentBalance") or 0,
+        "recurring_rent": obj.get("totalRecurringRent") or 0,
+    }
+
+
+def _property_row(obj):
+    address = obj.get("address") or {}
+    return {
+        "name": obj.get("name") or "",
+        "street1": address.get("street1"),
+        "city": address.get("city"),
+        "active": 1 if obj.get("active", True) else 0,
+        "num_active_units": obj.get("numActiveUnits") or 0,
+    }
+
+
+def _payment_row(obj):
+    return {
+        "lease_id": obj.get("lease"),
+        "property_id": obj.get("property"),
+        "date": obj.get("date"),
+        "amount": obj.get("amountReceived") or obj.get("amount") or 0,
+    }
+
+
+def _expense_row(obj):
+    return {
+        "property_id": obj.get("property") or _first(obj.get("lines"), "property"),
+        "date": obj.get("date"),
+        "amount": obj.get("totalAmount") or obj.get("amount") or 0,
+    }
+
+
+# entity -> DoorLoop resource, table columns (name -> SQL type), indexes, row builder
+ENTITIES = {
+    "tenants": {
+        "resource": "tenants",
+        "columns": {"name": "TEXT", "email": "TEXT", "status": "TEXT"},
+        "indexes": ["name", "status"],
+        "row": _tenant_row,
+    },
+    "leases": {
+        "resource": "leases",
+        "columns": {
+            "name": "TEXT", "property_id": "TEXT", "status": "TEXT",
+            "start_date": "TEXT", "end_date": "TEXT",
+            "total_balance_due": "REAL", "overdue_balance": "REAL",
+            "current_balance": "REAL", "recurring_rent": "REAL",
+        },
+        "indexes": ["property_id", "status", "overdue_balance", "end_date"],
+        "row": _lease_row,
+    },
+    "properties": {
+        "resource": "properties",
+        "columns": {"name": "TEXT", "street1": "TEXT", "city": "TEXT", "active": "INTEGER", "num_active_units": "INTEGER"},
+        "indexes": ["name", "city"],
+        "row": _property_row,
+    },
+    "lease_payments": {
+        "resource": "lease-payments",
+        "columns": {"lease_id": "TEXT", "property_id": "TEXT", "date": "TEXT", "amount": "REAL"},
+        "indexes": ["lease_id", "property_id", "date"],
+        "row": _payment_row,
+    },
+    "expenses": {
+        "resource": "expenses",
+        "columns": {"property_id": "TEXT", "date": "TEXT", "amount": "REAL"},
+        "indexes": ["property_id", "date"],
+        "row": _expense_row,
+    },
+}
+
+# Range filters accepted by query(): filter name -> (column, SQL operator)
+_RANGE_FILTERS = {
+    "date_from": ("date", ">="),
+    "date_to": ("date", "<="),
+    "min_overdue": ("overdue_balance", ">="),
+}
+
+_SYNC_STATE_COLUMNS = {
+    "high_water": "TEXT",
+    "high_water_field": "TEXT",
+    "last_incremental_sync": "REAL",
+    "generation": "INTEGER DEFAULT 0",
+}
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def _connect() -> sqlite3.Connection:
+    """Per-thread connection to the mirror database (WAL, so readers never block the sync)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "path", None) == MIRROR_PATH:
+        return conn
+
+    MIRROR_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(MIRROR_PATH), timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _local.conn, _local.path = conn, MIRROR_PATH
+    _ensure_schema(conn)
+    return conn
+
+
+def _ensure_schema(conn: sqlite3.Connection):
+    with _schema_lock:
+        if MIRROR_PATH in _schema_ready:
+            return
+        with conn:
+            for entity, spec in ENTITIES.items():
+                cols = ", ".join(f"{name} {sql_type}" for name, sql_type in spec["columns"].items())
+                conn.execute(f"CREATE TABLE IF NOT EXISTS {entity} (id TEXT PRIMARY KEY, {cols}, updated_at TEXT, data TEXT NOT NULL)")
+                for column in spec["indexes"]:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{entity}_{column} ON {entity} ({column})")
+            conn.execute("CREATE TABLE IF NOT EXISTS lease_tenants (lease_id TEXT NOT NULL, tenant_id TEXT NOT NULL, PRIMARY KEY (lease_id, tenant_id))")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_lease_tenants_tenant ON lease_tenants (tenant_id)")
+            conn.execute("CREATE TABLE IF NOT EXISTS sync_state (entity TEXT PRIMARY KEY, last_full_sync REAL, row_count INTEGER)")
+            # Columns added for incremental sync; ALTER keeps mirrors created before that working
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(sync_state)")}
+            for column, sql_type in _SYNC_STATE_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE sync_state ADD COLUMN {column} {sql_type}")
+        _schema_ready.add(MIRROR_PATH)
+
+
+def _upsert(conn: sqlite3.Connection, entity: str, objects) -> int:
+    """Insert or update `objects` in the entity table. Returns how many rows actually changed."""
+    spec = ENTITIES[entity]
+    columns = list(spec["columns"])
+    placeholders = ", ".join("?" for _ in range(len(columns) + 3))
+    updates = ", ".join(f"{c}=excluded.{c}" for c in columns + ["updated_at", "data"])
+    sql = (f"INSERT INTO {entity} (id, {', '.join(columns)}, updated_at, data) VALUES ({placeholders}) "
+           f"ON CONFLICT(id) DO UPDATE SET {updates} WHERE {entity}.data IS NOT excluded.data")
+
+    rows = []
+    for obj in objects:
+        if not isinstance(obj, dict) or not obj.get("id"):
+            continue
+        values = spec["row"](obj)
+        rows.append((obj["id"], *(values[c] for c in columns), obj.get("updatedAt"), json.dumps(obj, sort_keys=True)))
+    before = conn.total_changes
+    conn.executemany(sql, rows)
+    changed = conn.total_changes - before
+
+    if entity == "leases":
+        lease_ids = [(row[0],) for row in rows]
+        conn.executemany("DELETE FROM lease_tenants WHERE lease_id = ?", lease_ids)
+        conn.executemany(
+            "INSERT OR IGNORE INTO lease_tenants (lease_id, tenant_id) VALUES (?, ?)",
+            [(obj["id"], tenant_id) for obj in objects if isinstance(obj, dict) and obj.get("id")
+             for tenant_id in (obj.get("tenants") or []) if isinstance(tenant_id, str)],
+        )
+    return changed
+
+
+def _watermark_field(objects) -> str:
+    """Use updatedAt when DoorLoop exposes it for this entity, otherwise the (monotonic) record id.
+
+    An id mark only tracks new records, so ``sync_entity_incremental`` doesn't run on it.
+    """
+    for obj in objects:
+        if isinstance(obj, dict) and obj.get("updatedAt"):
+            return "updatedAt"
+    return "id"
+
+
+def _max_watermark(objects, field: str):
+    values = [obj.get(field) for obj in objects if isinstance(obj, dict) and obj.get(field)]
+    return max(values) if values else None
+
+
+def get_sync_state(entity: str):
+    """The sync_state row for `entity` as a dict, or None if it has never been synced."""
+    row = _connect().execute("SELECT * FROM sync_state WHERE entity = ?", (entity,)).fetchone()
+    return dict(row) if row else None
+
+
+def generation(entity: str) -> int:
+    """Bumped every time a sync changes rows of `entity`; 0 before the first sync."""
+    try:
+        state = get_sync_state(entity)
+    except Exception:
+        logging.exception("Failed to read mirror sync state")
+        return 0
+    return (state or {}).get("generation") or 0
+
+
+def _tenant_balances(conn: sqlite3.Connection) -> dict:
+    """tenant id -> summed overdue balance of their mirrored leases."""
+    rows = conn.execute(
+        "SELECT lt.tenant_id, SUM(COALESCE(l.overdue_balance, 0)) AS balance "
+        "FROM lease_tenants lt JOIN leases l ON l.id = lt.lease_id GROUP BY lt.tenant_id"
+    ).fetchall()
+    return {row["tenant_id"]: float(row["balance"]) for row in rows}
+
+
+def _publish_changes(entity: str, balances_before):
+    """Push dashboard deltas after a sync changed rows of `entity`."""
+    try:
+        dashboard_events.publish_dataset_changed(f"mirror:{entity}", generation(entity))
+        if entity == "leases" and balances_before is not None:
+            dashboard_events.publish_tenant_balances(balances_before, _tenant_balances(_connect()), source="mirror")
+    except Exception:
+        logging.exception("Failed to publish mirror changes for %s", entity)
+
+
+@tracing.traced()
+def sync_entity(entity: str, fetch_fn=None):
+    """Full sync of one entity: replace the table contents with what DoorLoop returns.
+
+    Rows that disappeared upstream are deleted. Returns the row count, or None
+    when the fetch failed (the existing mirror is left untouched).
+    """
+    spec = ENTITIES[entity]
+    started = time.time()
+    payload = fetch_fn() if fetch_fn else doorloop_api.retrieve_all(spec["resource"])
+    if not isinstance(payload, dict) or "error" in payload:
+        logging.warning("Mirror sync of %s failed: %s", entity, (payload or {}).get("error") if isinstance(payload, dict) else payload)
+        return None
+
+    objects = [obj for obj in payload.get("data") or [] if isinstance(obj, dict) and obj.get("id")]
+    count = len(objects)
+    field = _watermark_field(objects)
+    conn = _connect()
+    # Only diff balances once the mirror has data; the first sync is a plain load
+    balances_before = _tenant_balances(conn) if entity == "leases" and is_ready(entity) else None
+    with conn:
+        changed = _upsert(conn, entity, objects)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS _seen_ids (id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM _seen_ids")
+        conn.executemany("INSERT OR IGNORE INTO _seen_ids (id) VALUES (?)", [(obj["id"],) for obj in objects])
+        changed += conn.execute(f"DELETE FROM {entity} WHERE id NOT IN (SELECT id FROM _seen_ids)").rowcount
+        if entity == "leases":
+            conn.execute("DELETE FROM lease_tenants WHERE lease_id NOT IN (SELECT id FROM leases)")
+        conn.execute(
+            "INSERT INTO sync_state (entity, last_full_sync, row_count, high_water, high_water_field, generation) "
+            "VALUES (?, ?, ?, ?, ?, 1) "
+            "ON CONFLICT(entity) DO UPDATE SET last_full_sync=excluded.last_full_sync, row_count=excluded.row_count, "
+            "high_water=excluded.high_water, high_water_field=excluded.high_water_field, "
+            "generation=COALESCE(sync_state.generation, 0) + ?",
+            (entity, time.time(), count, _max_watermark(objects, field), field, 1 if changed else 0),
+        )
+    if changed:
+        _publish_changes(entity, balances_before)
+    logging.info("Mirror synced %d %s in %.2fs", count, entity, time.time() - started)
+    return count
+
+
+@tracing.traced()
+def sync_entity_incremental(entity: str, fetch_page=None, page_size: int = INCREMENTAL_PAGE_SIZE):
+    """Fetch only records past the entity's high-water mark and merge them into the mirror.
+
+    Pages are requested newest-first on the watermark field and the crawl stops
+    at the first record older than the mark, so the cost scales with
+    the number of changes rather than the portfolio size. Deletes are not seen
+    here; the periodic full reconcile handles them.
+
+    Returns the number of merged records, or None when the incremental pass
+    could not run (no state yet, no updatedAt mark, fetch failure, or the API
+    ignored the sort).
+    """
+    state = get_sync_state(entity)
+    if not state or not state.get("high_water"):
+        return None
+    if state.get("high_water_field") != "updatedAt":
+        # New ids don't reveal edits to existing records (e.g. a lease's overdueBalance)
+        return None
+
+    spec = ENTITIES[entity]
+    field = state["high_water_field"]
+    high_water = state["high_water"]
+    fetch_page = fetch_page or (lambda page_number: doorloop_api.retrieve_page(
+        spec["resource"], page_number=page_number, page_size=page_size,
+        sort_by=field, sort_descending="true"))
+
+    changed, previous = [], None
+    page_number = 1
+    while True:
+        resp = fetch_page(page_number)
+        if not isinstance(resp, dict) or "error" in resp:
+            logging.warning("Incremental sync of %s failed on page %d", entity, page_number)
+            return None
+        batch = resp.get("data") or []
+        reached_mark = False
+        for obj in batch:
+            key = obj.get(field) if isinstance(obj, dict) else None
+            if key is None:
+                continue
+            if previous is not None and key > previous:
+                # Results aren't ordered on the watermark; an early stop could miss changes
+                logging.warning("DoorLoop ignored sort_by=%s for %s; incremental sync disabled", field, entity)
+                return None
+            previous = key
+            # Records stamped exactly at the mark are re-merged (a no-op if unchanged)
+            # so two edits within the same timestamp can't be skipped
+            if key < high_water:
+                reached_mark = True
+                break
+            changed.append(obj)
+        if reached_mark or len(batch) < page_size:
+            break
+        page_number += 1
+
+    conn = _connect()
+    balances_before = _tenant_balances(conn) if entity == "leases" and changed else None
+    with conn:
+        merged = _upsert(conn, entity, changed) if changed else 0
+        conn.execute(
+            "UPDATE sync_state SET last_incremental_sync = ?, high_water = ?, "
+            f"generation = COALESCE(generation, 0) + ?, row_count = (SELECT COUNT(*) FROM {entity}) "
+            "WHERE entity = ?",
+            (time.time(), max(high_water, _max_watermark(changed, field) or high_water), 1 if merged else 0, entity),
+        )
+    if merged:
+        _publish_changes(entity, balances_before)
+    logging.info("Mirror merged %d changed %s (%d page(s))", merged, entity, page_number)
+    return merged
+
+
+def sync(entity: str, force_full: bool = False):
+    """Incremental sync, with a full reconcile when due (or when the incremental pass can't run,
+    which is every pass for entities without updatedAt)."""
+    state = get_sync_state(entity)
+    full_due = (
+        force_full
+        or not state
+        or not state.get("last_full_sync")
+        or time.time() - state["last_full_sync"] >= FULL_RECONCILE_MINUTES * 60
+    )
+    if not full_due:
+        merged = sync_entity_incremental(entity)
+        if merged is not None:
+            return merged
+    return sync_entity(entity)
+
+
+def sync_all(force_full: bool = False):
+    """Sync every mirrored entity. Returns {entity: changed/synced row count or None}."""
+    results = {}
+    for entity in ENTITIES:
+        started = time.perf_counter()
+        try:
+            results[entity] = sync(entity, force_full=force_full)
+        except Exception:
+            logging.exception("Mirror sync of %s crashed", entity)
+            results[entity] = None
+        metrics.REFRESH_SECONDS.labels(
+            job=f"mirror_{entity}", outcome="ok" if results[entity] is not None else "error",
+        ).observe(time.perf_counter() - started)
+    return results
+
+
+def is_ready(entity: str) -> bool:
+    """True once `entity` has completed at least one sync."""
+    try:
+        row = _connect().execute("SELECT last_full_sync FROM sync_state WHERE entity = ?", (entity,)).fetchone()
+        return bool(row and row["last_full_sync"])
+    except Exception:
+        logging.exception("Failed to read mirror sync state")
+        return False
+
+
+def ensure_synced(entity: str) -> bool:
+    """Sync `entity` inline if it has never been mirrored. Returns whether the mirror can serve it."""
+    if is_ready(entity):
+        return True
+    return sync_entity(entity) is not None
+
+
+def _keyset_clause(sort: str, descending: bool, after):
+    """WHERE clause selecting rows strictly after `after` = (sort value, id) in query order.
+
+    Rows are ordered by the sort column then id; SQLite puts NULLs first when
+    ascending and last when descending, which the NULL branches mirror.
+    """
+    last_value, last_id = after
+    if not sort or sort == "id":
+        return ("id < ?" if descending and sort == "id" else "id > ?"), [last_id]
+    if last_value is None:
+        if descending:
+            return f"({sort} IS NULL AND id > ?)", [last_id]
+        return f"(({sort} IS NULL AND id > ?) OR {sort} IS NOT NULL)", [last_id]
+    op = "<" if descending else ">"
+    clause = f"({sort} {op} ? OR ({sort} = ? AND id > ?)"
+    clause += f" OR {sort} IS NULL)" if descending else ")"
+    return clause, [last_value, last_value, last_id]
+
+
+@tracing.traced()
+def query(entity: str, filters: dict = None, sort: str = None, descending: bool = False,
+          limit: int = 100, offset: int = 0, after=None) -> dict:
+    """Filter, sort and paginate an entity in SQL.
+
+    `filters` keys may be any column of the entity (equality), one of the range
+    filters (date_from, date_to, min_overdue), ``overdue=True`` for leases with
+    an overdue balance, or ``tenant_id`` for leases. Unknown keys raise ValueError.
+
+    Pagination is either `offset` based or keyset based: pass the ``next``
+    value of the previous page as `after` to continue right after it.
+    Returns ``{"data": [...], "total": N, "next": (sort value, id) or None}``
+    with the original DoorLoop objects.
+    """
+    spec = ENTITIES[entity]
+    columns = set(spec["columns"]) | {"id", "updated_at"}
+    where, params = [], []
+
+    for key, value in (filters or {}).items():
+        if value is None:
+            continue
+        if key in columns:
+            where.append(f"{key} = ?")
+            params.append(value)
+        elif key in _RANGE_FILTERS and _RANGE_FILTERS[key][0] in columns:
+            column, op = _RANGE_FILTERS[key]
+            where.append(f"{column} {op} ?")
+            params.append(value)
+        elif key == "overdue" and entity == "leases":
+            where.append("overdue_balance > 0" if value else "overdue_balance <= 0")
+        elif key == "tenant_id" and entity == "leases":
+            where.append("id IN (SELECT lease_id FROM lease_tenants WHERE tenant_id = ?)")
+            params.append(value)
+        else:
+            raise ValueError(f"Unsupported filter '{key}' for {entity}")
+
+    if sort and sort not in columns:
+        raise ValueError(f"Unsupported sort column '{sort}' for {entity}")
+    where_sql = f" WHERE {' AND '.join(where)}" if where else ""
+    order_sql = f" ORDER BY {sort} {'DESC' if descending else 'ASC'}, id" if sort else " ORDER BY id"
+
+    page_where, page_params = list(where), list(params)
+    if after is not None:
+        clause, clause_params = _keyset_clause(sort, descending, after)
+        page_where.append(clause)
+        page_params.extend(clause_params)
+        offset = 0
+    page_where_sql = f" WHERE {' AND '.join(page_where)}" if page_where else ""
+
+    conn = _connect()
+    total = conn.execute(f"SELECT COUNT(*) FROM {entity}{where_sql}", params).fetchone()[0]
+    rows = conn.execute(f"SELECT id, {sort or 'id'} AS sort_value, data FROM {entity}{page_where_sql}{order_sql} LIMIT ? OFFSET ?",
+                        [*page_params, limit, offset]).fetchall()
+    next_key = (rows[-1]["sort_value"], rows[-1]["id"]) if len(rows) == limit else None
+    return {"data": [json.loads(row["data"]) for row in rows], "total": total, "next": next_key}
+
+
+def _matches(entity: str, obj: dict, row: dict, columns: set, filters: dict) -> bool:
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if key in columns:
+            current = obj.get("id") if key == "id" else row.get(key)
+            if current is None or str(current) != str(value):
+                return False
+        elif key in _RANGE_FILTERS and _RANGE_FILTERS[key][0] in columns:
+            column, op = _RANGE_FILTERS[key]
+            current = row.get(column)
+            if current is None or not (current >= value if op == ">=" else current <= value):
+                return False
+        elif key == "overdue" and entity == "leases":
+            if (float(row.get("overdue_balance") or 0) > 0) != bool(value):
+                return False
+        elif key == "tenant_id" and entity == "leases":
+            if value not in (obj.get("tenants") or []):
+                return False
+        else:
+            raise ValueError(f"Unsupported filter '{key}' for {entity}")
+    return True
+
+
+@tracing.traced()
+def filter_objects(entity: str, objects, filters: dict = None, sort: str = None, descending: bool = False) -> list:
+    """In-memory ``query``: filter and sort whole DoorLoop objects the way the mirror's SQL does.
+
+    Used when a list has to be served from the cached payload because the
+    mirror is unavailable, so filters and sort order still apply.
+    """
+    spec = ENTITIES[entity]
+    columns = set(spec["columns"]) | {"id", "updated_at"}
+    if sort and sort not in columns:
+        raise ValueError(f"Unsupported sort column '{sort}' for {entity}")
+
+    matched = []
+    for obj in objects or []:
+        if not isinstance(obj, dict) or not obj.get("id"):
+            continue
+        row = {**spec["row"](obj), "id": obj["id"], "updated_at": obj.get("updatedAt")}
+        if _matches(entity, obj, row, columns, filters or {}):
+            matched.append((row, obj))
+
+    # Same order as SQLite: by id, then (stably) by the sort column with NULLs first ascending, last descending
+    matched.sort(key=lambda item: str(item[0]["id"]), reverse=descending and sort == "id")
+    if sort and sort != "id":
+        matched.sort(key=lambda item: (item[0][sort] is not None, item[0][sort] if item[0][sort] is not None else 0),
+                     reverse=descending)
+    return [obj for _, obj in matched]
+
+
+def background_sync(interval_minutes: int = 15):
+    """Background thread that refreshes the mirror every N minutes (first run immediately).
+
+    Each pass is incremental where the entity has updatedAt; full reconciles happen
+    every FULL_RECONCILE_MINUTES.
+    """
+    def sync_loop():
+        while True:
+            try:
+                logging.info("Background: Syncing DoorLoop mirror...")
+                results = sync_all()
+                logging.info("Background: DoorLoop mirror synced %s", results)
+            except Exception:
+                logging.exception("Background mirror sync failed (will retry)")
+            time.sleep(interval_minutes * 60)
+
+    # Start as daemon thread so it doesn't block app shutdown
+    thread = threading.Thread(target=sync_loop, daemon=True)
+    thread.start()
+    logging.info("Started background DoorLoop mirror sync every %d minutes", interval_minutes)
+    return thread
@@ -0,0 +1,89 @@
+"""
+In-process publish/subscribe for dashboard push updates.
+
+Publishers (mirror syncs, snapshot refreshes, webhooks) run on worker threads
+as well as on the event loop, so ``publish`` is thread-safe and hands events to
+each subscriber's loop with ``call_soon_threadsafe``. Subscribers are the SSE
+and WebSocket connections in ``app/main.py``.
+
+Recent events are kept in a short ring buffer so a reconnecting SSE client can
+resume from its ``Last-Event-ID`` instead of missing updates.
+"""
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+
+HISTORY_SIZE = 500
+SUBSCRIBER_QUEUE_SIZE = 256
+
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_history = deque(maxlen=HISTORY_SIZE)
+_subscribers = set()
+
+
+class Subscription:
+    """One connected client's queue of pending events."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _deliver(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A stalled client must not hold memory or block publishers
+            self.dropped += 1
+
+    async def get(self, timeout: float = None):
+        """Next event, or None when `timeout` seconds pass without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def subscribe(maxsize: int = SUBSCRIBER_QUEUE_SIZE) -> Subscription:
+    """Register a subscriber on the running event loop."""
+    subscription = Subscription(asyncio.get_running_loop(), maxsize=maxsize)
+    with _lock:
+        _subscribers.add(subscription)
+    return subscription
+
+
+def unsubscribe(subscription: Subscription):
+    with _lock:
+        _subscribers.discard(subscription)
+
+
+def publish(event_type: str, data) -> dict:
+    """Send an event to every subscriber. Safe to call from any thread."""
+    with _lock:
+        event = {"id": next(_ids), "type": event_type, "data": data, "time": time.time()}
+        _history.append(event)
+        subscribers = list(_subscribers)
+
+    for subscription in subscribers:
+        try:
+            subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+        except RuntimeError:
+            # The subscriber's loop has closed; it will never read again
+            unsubscribe(subscription)
+    logging.debug("Published %s event %d to %d subscriber(s)", event_type, event["id"], len(subscribers))
+    return event
+
+
+def events_since(last_event_id: int) -> list:
+    """Buffered events newer than `last_event_id` (oldest first)."""
+    with _lock:
+        return [event for event in _history if event["id"] > last_event_id]
+
+
+def subscriber_count() -> int:
+    with _lock:
+        return len(_subscribers)
@@ -0,0 +1,61 @@
+"""
+Conditional GET support (ETag / If-None-Match) for cached routes.
+
+ETags are derived from what identifies the data behind a response - snapshot
+or mirror generations - plus the request path and query string, so a route can
+answer a matching ``If-None-Match`` with 304 before fetching or serializing
+anything.
+
+A compressed response carries its own ETag variant (``"<tag>-gzip"``,
+``"<tag>-br"``, see ``encoded_etag``) because its bytes differ from the
+identity body; If-None-Match accepts any variant of the current tag.
+"""
+import hashlib
+
+from fastapi import Request, Response
+
+# Clients must revalidate every time, which is cheap since a match is a 304
+CACHE_CONTROL = "private, no-cache"
+ENCODINGS = ("gzip", "br")
+
+
+def make_etag(request: Request, *parts) -> str:
+    """Strong ETag for `request` given the generation `parts` it depends on."""
+    seed = "|".join([request.url.path, request.url.query, *(str(part) for part in parts)])
+    return '"' + hashlib.sha1(seed.encode("utf-8")).hexdigest() + '"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """The ETag of `etag`'s representation compressed with `encoding`."""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _identity_etag(tag: str) -> str:
+    # If-None-Match uses the weak comparison: a W/ prefix does not matter
+    tag = tag[2:] if tag.startswith("W/") else tag
+    for encoding in ENCODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True when the request's If-None-Match lists `etag` or one of its encoded variants (or is ``*``)."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in (_identity_etag(tag) for tag in candidates)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = CACHE_CONTROL
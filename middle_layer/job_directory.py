@@ -0,0 +1,110 @@
+"""
+Connecteam job directory: every job (and sub-job) keyed by id.
+
+The full job list is crawled once and kept in process as a ``JobDirectory``
+(see ``directory_cache``), refreshed in the background. Enriching shifts and
+tasks with job titles is then a dict lookup per row, never an upstream call
+inside a request.
+"""
+import sys
+from pathlib import Path
+
+from middle_layer.directory_cache import DirectoryCache
+
+PROJECT_ROOT = Path(__file__).absolute().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services import connecteam_api_client
+
+JOBS_DATASET = "jobs"
+# How long the in-process directory is served before the dataset is read again
+DIRECTORY_MAX_AGE_SECONDS = 900
+
+
+def _job_records(payload):
+    """Job dicts from a list_all_jobs payload (or a bare list)."""
+    if isinstance(payload, dict):
+        payload = payload.get("data", payload)
+    if isinstance(payload, dict):
+        payload = payload.get("jobs")
+    if not isinstance(payload, list):
+        return []
+    return [job for job in payload if isinstance(job, dict)]
+
+
+def _job_id(job):
+    return job.get("jobId") or job.get("id")
+
+
+class JobDirectory:
+    """id -> job index with parent links for sub-jobs."""
+
+    def __init__(self, payload=None):
+        self.payload = payload if payload is not None else {"data": {"jobs": []}}
+        self.jobs = {}
+        self.parents = {}
+        pending = [(job, None) for job in _job_records(payload)]
+        while pending:
+            job, parent_id = pending.pop()
+            job_id = _job_id(job)
+            if not job_id:
+                continue
+            self.jobs[job_id] = job
+            parent_id = job.get("parentId") or parent_id
+            if parent_id:
+                self.parents[job_id] = parent_id
+            for sub_job in job.get("subJobs") or job.get("subItems") or []:
+                if isinstance(sub_job, dict):
+                    pending.append((sub_job, job_id))
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def title(self, job_id):
+        job = self.jobs.get(job_id) if job_id else None
+        return job.get("title") if job else None
+
+    def label(self, job_id, sub_job_id=None):
+        """Display name, e.g. ``Cleaning / Unit 4`` for a sub-job under its parent job."""
+        if sub_job_id and sub_job_id in self.jobs:
+            parent = self.title(self.parents.get(sub_job_id) or job_id)
+            sub_title = self.title(sub_job_id)
+            return f"{parent} / {sub_title}" if parent and sub_title and parent != sub_title else sub_title
+        parent_id = self.parents.get(job_id)
+        if parent_id and self.title(parent_id) and self.title(job_id):
+            return f"{self.title(parent_id)} / {self.title(job_id)}"
+        return self.title(job_id)
+
+    def annotate(self, rows, id_key: str = "job_id", title_key: str = "job_title", sub_key: str = None):
+        """Add `title_key` to each row dict that has a known `id_key`; returns the rows."""
+        for row in rows:
+            if isinstance(row, dict) and row.get(id_key):
+                row[title_key] = self.label(row[id_key], row.get(sub_key) if sub_key else None)
+        return rows
+
+    def to_list(self) -> list:
+        return [
+            {"job_id": job_id, "title": job.get("title"), "code": job.get("code"),
+             "parent_id": self.parents.get(job_id), "deleted": bool(job.get("isDeleted"))}
+            for job_id, job in sorted(self.jobs.items(), key=lambda item: str(item[1].get("title") or ""))
+        ]
+
+
+_cache = DirectoryCache(JOBS_DATASET, JobDirectory, lambda: connecteam_api_client.list_all_jobs(),
+                        max_age=DIRECTORY_MAX_AGE_SECONDS)
+
+
+def get_directory(max_age: float = None, fetch_fn=None) -> JobDirectory:
+    """The in-process job directory (see DirectoryCache.get)."""
+    return _cache.get(max_age=max_age, fetch_fn=fetch_fn)
+
+
+def refresh(fetch_fn=None) -> JobDirectory:
+    """Re-crawl the job list now, bypassing the Redis copy."""
+    return _cache.refresh(fetch_fn=fetch_fn)
+
+
+def background_refresh(interval_minutes: int = 60):
+    return _cache.background_refresh(interval_minutes)
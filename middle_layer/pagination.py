@@ -0,0 +1,84 @@
+"""
+Cursor pagination and field projection for list routes.
+
+Cursors are opaque to clients: a URL-safe base64 encoding of a small JSON
+object. Mirror-backed routes put the keyset position (last sort value and id)
+in it; routes paging an in-memory dataset only need the offset. Both kinds
+carry the offset, so a cursor stays usable if a route falls back from the
+mirror to the cached dataset.
+"""
+import base64
+import binascii
+import json
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def encode_cursor(state: dict) -> str:
+    raw = json.dumps(state, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a cursor produced by encode_cursor. Raises ValueError when it is malformed."""
+    if not cursor:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {exc}")
+    if not isinstance(state, dict) or not isinstance(state.get("offset", 0), int) or state.get("offset", 0) < 0:
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def parse_fields(fields: str):
+    """Split a ``fields=a,b.c`` query value into a list of field paths (None = all fields)."""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return names or None
+
+
+def project(item, fields):
+    """Keep only `fields` of `item`; dotted paths (``address.city``) select nested keys.
+
+    Missing fields are left out rather than returned as null.
+    """
+    if not fields or not isinstance(item, dict):
+        return item
+    projected = {}
+    for path in fields:
+        value, found = item, True
+        for key in path.split("."):
+            if isinstance(value, dict) and key in value:
+                value = value[key]
+            else:
+                found = False
+                break
+        if not found:
+            continue
+        target = projected
+        keys = path.split(".")
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return projected
+
+
+def paginate(items, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, fields=None, offset: int = 0) -> dict:
+    """Page through an in-memory list.
+
+    Returns ``{"data": [...], "total": N, "next_cursor": str or None}`` with
+    `fields` projected onto each item of the page only.
+    """
+    items = items if isinstance(items, list) else []
+    start = decode_cursor(cursor).get("offset", 0) if cursor else offset
+    end = start + limit
+    page = items[start:end]
+    return {
+        "data": [project(item, fields) for item in page],
+        "total": len(items),
+        "next_cursor": encode_cursor({"offset": end}) if end < len(items) else None,
+    }
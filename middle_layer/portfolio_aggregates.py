@@ -0,0 +1,133 @@
+"""
+Columnar portfolio KPIs for the /tenants overview.
+
+Leases, lease payments and properties are loaded once into numpy/pandas
+columns and every KPI (rent due, overdue, active leases, vacancy, monthly
+revenue) is computed in one vectorized pass. Results are memoized per refresh
+generation, so repeat overview requests are a single lookup.
+"""
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Monthly revenue series length shown on the dashboard
+REVENUE_MONTHS = 12
+
+
+def _records(payload):
+    """List of entity dicts from a DoorLoop list payload (or a bare list)."""
+    if isinstance(payload, tuple) and payload:
+        payload = payload[0]
+    if isinstance(payload, dict):
+        payload = payload.get("data")
+    if not isinstance(payload, list):
+        return []
+    return [item for item in payload if isinstance(item, dict)]
+
+
+def _column(records, key, default=None):
+    return [rec.get(key, default) for rec in records]
+
+
+def _float_column(records, *keys):
+    """Numeric column from the first present key, with missing/invalid values as 0."""
+    values = [next((rec.get(k) for k in keys if rec.get(k) is not None), 0) for rec in records]
+    return pd.to_numeric(pd.Series(values, dtype="object"), errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+
+def lease_frame(lease_payload) -> pd.DataFrame:
+    records = _records(lease_payload)
+    return pd.DataFrame({
+        "id": _column(records, "id"),
+        "status": pd.Series(_column(records, "status", ""), dtype="object").fillna("").str.upper(),
+        "total_balance_due": _float_column(records, "totalBalanceDue"),
+        "overdue_balance": _float_column(records, "overdueBalance"),
+        "recurring_rent": _float_column(records, "totalRecurringRent"),
+        "tenants": [rec.get("tenants") or [] for rec in records],
+        "units": [rec.get("units") or [] for rec in records],
+    })
+
+
+def payment_frame(payment_payload) -> pd.DataFrame:
+    records = _records(payment_payload)
+    return pd.DataFrame({
+        "date": pd.to_datetime(pd.Series(_column(records, "date"), dtype="object"), errors="coerce", utc=True),
+        "amount": _float_column(records, "amountReceived", "amount"),
+    })
+
+
+def property_frame(property_payload) -> pd.DataFrame:
+    records = _records(property_payload)
+    return pd.DataFrame({
+        "id": _column(records, "id"),
+        "active": np.array([rec.get("active", True) is not False for rec in records], dtype=bool),
+        "units": _float_column(records, "numActiveUnits"),
+    })
+
+
+def compute_overview(prop_raw_data, tenant_raw_data, lease_raw_data, payment_raw_data=None) -> dict:
+    """Portfolio KPIs for the /tenants overview.
+
+    Returns a dict with total_properties, active_tenant_ids, active_lease_ids,
+    total_rent_due, overdue_balance, total_units, occupied_units, vacant_units,
+    month_list and rent_list.
+    """
+    leases = lease_frame(lease_raw_data)
+    properties = property_frame(prop_raw_data)
+    payments = payment_frame(payment_raw_data)
+    known_tenants = {t.get("id") for t in _records(tenant_raw_data)}
+
+    active = (leases["status"] == "ACTIVE").to_numpy() if len(leases) else np.zeros(0, dtype=bool)
+    active_leases = leases[active]
+
+    # Tenants and units are list-valued per lease; explode once, then dedupe in bulk
+    active_tenant_ids = active_leases["tenants"].explode().dropna()
+    if known_tenants:
+        active_tenant_ids = active_tenant_ids[active_tenant_ids.isin(known_tenants)]
+    occupied_units = active_leases["units"].explode().dropna().nunique()
+
+    total_units = int(properties.loc[properties["active"], "units"].sum()) if len(properties) else 0
+    if total_units == 0:
+        # numActiveUnits missing: count every unit that appears on any lease
+        total_units = int(leases["units"].explode().dropna().nunique()) if len(leases) else 0
+
+    month_list, rent_list = [], []
+    dated = payments.dropna(subset=["date"])
+    if len(dated):
+        months = dated["date"].dt.tz_localize(None).dt.to_period("M")
+        monthly = dated["amount"].groupby(months).sum().sort_index().iloc[-REVENUE_MONTHS:]
+        month_list = [period.strftime("%b %Y") for period in monthly.index]
+        rent_list = [round(float(value), 2) for value in monthly.to_numpy()]
+
+    return {
+        "total_properties": int(properties["active"].sum()) if len(properties) else 0,
+        "active_tenant_ids": active_tenant_ids.unique().tolist(),
+        "active_lease_ids": active_leases["id"].tolist(),
+        "total_rent_due": float(active_leases["total_balance_due"].sum()),
+        "overdue_balance": float(leases["overdue_balance"].sum()),
+        "total_units": total_units,
+        "occupied_units": int(occupied_units),
+        "vacant_units": max(total_units - int(occupied_units), 0),
+        "month_list": month_list,
+        "rent_list": rent_list,
+    }
+
+
+_memo_lock = threading.Lock()
+_memo = {"key": None, "overview": None}
+
+
+def get_overview(prop_raw_data, tenant_raw_data, lease_raw_data, payment_raw_data=None, generation_key=None) -> dict:
+    """compute_overview, memoized while `generation_key` (the refresh generation) is unchanged."""
+    with _memo_lock:
+        if generation_key is not None and _memo["key"] == generation_key:
+            return _memo["overview"]
+
+    overview = compute_overview(prop_raw_data, tenant_raw_data, lease_raw_data, payment_raw_data)
+    logging.info("Computed portfolio overview for generation %s", generation_key)
+    if generation_key is not None:
+        with _memo_lock:
+            _memo.update(key=generation_key, overview=overview)
+    return overview
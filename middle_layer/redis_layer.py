@@ -1,7 +1,9 @@
 from redis import Redis
 from dotenv import load_dotenv
 import os , logging , sys , threading, time
+import json
 from pathlib import Path
+from utils import metrics, tracing
 
 load_dotenv()
 try:
@@ -11,6 +13,7 @@ except ModuleNotFoundError:
     logging.warning("redis package not installed in the active Python environment — bridge.py will continue without Redis. Install 'redis' into your environment to enable Redis features.")
 
 
+@tracing.traced()
 def cache_tenants_to_redis(data, ttl: int = 3600):
     """Batch cache tenant data to Redis with TTL (fast write).
     
@@ -33,6 +36,7 @@ def cache_tenants_to_redis(data, ttl: int = 3600):
         return None
     return True
 
+@tracing.traced()
 def cache_data_retireive(prefix_str:str):
     keys = []
     try :
@@ -42,12 +46,14 @@ def cache_data_retireive(prefix_str:str):
         for key in keys:
             item = redis.json().get(key)
             result.append(item)
+        metrics.record_cache(prefix_str, "hit" if result else "miss")
         return result
     except Exception as e:
         logging.exception("Failed to retrieve cached data")
         return []
         
     
+@tracing.traced()
 def cache_properties_to_redis(property_data: dict, ttl: int = 3600):
     """Cache property details to Redis by property_id (fast lookups).
     
@@ -71,6 +77,7 @@ def cache_properties_to_redis(property_data: dict, ttl: int = 3600):
         return False
 
 
+@tracing.traced()
 def get_cached_property(property_id: str):
     """Retrieve cached property data from Redis (1 lookup instead of API call)."""
     if not isinstance(redis,Redis):
@@ -81,14 +88,119 @@ def get_cached_property(property_id: str):
         cached = redis.json().get(key)
         if cached:
             logging.debug("Cache hit for property %s", property_id)
+            metrics.record_cache(key, "hit")
             return cached
         logging.debug("Cache miss for property %s", property_id)
+        metrics.record_cache(key, "miss")
         return None
     except Exception:
         logging.exception("Failed to retrieve property from Redis")
         return None
 
 
+@tracing.traced()
+def cache_dataset(name: str, payload, ttl: int = 900):
+    """Cache a whole upstream payload (e.g. a DoorLoop list response) as one JSON string.
+    
+    Stored under ``dataset:<name>`` so it can be read back in a single GET.
+    ttl: time-to-live in seconds (default 15 minutes); None keeps it until evicted.
+    """
+    if payload is None or not isinstance(redis, Redis):
+        return False
+    
+    try:
+        if ttl is None:
+            redis.set(f"dataset:{name}", json.dumps(payload))
+        else:
+            redis.setex(f"dataset:{name}", ttl, json.dumps(payload))
+        return True
+    except Exception:
+        logging.exception("Failed to cache dataset %s to Redis", name)
+        return False
+
+
+@tracing.traced()
+def get_cached_dataset(name: str):
+    """Retrieve a payload stored with ``cache_dataset``; None on miss or when Redis is down."""
+    if not isinstance(redis, Redis):
+        return None
+    
+    try:
+        cached = redis.get(f"dataset:{name}")
+        if cached:
+            logging.debug("Cache hit for dataset %s", name)
+            metrics.record_cache(name, "hit")
+            return json.loads(cached)
+        logging.debug("Cache miss for dataset %s", name)
+        metrics.record_cache(name, "miss")
+        return None
+    except Exception:
+        logging.exception("Failed to retrieve dataset %s from Redis", name)
+        return None
+
+
+@tracing.traced()
+def replace_cached_dataset(name: str, payload) -> bool:
+    """Overwrite an existing ``cache_dataset`` entry, keeping its remaining TTL.
+
+    Does nothing (returns False) when the entry has expired or Redis is down.
+    """
+    if payload is None or not isinstance(redis, Redis):
+        return False
+
+    try:
+        return bool(redis.set(f"dataset:{name}", json.dumps(payload), xx=True, keepttl=True))
+    except Exception:
+        logging.exception("Failed to replace cached dataset %s in Redis", name)
+        return False
+
+
+@tracing.traced()
+def delete_cached_datasets(prefix: str) -> int:
+    """Delete ``dataset:<prefix>`` and every ``dataset:<prefix>:*`` key. Returns how many were removed."""
+    if not isinstance(redis, Redis):
+        return 0
+    
+    try:
+        keys = [f"dataset:{prefix}", *redis.scan_iter(match=f"dataset:{prefix}:*")]
+        return redis.delete(*keys)
+    except Exception:
+        logging.exception("Failed to delete cached datasets %s", prefix)
+        return 0
+
+
+@tracing.traced()
+def push_change(name: str, entry: dict, max_entries: int, ttl: int = 86400) -> bool:
+    """Prepend `entry` to the ``changes:<name>`` log, keeping the newest `max_entries`."""
+    if not isinstance(redis, Redis):
+        return False
+
+    try:
+        key = f"changes:{name}"
+        pipe = redis.pipeline()
+        pipe.lpush(key, json.dumps(entry))
+        pipe.ltrim(key, 0, max_entries - 1)
+        pipe.expire(key, ttl)
+        pipe.execute()
+    except Exception:
+        logging.exception("Failed to append change log entry for %s", name)
+        return False
+    return True
+
+
+@tracing.traced()
+def get_changes(name: str):
+    """Entries of the ``changes:<name>`` log, newest first; None when Redis is unavailable."""
+    if not isinstance(redis, Redis):
+        return None
+
+    try:
+        return [json.loads(raw) for raw in redis.lrange(f"changes:{name}", 0, -1)]
+    except Exception:
+        logging.exception("Failed to read change log for %s", name)
+        return None
+
+
 # Background refresh functions
 
 def background_refresh_tenants(data_fetch_fn, interval_minutes: int = 60):
@@ -103,9 +215,11 @@ def background_refresh_tenants(data_fetch_fn, interval_minutes: int = 60):
             try:
                 time.sleep(interval_minutes * 60)  # Wait N minutes
                 logging.info("Background: Refreshing tenant cache...")
-                fresh_data = data_fetch_fn()
+                with metrics.time_refresh("redis_tenants"):
+                    fresh_data = data_fetch_fn()
+                    if fresh_data:
+                        cache_tenants_to_redis(fresh_data, ttl=3600)
                 if fresh_data:
-                    cache_tenants_to_redis(fresh_data, ttl=3600)
                     logging.info("Background: Tenant cache refreshed with %d items", len(fresh_data))
                 else:
                     logging.warning("Background: No fresh data returned from fetch function")
@@ -132,6 +246,7 @@ def background_refresh_properties(property_ids_fetch_fn, data_fetch_fn, interval
             try:
                 time.sleep(interval_minutes * 60)  # Wait N minutes
                 logging.info("Background: Refreshing property cache...")
+                started = time.perf_counter()
                 property_ids = property_ids_fetch_fn()[:10]  # Limit to top 10 to avoid overload
                 
                 property_data = {}
@@ -146,6 +261,7 @@ def background_refresh_properties(property_ids_fetch_fn, data_fetch_fn, interval
                 
                 if property_data:
                     cache_properties_to_redis(property_data, ttl=3600)
+                    metrics.REFRESH_SECONDS.labels(job="redis_properties", outcome="ok").observe(time.perf_counter() - started)
                     logging.info("Background: Property cache refreshed with %d items", len(property_data))
                 else:
                     logging.warning("Background: No property data to cache")
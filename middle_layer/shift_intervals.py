@@ -0,0 +1,190 @@
+"""
+Payroll audit over shift intervals: overlaps, gaps, coverage and auto clock-outs.
+
+Everything starts from one sort of the shift frame by (user, start), which is
+O(n log n). A single sweep then carries each user's running maximum end time:
+
+- a shift that starts before that running end overlaps an earlier shift (the
+  one that produced the running end);
+- a shift that starts after it opens a new merged interval;
+- the space between consecutive merged intervals is a gap.
+
+``ShiftIntervalIndex`` keeps each user's merged intervals with cumulative
+durations. Coverage of any window and "who is on the clock at t" are then a
+pair of binary searches per user, not a scan of the shifts.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import tracing
+
+DEFAULT_MIN_GAP_MINUTES = 15
+# Gaps longer than this are time off between work days, not a break to flag
+DEFAULT_MAX_GAP_HOURS = 4
+
+
+def _iso(timestamp) -> str:
+    return datetime.datetime.fromtimestamp(float(timestamp), datetime.timezone.utc).isoformat()
+
+
+def _shift_row(frame: pd.DataFrame, position: int) -> dict:
+    row = frame.iloc[position]
+    return {
+        "shift_id": row["shift_id"],
+        "user_id": row["user_id"],
+        "job_id": row["job_id"],
+        "sub_job_id": row["sub_job_id"],
+        "time_clock_id": row["time_clock_id"],
+        "start": _iso(row["start"]),
+        "end": _iso(row["end"]) if pd.notna(row["end"]) else None,
+    }
+
+
+def _sorted_closed(frame: pd.DataFrame) -> pd.DataFrame:
+    """Closed shifts sorted by (user, start, end), with a string user key for grouping."""
+    closed = frame[frame["end"].notna() & (frame["end"] >= frame["start"])].copy()
+    closed["user_key"] = closed["user_id"].astype(str)
+    return closed.sort_values(["user_key", "start", "end"], kind="mergesort").reset_index(drop=True)
+
+
+def sweep(frame: pd.DataFrame) -> pd.DataFrame:
+    """Sorted closed shifts with sweep columns.
+
+    prev_end      running max end of the user's earlier shifts (NaN for the first)
+    prev_holder   position of the shift that set prev_end
+    overlaps      shift starts before prev_end
+    interval      id of the merged (union) interval the shift belongs to
+    """
+    shifts = _sorted_closed(frame)
+    if not len(shifts):
+        return shifts.assign(prev_end=[], prev_holder=[], overlaps=[], interval=[])
+    by_user = shifts.groupby("user_key", sort=False)
+    running_end = by_user["end"].cummax()
+    positions = np.arange(len(shifts), dtype=float)
+    holder = pd.Series(np.where(shifts["end"].to_numpy() == running_end.to_numpy(), positions, np.nan))
+    holder = holder.groupby(shifts["user_key"], sort=False).ffill()
+
+    shifts["prev_end"] = running_end.groupby(shifts["user_key"], sort=False).shift()
+    shifts["prev_holder"] = holder.groupby(shifts["user_key"], sort=False).shift()
+    shifts["overlaps"] = (shifts["start"] < shifts["prev_end"]).to_numpy()
+    starts_interval = shifts["prev_end"].isna() | (shifts["start"] > shifts["prev_end"])
+    shifts["interval"] = np.cumsum(starts_interval.to_numpy())
+    return shifts
+
+
+def merged_intervals(swept: pd.DataFrame) -> pd.DataFrame:
+    """Union of each user's shifts: user_key, user_id, start, end, shifts."""
+    if not len(swept):
+        return pd.DataFrame({"user_key": [], "user_id": [], "start": [], "end": [], "shifts": []})
+    return swept.groupby("interval", sort=True).agg(
+        user_key=("user_key", "first"),
+        user_id=("user_id", "first"),
+        start=("start", "min"),
+        end=("end", "max"),
+        shifts=("start", "size"),
+    ).reset_index(drop=True)
+
+
+class ShiftIntervalIndex:
+    """Per-user merged intervals with prefix sums for O(log n) coverage queries."""
+
+    def __init__(self, merged: pd.DataFrame):
+        self._users = {}
+        for user_key, group in merged.groupby("user_key", sort=False):
+            starts = group["start"].to_numpy(dtype=float)
+            ends = group["end"].to_numpy(dtype=float)
+            self._users[user_key] = (group["user_id"].iloc[0], starts, ends,
+                                     np.concatenate(([0.0], np.cumsum(ends - starts))))
+
+    @classmethod
+    def from_shifts(cls, frame: pd.DataFrame) -> "ShiftIntervalIndex":
+        return cls(merged_intervals(sweep(frame)))
+
+    def users(self) -> list:
+        return [entry[0] for entry in self._users.values()]
+
+    def covered_seconds(self, user_id, window_start: float, window_end: float) -> float:
+        """Seconds of [window_start, window_end) the user was on the clock."""
+        entry = self._users.get(str(user_id))
+        if entry is None or window_end <= window_start:
+            return 0.0
+        _, starts, ends, cumulative = entry
+        first = int(np.searchsorted(ends, window_start, side="right"))
+        last = int(np.searchsorted(starts, window_end, side="left"))
+        if first >= last:
+            return 0.0
+        total = cumulative[last] - cumulative[first]
+        total -= max(0.0, window_start - starts[first])
+        total -= max(0.0, ends[last - 1] - window_end)
+        return float(total)
+
+    def on_clock(self, at: float) -> list:
+        """Users with a shift covering the instant `at`."""
+        present = []
+        for user_id, starts, ends, _ in self._users.values():
+            position = int(np.searchsorted(starts, at, side="right")) - 1
+            if position >= 0 and ends[position] > at:
+                present.append(user_id)
+        return present
+
+
+@tracing.traced()
+def audit(frame: pd.DataFrame, min_gap_minutes: float = DEFAULT_MIN_GAP_MINUTES,
+          max_gap_hours: float = DEFAULT_MAX_GAP_HOURS, at: float = None) -> dict:
+    """Overlapping shifts, gaps between shifts, per-user coverage, auto clock-outs and open shifts."""
+    swept = sweep(frame)
+    merged = merged_intervals(swept)
+
+    overlaps = []
+    for position in np.flatnonzero(swept["overlaps"].to_numpy(dtype=bool)):
+        other = int(swept["prev_holder"].iat[position])
+        overlap_end = min(swept["end"].iat[position], swept["prev_end"].iat[position])
+        overlaps.append({
+            "user_id": swept["user_id"].iat[position],
+            "shift": _shift_row(swept, position),
+            "overlaps_with": _shift_row(swept, other),
+            "overlap_minutes": round(float(overlap_end - swept["start"].iat[position]) / 60, 1),
+        })
+
+    gaps = []
+    if len(merged):
+        next_start = merged.groupby("user_key", sort=False)["start"].shift(-1)
+        gap_seconds = (next_start - merged["end"]).to_numpy()
+        flagged = (gap_seconds >= min_gap_minutes * 60) & (gap_seconds <= max_gap_hours * 3600)
+        for position in np.flatnonzero(flagged):
+            gaps.append({
+                "user_id": merged["user_id"].iat[position],
+                "from": _iso(merged["end"].iat[position]),
+                "to": _iso(next_start.iat[position]),
+                "gap_minutes": round(float(gap_seconds[position]) / 60, 1),
+            })
+
+    coverage = []
+    if len(swept):
+        worked = (swept["end"] - swept["start"]).groupby(swept["user_key"], sort=True).sum()
+        covered = (merged["end"] - merged["start"]).groupby(merged["user_key"], sort=True).sum()
+        users = swept.groupby("user_key", sort=True).agg(user_id=("user_id", "first"), shifts=("start", "size"))
+        for user_key, row in users.iterrows():
+            worked_hours, covered_hours = float(worked[user_key]) / 3600, float(covered[user_key]) / 3600
+            coverage.append({
+                "user_id": row["user_id"],
+                "shifts": int(row["shifts"]),
+                "worked_hours": round(worked_hours, 2),
+                "covered_hours": round(covered_hours, 2),
+                "overlap_hours": round(worked_hours - covered_hours, 2),
+            })
+
+    flags = frame["auto_clock_out"].to_numpy(dtype=bool)
+    open_shifts = frame["end"].isna().to_numpy()
+    result = {
+        "overlaps": overlaps,
+        "gaps": gaps,
+        "coverage": coverage,
+        "auto_clock_outs": [_shift_row(frame, position) for position in np.flatnonzero(flags)],
+        "open_shifts": [_shift_row(frame, position) for position in np.flatnonzero(open_shifts)],
+    }
+    if at is not None:
+        result["on_clock"] = {"at": _iso(at), "user_ids": ShiftIntervalIndex(merged).on_clock(at)}
+    return result
@@ -0,0 +1,220 @@
+"""
+Record-level change sets between snapshot generations.
+
+Every refresh replaces a cached dataset wholesale. When snapshot_store saves
+new content, the previous and new payloads are compared record by record,
+matched on entity id and a content hash of each record:
+
+    added     records whose id is new
+    removed   records whose id is gone
+    changed   records whose content hash differs
+
+Each change set is appended to a bounded per-dataset log (Redis list
+``changes:<dataset>``, or an in-process deque without Redis), so
+``since(dataset, generation)`` can answer "what changed after generation N"
+with only the deltas. When the log no longer reaches back that far, or a
+dataset has no per-record ids, the answer is ``reset`` and the client
+reloads the full dataset through REST.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from middle_layer import redis_layer, snapshot_store
+from utils import tracing
+
+CHANGE_LOG_SIZE = int(os.getenv("SNAPSHOT_CHANGE_LOG_SIZE", "50"))
+# Bigger change sets are logged as a reset: reloading the dataset is cheaper
+MAX_CHANGES_PER_ENTRY = 5000
+
+# dataset prefix -> (list key under "data", id field); DoorLoop lists are bare "data" lists keyed by "id"
+RECORD_KEYS = {
+    "tasks": ("tasks", "id"),
+    "users": ("users", "userId"),
+    "jobs": ("jobs", "jobId"),
+}
+DEFAULT_RECORD_KEY = (None, "id")
+
+_local_lock = threading.Lock()
+# dataset -> deque of change log entries, newest first (used when Redis is unavailable)
+_local_logs = {}
+# dataset -> (payload, {record id: content hash}) of the last payload diffed
+_hashes = {}
+# callables (dataset, previous payload, new payload, generation, change set or None)
+_listeners = []
+
+
+def _record_spec(dataset: str):
+    return RECORD_KEYS.get(dataset.split(":", 1)[0], DEFAULT_RECORD_KEY)
+
+
+def content_hash(record) -> str:
+    body = json.dumps(record, separators=(",", ":"), sort_keys=True, default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
+
+
+def records_by_id(dataset: str, payload):
+    """{record id: record} for `payload`, or None when its records can't be told apart by id."""
+    list_key, id_key = _record_spec(dataset)
+    if isinstance(payload, dict):
+        payload = payload.get("data", payload)
+    if isinstance(payload, dict) and list_key:
+        payload = payload.get(list_key)
+    if not isinstance(payload, list):
+        return None
+
+    records = {}
+    for record in payload:
+        if not isinstance(record, dict):
+            continue
+        record_id = record.get(id_key)
+        if record_id is None or isinstance(record_id, (dict, list)):
+            return None
+        records[record_id] = record
+    return records
+
+
+def diff(dataset: str, previous, payload):
+    """Change set between two payloads of `dataset`.
+
+    Returns ``{"added": [record], "removed": [record], "changed": [(before, after)]}``
+    in payload order, or None when either payload has no per-record ids.
+    The new payload's hashes are kept, so diffing the next generation against
+    it only hashes the new side.
+    """
+    before, after = records_by_id(dataset, previous), records_by_id(dataset, payload)
+    if before is None or after is None:
+        return None
+
+    memo = _hashes.get(dataset)
+    if memo and memo[0] is previous:
+        before_hashes = memo[1]
+    else:
+        before_hashes = {record_id: content_hash(record) for record_id, record in before.items()}
+    after_hashes = {record_id: content_hash(record) for record_id, record in after.items()}
+    _hashes[dataset] = (payload, after_hashes)
+
+    change = {"added": [], "removed": [], "changed": []}
+    for record_id, record in after.items():
+        if record_id not in before:
+            change["added"].append(record)
+        elif before_hashes.get(record_id) != after_hashes[record_id]:
+            change["changed"].append((before[record_id], record))
+    change["removed"] = [record for record_id, record in before.items() if record_id not in after]
+    return change
+
+
+def _log_entry(dataset: str, change, generation: int) -> dict:
+    entry = {"generation": generation, "previous_generation": generation - 1, "saved_at": time.time(),
+             "reset": True, "added": [], "changed": [], "removed": []}
+    size = sum(len(change[kind]) for kind in ("added", "removed", "changed")) if change is not None else 0
+    if change is None or size > MAX_CHANGES_PER_ENTRY:
+        return entry
+    id_key = _record_spec(dataset)[1]
+    entry.update(reset=False, added=change["added"], changed=[after for _, after in change["changed"]],
+                 removed=[record.get(id_key) for record in change["removed"]])
+    return entry
+
+
+def append_change(dataset: str, entry: dict):
+    with _local_lock:
+        log = _local_logs.setdefault(dataset, deque(maxlen=CHANGE_LOG_SIZE))
+        log.appendleft(entry)
+    redis_layer.push_change(dataset, entry, CHANGE_LOG_SIZE)
+
+
+def change_log(dataset: str) -> list:
+    """Logged change entries for `dataset`, newest first."""
+    entries = redis_layer.get_changes(dataset)
+    if entries is not None:
+        return entries
+    with _local_lock:
+        return list(_local_logs.get(dataset) or ())
+
+
+def _empty(dataset: str, since_generation: int, current: int, reset: bool) -> dict:
+    return {"dataset": dataset, "since": since_generation, "generation": current, "reset": reset,
+            "added": [], "changed": [], "removed": []}
+
+
+@tracing.traced()
+def since(dataset: str, since_generation: int) -> dict:
+    """Net record deltas of `dataset` from `since_generation` to its current generation.
+
+    ``reset`` is True when the change log can't bridge that span; the caller
+    should then reload the whole dataset.
+    """
+    current = snapshot_store.generation(dataset)
+    result = _empty(dataset, since_generation, current, reset=False)
+    if since_generation == current:
+        return result
+    if since_generation <= 0 or since_generation > current:
+        return _empty(dataset, since_generation, current, reset=True)
+
+    entries = [entry for entry in reversed(change_log(dataset)) if entry["generation"] > since_generation]
+    expected = since_generation
+    for entry in entries:
+        if entry["reset"] or entry["previous_generation"] != expected:
+            return _empty(dataset, since_generation, current, reset=True)
+        expected = entry["generation"]
+    if expected != current:
+        return _empty(dataset, since_generation, current, reset=True)
+
+    # record id -> (kind, record or id), folded oldest to newest
+    id_key = _record_spec(dataset)[1]
+    net = {}
+    for entry in entries:
+        for record in entry["added"]:
+            record_id = record.get(id_key)
+            net[record_id] = ("changed" if record_id in net and net[record_id][0] == "removed" else "added", record)
+        for record in entry["changed"]:
+            record_id = record.get(id_key)
+            net[record_id] = ("added" if record_id in net and net[record_id][0] == "added" else "changed", record)
+        for record_id in entry["removed"]:
+            if record_id in net and net[record_id][0] == "added":
+                del net[record_id]
+            else:
+                net[record_id] = ("removed", record_id)
+
+    for kind, value in net.values():
+        result[kind].append(value)
+    return result
+
+
+def add_listener(listener):
+    """Call `listener(dataset, previous, payload, generation, change)` after each logged change.
+
+    `change` is the ``diff`` result, or None for a first snapshot or a dataset
+    without per-record ids.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def on_snapshot_saved(dataset: str, previous, payload, generation: int):
+    """snapshot_store listener: diff against the previous generation and log the change set."""
+    change = diff(dataset, previous, payload) if previous is not None else None
+    if change is not None:
+        logging.debug("%s generation %d: %d added, %d changed, %d removed", dataset, generation,
+                      len(change["added"]), len(change["changed"]), len(change["removed"]))
+    append_change(dataset, _log_entry(dataset, change, generation))
+
+    for listener in list(_listeners):
+        try:
+            listener(dataset, previous, payload, generation, change)
+        except Exception:
+            logging.exception("Snapshot change listener failed for %s", dataset)
+
+
+def clear():
+    """Forget logged changes and hashes; used by tests."""
+    with _local_lock:
+        _local_logs.clear()
+    _hashes.clear()
+
+
+snapshot_store.add_listener(on_snapshot_saved)
@@ -0,0 +1,456 @@
+"""
+Last-known-good snapshots of upstream datasets, kept on local disk.
+
+Every successful vendor fetch (tenants, leases, properties, tasks, users) is
+written to ``SNAPSHOT_DIR/<dataset>.snap``. Each file starts with a fixed
+binary header, then the dataset name (file names are sanitized, so
+``tasks:all`` lives in ``tasks-all.snap``), then the JSON payload:
+
+    magic (4s) | format version (H) | generation (Q) | saved_at (d) | length (Q) | sha1 (20s) | name length (H)
+
+Format 1 files (no name) are still read, named after their file.
+
+The generation is bumped only when the payload content changes, so it doubles
+as a cheap "has this dataset changed" marker. Files are read through ``mmap``
+so checking a header does not pull the whole payload into memory.
+
+Routes use these snapshots when both the primary client and the MCP fallback
+fail, and ``warm_cache`` pushes them back into Redis at startup so the first
+requests after a deploy do not trigger a vendor crawl.
+"""
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).absolute().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from middle_layer import redis_layer
+from utils import tracing
+
+SNAPSHOT_DIR = Path(os.getenv("SNAPSHOT_DIR", str(PROJECT_ROOT / ".snapshots")))
+SNAPSHOT_MAGIC = b"MSNP"
+SNAPSHOT_FORMAT_VERSION = 2
+_HEADER = struct.Struct("<4sHQdQ20sH")
+_HEADER_V1 = struct.Struct("<4sHQdQ20s")
+# Enough to cover the header and any dataset name
+_HEADER_READ_SIZE = 1024
+
+# Redis TTL (seconds) used when a dataset is cached or re-warmed from disk.
+DATASET_TTL = {
+    "tenants": 1800,
+    "leases": 1800,
+    "properties": 3600,
+    "tenant_rows": 1800,
+    "tasks": 600,
+    "users": 1800,
+    "jobs": 3600,
+    "taskboards": 3600,
+    "time_clocks": 3600,
+}
+DEFAULT_TTL = 900
+
+_write_lock = threading.Lock()
+# dataset -> (generation, saved_at, payload); avoids re-parsing an unchanged file
+_loaded = {}
+# dataset -> time of the last successful upstream fetch in this process
+_verified = {}
+# callables (dataset, previous payload or None, new payload, generation) run after a content change
+_listeners = []
+# dataset -> lock serializing patch_dataset's read-patch-write, so concurrent patches don't drop each other
+_patch_locks = {}
+_patch_locks_lock = threading.Lock()
+
+# Single-flight: dataset -> _Flight of the upstream fetch currently running for it
+_inflight = {}
+_inflight_lock = threading.Lock()
+# How long a follower waits for the leader's fetch before fetching itself
+INFLIGHT_WAIT_SECONDS = 60
+# Per-request dataset memo, set by shared_fetches() (e.g. for /api/batch)
+_request_scope = contextvars.ContextVar("snapshot_request_scope", default=None)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.payload = None
+        self.error = None
+
+
+def _dataset_ttl(dataset: str) -> int:
+    return DATASET_TTL.get(dataset.split(":", 1)[0], DEFAULT_TTL)
+
+
+def _snapshot_path(dataset: str) -> Path:
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]", "-", dataset)
+    return SNAPSHOT_DIR / f"{safe_name}.snap"
+
+
+def _digest(body: bytes) -> bytes:
+    return hashlib.sha1(body).digest()
+
+
+def is_error_payload(payload) -> bool:
+    """True for the ``{"error": ...}`` dicts the API clients return instead of raising."""
+    return payload is None or (isinstance(payload, dict) and "error" in payload)
+
+
+def _unpack_header(buf, path: Path):
+    """Header fields from the start of a snapshot file, or None when it is not a valid snapshot."""
+    if len(buf) < _HEADER_V1.size:
+        return None
+    magic, version = struct.unpack_from("<4sH", buf)
+    if magic != SNAPSHOT_MAGIC or version not in (1, SNAPSHOT_FORMAT_VERSION):
+        logging.warning("Ignoring snapshot %s with unknown header (version %s)", path, version)
+        return None
+    if version == 1:
+        _, _, generation, saved_at, length, digest = _HEADER_V1.unpack_from(buf)
+        name, offset = path.stem, _HEADER_V1.size
+    else:
+        if len(buf) < _HEADER.size:
+            return None
+        _, _, generation, saved_at, length, digest, name_length = _HEADER.unpack_from(buf)
+        offset = _HEADER.size + name_length
+        if len(buf) < offset:
+            return None
+        name = bytes(buf[_HEADER.size:offset]).decode("utf-8", "replace")
+    return {
+        "dataset": name,
+        "generation": generation,
+        "saved_at": saved_at,
+        "length": length,
+        "digest": digest,
+        "offset": offset,
+    }
+
+
+def _read_header_file(path: Path):
+    try:
+        with open(path, "rb") as fh:
+            raw = fh.read(_HEADER_READ_SIZE)
+    except FileNotFoundError:
+        return None
+    except OSError:
+        logging.exception("Failed to read snapshot header %s", path)
+        return None
+    return _unpack_header(raw, path)
+
+
+def read_header(dataset: str):
+    """Return the snapshot header for `dataset` as a dict, or None if there is no valid snapshot."""
+    header = _read_header_file(_snapshot_path(dataset))
+    return {**header, "dataset": dataset} if header else None
+
+
+def generation(dataset: str) -> int:
+    """Current generation of `dataset` (0 when nothing has been saved yet)."""
+    header = read_header(dataset)
+    return header["generation"] if header else 0
+
+
+def generation_key(*datasets: str):
+    """Tuple of generations identifying one data refresh across `datasets`.
+
+    None when any of them has never been snapshotted, since there is then no
+    refresh identity to memoize derived data on.
+    """
+    key = tuple(generation(name) for name in datasets)
+    return None if 0 in key else key
+
+
+@tracing.traced()
+def load_snapshot(dataset: str):
+    """Load the last-known-good payload for `dataset`.
+
+    Returns a dict with ``payload``, ``generation`` and ``saved_at`` keys, or
+    None when no usable snapshot exists.
+    """
+    path = _snapshot_path(dataset)
+    try:
+        with open(path, "rb") as fh:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                header = _unpack_header(mm[:_HEADER_READ_SIZE], path)
+                if header is None:
+                    return None
+                gen, saved_at, length, offset = header["generation"], header["saved_at"], header["length"], header["offset"]
+
+                memo = _loaded.get(dataset)
+                if memo and memo[0] == gen and memo[1] == saved_at:
+                    payload = memo[2]
+                else:
+                    body = mm[offset:offset + length]
+                    if len(body) != length or _digest(body) != header["digest"]:
+                        logging.warning("Snapshot %s is truncated or corrupt; ignoring it", path)
+                        return None
+                    payload = json.loads(body)
+                    _loaded[dataset] = (gen, saved_at, payload)
+    except (FileNotFoundError, ValueError):
+        # ValueError: mmap of an empty file
+        return None
+    except Exception:
+        logging.exception("Failed to load snapshot for %s", dataset)
+        return None
+
+    return {"dataset": dataset, "payload": payload, "generation": gen, "saved_at": saved_at}
+
+
+def add_listener(listener):
+    """Call `listener(dataset, previous, payload, generation)` whenever a snapshot's content changes."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _notify(dataset: str, previous, payload, new_generation: int):
+    for listener in list(_listeners):
+        try:
+            listener(dataset, previous, payload, new_generation)
+        except Exception:
+            logging.exception("Snapshot listener failed for %s", dataset)
+
+
+@tracing.traced()
+def save_snapshot(dataset: str, payload) -> int:
+    """Persist `payload` as the last-known-good copy of `dataset`.
+
+    The file is rewritten (atomically, via a temp file + rename) only when the
+    content differs from what is already on disk. Returns the generation now on disk.
+    """
+    if is_error_payload(payload):
+        return generation(dataset)
+
+    body = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    digest = _digest(body)
+
+    with _write_lock:
+        header = read_header(dataset)
+        if header and header["digest"] == digest:
+            return header["generation"]
+
+        new_generation = (header["generation"] if header else 0) + 1
+        previous = None
+        if header and _listeners:
+            snapshot = load_snapshot(dataset)
+            previous = snapshot["payload"] if snapshot else None
+        saved_at = time.time()
+        path = _snapshot_path(dataset)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), prefix=path.name, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                name = dataset.encode("utf-8")
+                fh.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, new_generation,
+                                      saved_at, len(body), digest, len(name)))
+                fh.write(name)
+                fh.write(body)
+            os.replace(tmp_path, path)
+        except Exception:
+            logging.exception("Failed to write snapshot for %s", dataset)
+            return header["generation"] if header else 0
+
+        _loaded[dataset] = (new_generation, saved_at, payload)
+        logging.info("Saved %s snapshot generation %d (%d bytes)", dataset, new_generation, len(body))
+
+    _notify(dataset, previous, payload, new_generation)
+    return new_generation
+
+
+@contextlib.contextmanager
+def shared_fetches():
+    """Share fetched datasets across everything run inside this context.
+
+    Used by /api/batch so sub-requests needing the same dataset reuse one
+    payload even without Redis. The context propagates into tasks and
+    ``asyncio.to_thread`` calls started within it.
+    """
+    token = _request_scope.set({})
+    try:
+        yield
+    finally:
+        _request_scope.reset(token)
+
+
+@tracing.traced()
+def fetch_dataset(dataset: str, fetch_fn, ttl: int = None):
+    """Read-through fetch: Redis first, then `fetch_fn()`.
+
+    Successful upstream payloads are cached in Redis and saved as the
+    last-known-good snapshot. Error payloads are returned untouched so the
+    caller's normal error handling (``_unwrap_result``) still applies.
+
+    Concurrent callers asking for the same dataset share one upstream fetch
+    (single-flight) instead of each crawling the vendor.
+    """
+    scope = _request_scope.get()
+    if scope is not None and dataset in scope:
+        return scope[dataset]
+
+    cached = redis_layer.get_cached_dataset(dataset)
+    if cached is not None:
+        if scope is not None:
+            scope[dataset] = cached
+        return cached
+
+    with _inflight_lock:
+        flight = _inflight.get(dataset)
+        leader = flight is None
+        if leader:
+            flight = _inflight[dataset] = _Flight()
+    if not leader:
+        if flight.done.wait(INFLIGHT_WAIT_SECONDS):
+            if flight.error is not None:
+                raise flight.error
+            return flight.payload
+        logging.warning("Timed out waiting for in-flight fetch of %s; fetching it again", dataset)
+        return _fetch_upstream(dataset, fetch_fn, ttl, scope)
+
+    try:
+        flight.payload = _fetch_upstream(dataset, fetch_fn, ttl, scope)
+    except Exception as exc:
+        flight.error = exc
+        raise
+    finally:
+        flight.done.set()
+        with _inflight_lock:
+            _inflight.pop(dataset, None)
+    return flight.payload
+
+
+def _fetch_upstream(dataset: str, fetch_fn, ttl, scope):
+    payload = fetch_fn()
+    if not is_error_payload(payload):
+        redis_layer.cache_dataset(dataset, payload, ttl=ttl or _dataset_ttl(dataset))
+        save_snapshot(dataset, payload)
+        _verified[dataset] = time.time()
+        if scope is not None:
+            scope[dataset] = payload
+    return payload
+
+
+def invalidate(prefix: str) -> int:
+    """Drop cached copies of every dataset named `prefix` or `prefix:*` so the next read re-fetches.
+
+    Snapshots stay on disk as the outage fallback. Returns how many Redis keys were removed.
+    """
+    for name in [name for name in _verified if name == prefix or name.startswith(prefix + ":")]:
+        _verified.pop(name, None)
+    return redis_layer.delete_cached_datasets(prefix)
+
+
+@tracing.traced()
+def patch_dataset(dataset: str, patch_fn):
+    """Write-through: replace the cached copies of `dataset` with `patch_fn(payload)`.
+
+    `patch_fn` gets the current payload (Redis copy, else the snapshot) and
+    must return a new one rather than mutate it. The Redis copy keeps its
+    remaining TTL, so the next full refresh happens on schedule, and the
+    snapshot moves to a new generation. Patches of one dataset run one at a
+    time, each on top of the previous one. Returns ``(previous_generation,
+    new_generation)``, or None when nothing was cached to patch.
+    """
+    with _patch_locks_lock:
+        lock = _patch_locks.setdefault(dataset, threading.Lock())
+    with lock:
+        cached = redis_layer.get_cached_dataset(dataset)
+        if cached is None:
+            snapshot = load_snapshot(dataset)
+            if snapshot is None:
+                return None
+            cached = snapshot["payload"]
+        previous = generation(dataset)
+        payload = patch_fn(cached)
+        redis_layer.replace_cached_dataset(dataset, payload)
+        return previous, save_snapshot(dataset, payload)
+
+
+def is_fresh(dataset: str) -> bool:
+    """True while `dataset` would be served from cache rather than re-fetched.
+
+    That is the case while its Redis copy is alive or, without Redis, within
+    the dataset TTL of the last upstream fetch made by this process. Only then
+    does the snapshot generation describe what a request would return.
+    """
+    if isinstance(redis_layer.redis, redis_layer.Redis):
+        try:
+            return bool(redis_layer.redis.exists(f"dataset:{dataset}"))
+        except Exception:
+            logging.exception("Failed to check Redis for %s", dataset)
+            return False
+    verified_at = _verified.get(dataset)
+    return verified_at is not None and time.time() - verified_at < _dataset_ttl(dataset)
+
+
+def fresh_generation_key(*datasets: str):
+    """generation_key for `datasets`, or None unless all of them are fresh (see is_fresh)."""
+    if not all(is_fresh(name) for name in datasets):
+        return None
+    return generation_key(*datasets)
+
+
+def mark_stale(content, saved_at: float):
+    """Attach the staleness marker to last-known-good content.
+
+    Returns ``(content, headers)``; dict bodies also get ``stale`` and
+    ``snapshot_saved_at`` keys so clients that ignore headers can still tell.
+    """
+    saved_iso = datetime.datetime.fromtimestamp(saved_at, tz=datetime.timezone.utc).isoformat()
+    age_seconds = max(0, int(time.time() - saved_at))
+    if isinstance(content, dict):
+        content = {**content, "stale": True, "snapshot_saved_at": saved_iso}
+    headers = {
+        "X-Data-Stale": "true",
+        "X-Snapshot-Saved-At": saved_iso,
+        "X-Snapshot-Age": str(age_seconds),
+    }
+    return content, headers
+
+
+def list_datasets():
+    """Names of all datasets that currently have a snapshot on disk."""
+    if not SNAPSHOT_DIR.exists():
+        return []
+    names = []
+    for path in sorted(SNAPSHOT_DIR.glob("*.snap")):
+        header = _read_header_file(path)
+        if header and _snapshot_path(header["dataset"]).name == path.name:
+            names.append(header["dataset"])
+    return names
+
+
+def warm_cache(datasets=None) -> int:
+    """Seed a cold Redis from the snapshots on disk. Returns how many datasets were warmed."""
+    if not isinstance(redis_layer.redis, redis_layer.Redis):
+        logging.info("Redis unavailable; snapshots will only be used as an outage fallback")
+        return 0
+
+    warmed = 0
+    for dataset in datasets or list_datasets():
+        if dataset == "tenant_rows":
+            # Built in-process from the tenants/leases/properties datasets; only
+            # needed on disk for outage serving
+            continue
+        snapshot = load_snapshot(dataset)
+        if snapshot is None:
+            continue
+        try:
+            if redis_layer.redis.exists(f"dataset:{dataset}"):
+                continue
+            redis_layer.cache_dataset(dataset, snapshot["payload"], ttl=_dataset_ttl(dataset))
+            warmed += 1
+        except Exception:
+            logging.exception("Failed to warm cache for %s", dataset)
+    logging.info("Warmed %d dataset(s) from disk snapshots", warmed)
+    return warmed
@@ -0,0 +1,204 @@
+"""
+Inverted indexes over the task rows of one cached task snapshot.
+
+``TaskIndex`` maps status, user id and due date to the set of row positions
+holding them, and every lowercase title trigram to the rows whose title
+contains it. A filtered /tasks query is then a handful of set intersections
+instead of one pass over the whole board per filter:
+
+- status / user_id / duedate: union of the posting sets for the wanted values
+- title (substring): intersection of the posting sets of the query's
+  trigrams, confirmed with a substring check on the (few) survivors
+
+Queries shorter than a trigram fall back to a substring check over the rows
+the other filters left. An index is built once per snapshot generation (see
+``get_task_index``) and shared by every request until the next refresh; a
+write-through task update carries it to the new generation with ``advance``
+instead of rebuilding it.
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+from utils import tracing
+
+GRAM = 3
+# Distinct task snapshots (one per status filter) kept indexed at once
+MAX_INDEXES = 8
+
+
+def _as_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def _title_key(title) -> str:
+    return title.lower() if isinstance(title, str) else ""
+
+
+def _only(positions):
+    return next(iter(positions)) if positions else None
+
+
+def _post(postings: dict, value, position: int):
+    # Unhashable values (e.g. an empty userIds list) can never equal a filter value
+    try:
+        postings.setdefault(value, set()).add(position)
+    except TypeError:
+        pass
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TaskIndex:
+    """Position sets per status, user id, date and title trigram over `rows`."""
+
+    def __init__(self, rows):
+        self.rows = rows if isinstance(rows, list) else []
+        self.by_status = {}
+        self.by_user = {}
+        self.by_date = {}
+        self.by_gram = {}
+        self.by_id = {}
+        self._titles = []
+        self._removed = set()
+        for position, row in enumerate(self.rows):
+            self._titles.append(_title_key(row.get("title") if isinstance(row, dict) else None))
+            for postings, value in self._postings(row, self._titles[position]):
+                _post(postings, value, position)
+
+    def _postings(self, row, title):
+        """(posting dict, value) pairs a row is indexed under."""
+        row = row if isinstance(row, dict) else {}
+        pairs = [(self.by_status, row.get("status")), (self.by_user, row.get("user_id")),
+                 (self.by_date, row.get("date"))]
+        if row.get("task_id") is not None:
+            # Route paths carry ids as strings, the vendor payload may not
+            pairs.append((self.by_id, str(row["task_id"])))
+        pairs.extend((self.by_gram, gram) for gram in trigrams(title))
+        return pairs
+
+    def patched(self, task_id, row=None) -> "TaskIndex":
+        """Copy of the index with task `task_id` replaced by `row`, or removed when `row` is None.
+
+        A new task is appended, like the vendor appends it to the list. Only
+        the posting sets the task touches are copied; the rest are shared, so
+        requests still reading this index are unaffected.
+        """
+        index = copy.copy(self)
+        index.rows, index._titles, index._removed = list(self.rows), list(self._titles), set(self._removed)
+        index.by_status, index.by_user, index.by_date = dict(self.by_status), dict(self.by_user), dict(self.by_date)
+        index.by_gram, index.by_id = dict(self.by_gram), dict(self.by_id)
+
+        position = _only(self.by_id.get(str(task_id)))
+        if position is not None:
+            for postings, value in index._postings(index.rows[position], index._titles[position]):
+                remaining = postings.get(value, set()) - {position}
+                if remaining:
+                    postings[value] = remaining
+                else:
+                    postings.pop(value, None)
+        if row is None:
+            if position is not None:
+                index.rows[position], index._titles[position] = None, ""
+                index._removed.add(position)
+            return index
+        if position is None:
+            position = len(index.rows)
+            index.rows.append(None)
+            index._titles.append("")
+        index.rows[position], index._titles[position] = row, _title_key(row.get("title"))
+        for postings, value in index._postings(row, index._titles[position]):
+            try:
+                postings[value] = postings.get(value, set()) | {position}
+            except TypeError:
+                pass
+        return index
+
+    def __len__(self):
+        return len(self.rows) - len(self._removed)
+
+    @staticmethod
+    def _union(postings: dict, values) -> set:
+        matched = set()
+        for value in values:
+            try:
+                matched |= postings.get(value, set())
+            except TypeError:
+                continue
+        return matched
+
+    def positions(self, filters) -> list:
+        """Sorted row positions matching `filters` (the conneteam_bridge._build_filters dict)."""
+        if not filters:
+            return [position for position in range(len(self.rows)) if position not in self._removed]
+        candidates = []
+        if filters.get("status"):
+            candidates.append(self._union(self.by_status, _as_list(filters["status"])))
+        if filters.get("user_id"):
+            candidates.append(self._union(self.by_user, _as_list(filters["user_id"])))
+        if filters.get("duedate"):
+            candidates.append(self.by_date.get(filters["duedate"], set()))
+        query = _title_key(filters.get("title"))
+        if query:
+            candidates.extend(self.by_gram.get(gram, set()) for gram in trigrams(query))
+
+        if candidates:
+            candidates.sort(key=len)
+            matched = candidates[0].intersection(*candidates[1:])
+        else:
+            matched = (position for position in range(len(self.rows)) if position not in self._removed)
+        if query:
+            # Trigram hits are necessary, not sufficient ("abcd" vs "abc bcd")
+            matched = [position for position in matched if query in self._titles[position]]
+        return sorted(matched)
+
+    def select(self, filters) -> list:
+        return [self.rows[position] for position in self.positions(filters)]
+
+
+_memo_lock = threading.Lock()
+# key -> TaskIndex, most recently used last
+_memo = OrderedDict()
+
+
+@tracing.traced()
+def get_task_index(build_rows, key=None) -> TaskIndex:
+    """TaskIndex over `build_rows()`, reused while `key` is unchanged.
+
+    `key` identifies the snapshot the rows come from, e.g. ``(dataset,
+    generation)``; pass None to always build a fresh index.
+    """
+    if key is not None:
+        with _memo_lock:
+            index = _memo.get(key)
+            if index is not None:
+                _memo.move_to_end(key)
+                return index
+    index = TaskIndex(build_rows())
+    if key is not None:
+        with _memo_lock:
+            _memo[key] = index
+            while len(_memo) > MAX_INDEXES:
+                _memo.popitem(last=False)
+    return index
+
+
+def advance(key, new_key, task_id, row=None) -> bool:
+    """Move the index memoized under `key` to `new_key`, patched for one task.
+
+    Used by write-through updates so the next read after a write does not
+    rebuild the index. Returns False when nothing was memoized under `key`.
+    """
+    with _memo_lock:
+        index = _memo.pop(key, None)
+        if index is None:
+            return False
+        _memo[new_key] = index.patched(task_id, row)
+        return True
+
+
+def clear():
+    with _memo_lock:
+        _memo.clear()
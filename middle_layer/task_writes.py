@@ -0,0 +1,120 @@
+"""
+Write-through cache updates for Connecteam task create / update / delete.
+
+After the vendor accepts a write, the cached ``tasks:<status>`` datasets are
+patched with the task from the vendor's response instead of waiting for
+their TTL: the Redis copy keeps its remaining TTL, the snapshot moves to a
+new generation (so /tasks ETags change), the memoized task index is carried
+to that generation (``task_index.advance``) and a ``task_changed`` event is
+published. A read straight after a write is fresh without a full re-crawl.
+
+Only the derived task-row caches (``tasks:all`` / ``times:all`` in
+connecteam_redit_layer) are dropped; they are rebuilt from the patched
+datasets on the next read.
+"""
+import logging
+
+from middle_layer import connecteam_redit_layer, conneteam_bridge, dashboard_events, snapshot_store, task_index
+from utils import tracing
+
+# One cached dataset per /tasks status filter
+TASK_STATUSES = ("all", "draft", "published", "completed")
+ROW_CACHE_KEYS = ("tasks:all", "times:all")
+
+
+def task_from_response(resp):
+    """The task dict in a create / update response, or None when it carries none."""
+    if not isinstance(resp, dict):
+        return None
+    data = resp.get("data", resp)
+    if isinstance(data, dict) and isinstance(data.get("task"), dict):
+        data = data["task"]
+    if isinstance(data, list) and len(data) == 1:
+        data = data[0]
+    return data if isinstance(data, dict) and data.get("id") is not None else None
+
+
+def _same_id(task, task_id) -> bool:
+    return isinstance(task, dict) and task.get("id") is not None and str(task.get("id")) == str(task_id)
+
+
+def patch_tasks(payload, status: str, task_id, task=None):
+    """New ``{"data": {"tasks": [...]}}`` payload with one task replaced, added or (task None) removed.
+
+    `task` is merged over the cached copy, so a partial update response still
+    keeps the fields it omits. The task stays in the list only while it
+    matches the dataset's `status`. Returns ``(payload, row_task)`` where
+    row_task is the merged task kept in the list, or None.
+    """
+    data = payload.get("data") if isinstance(payload, dict) else None
+    tasks = data.get("tasks") if isinstance(data, dict) else None
+    tasks = list(tasks) if isinstance(tasks, list) else []
+    position = next((i for i, item in enumerate(tasks) if _same_id(item, task_id)), None)
+
+    merged = None
+    if task is not None:
+        merged = {**(tasks[position] if position is not None else {}), **task}
+        if status != "all" and merged.get("status") != status:
+            merged = None
+    if merged is None:
+        if position is not None:
+            del tasks[position]
+    elif position is None:
+        tasks.append(merged)
+    else:
+        tasks[position] = merged
+    if isinstance(data, dict):
+        return {**payload, "data": {**data, "tasks": tasks}}, merged
+    return {"data": {"tasks": tasks}}, merged
+
+
+def _patch_dataset(status: str, task_id, task):
+    dataset = f"tasks:{status}"
+    kept = {}
+
+    def patch(payload):
+        patched, kept["task"] = patch_tasks(payload, status, task_id, task)
+        return patched
+
+    generations = snapshot_store.patch_dataset(dataset, patch)
+    if generations is None:
+        return None
+    previous, current = generations
+    row = conneteam_bridge.task_row(kept["task"]) if kept.get("task") is not None else None
+    if previous and current != previous:
+        task_index.advance((dataset, (previous,)), (dataset, (current,)), task_id, row)
+    return row
+
+
+@tracing.traced()
+def apply_task_write(action: str, task_id=None, resp=None, payload=None):
+    """Patch the cached task datasets after a successful vendor write.
+
+    `action` is ``created``, ``updated`` or ``deleted``; `resp` is the vendor
+    response and `payload` the request body, used when the response does not
+    echo the task back. When the task cannot be identified the task datasets
+    are invalidated instead, so the next read re-crawls them. Never raises.
+    """
+    try:
+        task = None
+        if action != "deleted":
+            task = task_from_response(resp)
+            if task is None and action == "updated" and isinstance(payload, dict):
+                task = {**payload, "id": task_id}
+            if task is None:
+                logging.info("Task %s response has no task to write through; invalidating task lists", action)
+                snapshot_store.invalidate("tasks")
+                connecteam_redit_layer.drop_connectam_user_info(*ROW_CACHE_KEYS)
+                dashboard_events.publish_dataset_invalidated("tasks")
+                return None
+            task_id = task["id"]
+
+        rows = {status: _patch_dataset(status, task_id, task) for status in TASK_STATUSES}
+        row = rows["all"] or (conneteam_bridge.task_row(task) if task is not None else None)
+        connecteam_redit_layer.drop_connectam_user_info(*ROW_CACHE_KEYS)
+        dashboard_events.publish_task_change(action, task_id, row, source="write")
+        return row
+    except Exception:
+        logging.exception("Write-through of task %s %s failed; invalidating task lists", task_id, action)
+        snapshot_store.invalidate("tasks")
+        return None
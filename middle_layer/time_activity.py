@@ -0,0 +1,311 @@
+"""
+Columnar time-activity analytics over Connecteam shifts.
+
+``get_time_activity`` returns ``data.timeActivitiesByUsers[].shifts[]``
+(merged across time clocks by ``connecteam_sources``). Each shift has
+start/end epoch timestamps, its own timezone, a job and its time clock.
+Shifts are flattened once into numpy/pandas columns:
+
+- hours come from one vectorized subtraction;
+- each shift is assigned to the local calendar day of its start, converted
+  per timezone group;
+- everything is rolled up to one row per (day, user, job).
+
+Per-user, per-job and per-day summaries, and any filtering by user or job,
+are cheap group-bys over the rollup.
+
+Fetching is bucketed (``load_shifts``). A requested range is split into
+aligned day or week buckets. Cached buckets come from Redis, and the missing
+ones are fetched from Connecteam concurrently. Each bucket is stored as compact
+shift columns:
+- closed buckets (ending more than ACTIVITY_CLOSED_AFTER_DAYS ago) are kept
+  without a TTL;
+- recent buckets expire after ACTIVITY_RECENT_TTL seconds.
+
+Buckets are merged and deduplicated by shift id, so adjacent or overlapping
+ranges mostly come from the cache.
+"""
+import asyncio
+import datetime
+import logging
+import os
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from middle_layer import redis_layer
+from utils import tracing
+
+# Used for shifts that carry no timezone of their own
+DEFAULT_TIMEZONE = os.getenv("CONNECTEAM_TIMEZONE", "UTC")
+# "week" (Monday-aligned) or "day"
+ACTIVITY_BUCKET = os.getenv("ACTIVITY_BUCKET", "week")
+ACTIVITY_RECENT_TTL = int(os.getenv("ACTIVITY_RECENT_TTL", "300"))
+# Shifts can still be edited for a while after they end
+ACTIVITY_CLOSED_AFTER_DAYS = int(os.getenv("ACTIVITY_CLOSED_AFTER_DAYS", "2"))
+ACTIVITY_FETCH_CONCURRENCY = int(os.getenv("ACTIVITY_FETCH_CONCURRENCY", "6"))
+MAX_RANGE_DAYS = 400
+
+SHIFT_COLUMNS = ("shift_id", "user_id", "job_id", "sub_job_id", "time_clock_id", "start", "end", "timezone",
+                 "auto_clock_out")
+ROLLUP_COLUMNS = ("day", "user_id", "job_id", "hours", "shifts", "auto_clock_outs", "open_shifts")
+
+
+def _user_entries(payload):
+    """timeActivitiesByUsers entries from a get_time_activity payload (or the bare list)."""
+    if isinstance(payload, dict):
+        payload = payload.get("data", payload)
+    if isinstance(payload, dict):
+        payload = payload.get("timeActivitiesByUsers")
+    if not isinstance(payload, list):
+        return []
+    return [entry for entry in payload if isinstance(entry, dict)]
+
+
+def _timestamp(point):
+    if isinstance(point, dict):
+        point = point.get("timestamp")
+    return point if isinstance(point, (int, float)) and not isinstance(point, bool) else np.nan
+
+
+def shift_frame(payload) -> pd.DataFrame:
+    """One row per shift with epoch start/end (end NaN while clocked in)."""
+    columns = {name: [] for name in SHIFT_COLUMNS}
+    for entry in _user_entries(payload):
+        user_id = entry.get("userId")
+        for shift in entry.get("shifts") or []:
+            if not isinstance(shift, dict):
+                continue
+            start = shift.get("start") or {}
+            columns["shift_id"].append(shift.get("id"))
+            columns["user_id"].append(user_id)
+            columns["job_id"].append(shift.get("jobId"))
+            columns["sub_job_id"].append(shift.get("subJobId"))
+            columns["time_clock_id"].append(shift.get("timeClockId"))
+            columns["start"].append(_timestamp(start))
+            columns["end"].append(_timestamp(shift.get("end")))
+            columns["timezone"].append((start.get("timezone") if isinstance(start, dict) else None) or DEFAULT_TIMEZONE)
+            columns["auto_clock_out"].append(bool(shift.get("isAutoClockOut")))
+
+    frame = pd.DataFrame({
+        "shift_id": pd.Series(columns["shift_id"], dtype="object"),
+        "user_id": pd.Series(columns["user_id"], dtype="object"),
+        "job_id": pd.Series(columns["job_id"], dtype="object"),
+        "sub_job_id": pd.Series(columns["sub_job_id"], dtype="object"),
+        "time_clock_id": pd.Series(columns["time_clock_id"], dtype="object"),
+        "start": np.asarray(columns["start"], dtype=float),
+        "end": np.asarray(columns["end"], dtype=float),
+        "timezone": pd.Series(columns["timezone"], dtype="object"),
+        "auto_clock_out": np.asarray(columns["auto_clock_out"], dtype=bool),
+    })
+    return frame[~np.isnan(frame["start"].to_numpy())].reset_index(drop=True)
+
+
+def local_days(frame: pd.DataFrame) -> np.ndarray:
+    """ISO local date of each shift's start, converting one timezone group at a time."""
+    days = np.empty(len(frame), dtype=object)
+    if not len(frame):
+        return days
+    utc = pd.to_datetime(frame["start"].to_numpy(), unit="s", utc=True)
+    for zone, positions in frame.groupby("timezone", sort=False).indices.items():
+        try:
+            local = utc[positions].tz_convert(zone)
+        except Exception:
+            logging.warning("Unknown shift timezone %r; using UTC", zone)
+            local = utc[positions]
+        days[positions] = local.strftime("%Y-%m-%d")
+    return days
+
+
+@tracing.traced()
+def rollup(frame: pd.DataFrame) -> pd.DataFrame:
+    """Hours, shift counts, auto clock-outs and open shifts per (local day, user, job)."""
+    if not len(frame):
+        return pd.DataFrame({name: [] for name in ROLLUP_COLUMNS})
+    hours = (frame["end"].to_numpy() - frame["start"].to_numpy()) / 3600.0
+    open_shift = np.isnan(hours)
+    grouped = pd.DataFrame({
+        "day": local_days(frame),
+        "user_id": frame["user_id"],
+        "job_id": frame["job_id"],
+        "hours": np.where(open_shift, 0.0, np.clip(hours, 0.0, None)),
+        "auto_clock_out": frame["auto_clock_out"].to_numpy(dtype=int),
+        "open_shift": open_shift.astype(int),
+    }).groupby(["day", "user_id", "job_id"], dropna=False, sort=True)
+    return grouped.agg(
+        hours=("hours", "sum"),
+        shifts=("hours", "size"),
+        auto_clock_outs=("auto_clock_out", "sum"),
+        open_shifts=("open_shift", "sum"),
+    ).reset_index()
+
+
+def rollup_records(rollup_frame: pd.DataFrame) -> list:
+    """JSON-safe rows of a rollup (what gets cached)."""
+    frame = rollup_frame.astype(object).where(pd.notna(rollup_frame), None)
+    return frame.to_dict("records")
+
+
+def _rollup_from_records(records) -> pd.DataFrame:
+    frame = pd.DataFrame(list(records or []), columns=list(ROLLUP_COLUMNS))
+    frame["hours"] = pd.to_numeric(frame["hours"], errors="coerce").fillna(0.0)
+    for column in ("shifts", "auto_clock_outs", "open_shifts"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").fillna(0).astype(int)
+    return frame
+
+
+def parse_ids(values):
+    """Comma-separated ids -> set of strings (ids are compared as strings)."""
+    if not values:
+        return None
+    if isinstance(values, str):
+        values = values.split(",")
+    return {str(value).strip() for value in values if str(value).strip()}
+
+
+def filter_ids(frame: pd.DataFrame, column: str, values) -> pd.DataFrame:
+    """Rows of `frame` whose `column` is one of the comma-separated `values` (all rows when empty)."""
+    wanted = parse_ids(values)
+    if wanted is None:
+        return frame
+    return frame[frame[column].astype(str).isin(wanted)].reset_index(drop=True)
+
+
+def _group(frame: pd.DataFrame, key: str, count_name: str, count_column: str) -> list:
+    """Summary rows per `key`, with the number of distinct `count_column` values as `count_name`."""
+    grouped = frame.groupby(key, dropna=False, sort=True).agg(
+        hours=("hours", "sum"),
+        shifts=("shifts", "sum"),
+        auto_clock_outs=("auto_clock_outs", "sum"),
+        open_shifts=("open_shifts", "sum"),
+        **{count_name: (count_column, "nunique")},
+    ).reset_index()
+    grouped["hours"] = grouped["hours"].round(2)
+    grouped = grouped.astype(object).where(pd.notna(grouped), None)
+    return grouped.to_dict("records")
+
+
+@tracing.traced()
+def summarize(rollup_rows, user_ids=None, job_ids=None, start_day: str = None, end_day: str = None) -> dict:
+    """Totals plus by_user / by_job / by_day summaries of a rollup, optionally filtered."""
+    frame = rollup_rows if isinstance(rollup_rows, pd.DataFrame) else _rollup_from_records(rollup_rows)
+    users, jobs = parse_ids(user_ids), parse_ids(job_ids)
+    if users is not None:
+        frame = frame[frame["user_id"].astype(str).isin(users)]
+    if jobs is not None:
+        frame = frame[frame["job_id"].astype(str).isin(jobs)]
+    if start_day:
+        frame = frame[frame["day"] >= start_day]
+    if end_day:
+        frame = frame[frame["day"] <= end_day]
+
+    return {
+        "totals": {
+            "hours": round(float(frame["hours"].sum()), 2),
+            "shifts": int(frame["shifts"].sum()),
+            "users": int(frame["user_id"].nunique()),
+            "jobs": int(frame["job_id"].nunique()),
+            "days": int(frame["day"].nunique()),
+            "auto_clock_outs": int(frame["auto_clock_outs"].sum()),
+            "open_shifts": int(frame["open_shifts"].sum()),
+        },
+        "by_user": _group(frame, "user_id", "days", "day"),
+        "by_job": _group(frame, "job_id", "users", "user_id"),
+        "by_day": _group(frame, "day", "users", "user_id"),
+    }
+
+
+def parse_range(start_date: str, end_date: str):
+    """(start, end) dates from YYYY-MM-DD strings; ValueError for bad or oversized ranges."""
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError("endDate is before startDate")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f"Ranges are limited to {MAX_RANGE_DAYS} days")
+    return start, end
+
+
+def bucket_ranges(start: datetime.date, end: datetime.date, bucket: str = None) -> list:
+    """Aligned (first, last) day buckets covering [start, end]."""
+    size = 1 if (bucket or ACTIVITY_BUCKET) == "day" else 7
+    first = start - datetime.timedelta(days=start.weekday()) if size == 7 else start
+    buckets = []
+    while first <= end:
+        last = first + datetime.timedelta(days=size - 1)
+        buckets.append((first, last))
+        first = last + datetime.timedelta(days=1)
+    return buckets
+
+
+def _today() -> datetime.date:
+    try:
+        return datetime.datetime.now(ZoneInfo(DEFAULT_TIMEZONE)).date()
+    except Exception:
+        return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def bucket_ttl(last: datetime.date, today: datetime.date = None):
+    """None (keep) for closed buckets, ACTIVITY_RECENT_TTL for ones that can still change."""
+    today = today or _today()
+    closed = (today - last).days > ACTIVITY_CLOSED_AFTER_DAYS
+    return None if closed else ACTIVITY_RECENT_TTL
+
+
+def _bucket_key(first: datetime.date, last: datetime.date) -> str:
+    # v2: buckets merge every time clock (closed v1 buckets hold one clock and never expire)
+    return f"activity:v2:{first.isoformat()}:{last.isoformat()}"
+
+
+def shift_columns(frame: pd.DataFrame) -> dict:
+    """Compact, JSON-safe column form of a shift frame (what a bucket caches)."""
+    return {name: frame[name].astype(object).where(pd.notna(frame[name]), None).tolist() for name in SHIFT_COLUMNS}
+
+
+def _frame_from_columns(columns: dict) -> pd.DataFrame:
+    frame = pd.DataFrame({name: pd.Series(columns.get(name) or [], dtype="object") for name in SHIFT_COLUMNS})
+    frame["start"] = pd.to_numeric(frame["start"], errors="coerce").astype(float)
+    frame["end"] = pd.to_numeric(frame["end"], errors="coerce").astype(float)
+    frame["auto_clock_out"] = frame["auto_clock_out"].fillna(False).astype(bool)
+    return frame
+
+
+def _fetch_bucket(first: datetime.date, last: datetime.date, fetch) -> dict:
+    columns = shift_columns(shift_frame(fetch(first.isoformat(), last.isoformat())))
+    redis_layer.cache_dataset(_bucket_key(first, last), columns, ttl=bucket_ttl(last))
+    return columns
+
+
+@tracing.traced()
+async def load_shifts(start_date: str, end_date: str, fetch) -> pd.DataFrame:
+    """Shift frame for [start_date, end_date] from cached buckets plus concurrent fetches of missing ones.
+
+    `fetch(start, end)` returns a get_time_activity payload for a YYYY-MM-DD range.
+    Shifts are deduplicated by id and kept when their local start day is in range.
+    """
+    start, end = parse_range(start_date, end_date)
+    buckets = bucket_ranges(start, end)
+    cached = await asyncio.to_thread(lambda: [redis_layer.get_cached_dataset(_bucket_key(*b)) for b in buckets])
+
+    missing = [bucket for bucket, columns in zip(buckets, cached) if columns is None]
+    semaphore = asyncio.Semaphore(ACTIVITY_FETCH_CONCURRENCY)
+
+    async def fetch_bucket(bucket):
+        async with semaphore:
+            return await asyncio.to_thread(_fetch_bucket, bucket[0], bucket[1], fetch)
+
+    fetched = dict(zip(missing, await asyncio.gather(*(fetch_bucket(bucket) for bucket in missing))))
+    logging.info("Activity %s..%s: %d buckets cached, %d fetched",
+                 start_date, end_date, len(buckets) - len(missing), len(missing))
+
+    frames = [_frame_from_columns(fetched.get(bucket) or columns) for bucket, columns in zip(buckets, cached)]
+    frame = pd.concat(frames, ignore_index=True) if frames else _frame_from_columns({})
+    with_id = frame["shift_id"].notna().to_numpy()
+    frame = pd.concat([frame[with_id].drop_duplicates("shift_id", keep="last"), frame[~with_id]],
+                      ignore_index=True)
+    if not len(frame):
+        return frame
+    days = pd.Series(local_days(frame))
+    in_range = ((days >= start.isoformat()) & (days <= end.isoformat())).to_numpy()
+    return frame[in_range].reset_index(drop=True)
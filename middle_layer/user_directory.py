@@ -0,0 +1,134 @@
+"""
+Connecteam user directory: every user keyed by id, with a skill-tag index.
+
+The full user list is crawled (not just the first page ``retrieve_tenants``
+returns) and kept in process as a ``UserDirectory`` (see ``directory_cache``),
+refreshed in the background. Name enrichment and queries such as "all active
+housekeeping staff" are then dict / set lookups, never upstream calls.
+"""
+import os
+import sys
+from pathlib import Path
+
+from middle_layer.directory_cache import DirectoryCache
+
+PROJECT_ROOT = Path(__file__).absolute().parent.parent
+
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services import connecteam_api_client
+
+USERS_DATASET = "users"
+# How long the in-process directory is served before the dataset is read again
+DIRECTORY_MAX_AGE_SECONDS = 900
+# Custom-field option values that count as skill tags
+SKILL_TAGS = tuple(
+    tag.strip() for tag in os.getenv("CONNECTEAM_SKILL_TAGS", "Maintenance,Housekeeping,Inspections").split(",")
+    if tag.strip()
+)
+
+
+def _user_records(payload):
+    """User dicts from a list_all_users payload (or a bare list)."""
+    if isinstance(payload, dict):
+        payload = payload.get("data", payload)
+    if isinstance(payload, dict):
+        payload = payload.get("users")
+    if not isinstance(payload, list):
+        return []
+    return [user for user in payload if isinstance(user, dict)]
+
+
+def user_tags(user: dict, tags=SKILL_TAGS) -> list:
+    """Skill tags selected in the user's custom fields, in field order."""
+    found = []
+    for field in user.get("customFields") or []:
+        raw_value = field.get("value") if isinstance(field, dict) else None
+        values = raw_value if isinstance(raw_value, list) else [raw_value]
+        for item in values:
+            value = item.get("value") if isinstance(item, dict) else None
+            if value in tags and value not in found:
+                found.append(value)
+    return found
+
+
+class UserDirectory:
+    """id -> user summary index, plus lowercase skill tag -> user ids."""
+
+    def __init__(self, payload=None):
+        self.payload = payload if payload is not None else {"data": {"users": []}}
+        self.users = {}
+        self.skills = {}
+        for user in _user_records(payload):
+            user_id = user.get("userId") or user.get("id")
+            if not user_id:
+                continue
+            first_name, last_name = user.get("firstName") or "", user.get("lastName") or ""
+            entry = {
+                "user_id": user_id,
+                "name": f"{first_name} {last_name}".strip(),
+                "first_name": first_name,
+                "last_name": last_name,
+                "tags": user_tags(user),
+                "active": not user.get("isArchived", False),
+            }
+            self.users[user_id] = entry
+            for tag in entry["tags"]:
+                self.skills.setdefault(tag.lower(), set()).add(user_id)
+
+    def __len__(self):
+        return len(self.users)
+
+    def _entry(self, user_id):
+        if not user_id:
+            return None
+        entry = self.users.get(user_id)
+        if entry is None and isinstance(user_id, str) and user_id.isdigit():
+            entry = self.users.get(int(user_id))
+        return entry
+
+    def __contains__(self, user_id):
+        return self._entry(user_id) is not None
+
+    def name(self, user_id):
+        entry = self._entry(user_id)
+        return entry["name"] if entry else None
+
+    def with_skill(self, tag: str, active_only: bool = True) -> list:
+        """Users carrying skill `tag` (case-insensitive), sorted by name."""
+        entries = [self.users[user_id] for user_id in self.skills.get((tag or "").strip().lower(), ())]
+        if active_only:
+            entries = [entry for entry in entries if entry["active"]]
+        return sorted(entries, key=lambda entry: entry["name"])
+
+    def profile(self, user_id):
+        """The ``conneteam_bridge.get_users`` row for a user, or None when unknown."""
+        entry = self._entry(user_id)
+        if entry is None:
+            return None
+        return {"firstname": entry["first_name"], "lastname": entry["last_name"], "values": list(entry["tags"])}
+
+    def to_list(self, active_only: bool = False) -> list:
+        entries = self.users.values()
+        if active_only:
+            entries = [entry for entry in entries if entry["active"]]
+        return sorted(entries, key=lambda entry: entry["name"])
+
+
+_cache = DirectoryCache(USERS_DATASET, UserDirectory, lambda: connecteam_api_client.list_all_users(),
+                        max_age=DIRECTORY_MAX_AGE_SECONDS)
+
+
+def get_directory(max_age: float = None, fetch_fn=None) -> UserDirectory:
+    """The in-process user directory (see DirectoryCache.get)."""
+    return _cache.get(max_age=max_age, fetch_fn=fetch_fn)
+
+
+def refresh(fetch_fn=None) -> UserDirectory:
+    """Re-crawl the user list now, bypassing the Redis copy."""
+    return _cache.refresh(fetch_fn=fetch_fn)
+
+
+def background_refresh(interval_minutes: int = 30):
+    return _cache.background_refresh(interval_minutes)
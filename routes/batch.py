@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+
+import httpx
+
+from middle_layer import snapshot_store
+
+router = APIRouter()
+
+MAX_BATCH_SIZE = 20
+# Sub-request response headers worth passing back to the client
+FORWARDED_HEADERS = ("etag", "x-next-cursor", "x-total-count", "x-data-stale", "x-snapshot-saved-at", "x-snapshot-age")
+# Streams never complete and would hold the whole batch open
+BLOCKED_PREFIXES = ("/api/batch", "/api/events", "/ws")
+# Sub-responses stay in-process; only the outer batch response is worth compressing
+SUB_REQUEST_HEADERS = {"Accept-Encoding": "identity"}
+
+
+class SubRequest(BaseModel):
+    id: Optional[str] = Field(None, description="Client label echoed back in the matching response")
+    method: str = "GET"
+    path: str = Field(..., description="Route path, e.g. /api/doorloop/leases")
+    params: Dict[str, Any] = Field(default_factory=dict)
+    headers: Dict[str, str] = Field(default_factory=dict)
+
+
+class BatchRequest(BaseModel):
+    requests: List[SubRequest]
+
+
+def _validate(sub: SubRequest):
+    if sub.method.upper() not in ("GET", "HEAD"):
+        raise HTTPException(status_code=400, detail=f"Only GET sub-requests can be batched (got {sub.method})")
+    if not sub.path.startswith("/") or sub.path.startswith(BLOCKED_PREFIXES):
+        raise HTTPException(status_code=400, detail=f"Path {sub.path} cannot be batched")
+
+
+async def _dispatch(client: httpx.AsyncClient, sub: SubRequest) -> Dict[str, Any]:
+    try:
+        headers = {name: value for name, value in sub.headers.items() if name.lower() != "accept-encoding"}
+        resp = await client.request(sub.method.upper(), sub.path, params=sub.params, headers=headers)
+    except Exception as exc:
+        logging.exception("Batched request %s %s failed", sub.method, sub.path)
+        return {"id": sub.id, "path": sub.path, "status": 500, "headers": {}, "body": {"detail": str(exc)}}
+
+    body = None
+    if resp.content:
+        try:
+            body = resp.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            body = resp.text
+    headers = {name: resp.headers[name] for name in FORWARDED_HEADERS if name in resp.headers}
+    return {"id": sub.id, "path": sub.path, "status": resp.status_code, "headers": headers, "body": body}
+
+
+@router.post("/batch")
+async def batch(payload: BatchRequest, request: Request):
+    """Run several GET routes in one round trip.
+
+    Sub-requests are dispatched in-process and concurrently; datasets fetched
+    by one of them (tenants, leases, tasks, ...) are shared with the others
+    instead of being fetched from the vendor again. Responses come back in
+    request order, each with its own status, selected headers and body.
+    """
+    if not payload.requests:
+        return {"responses": []}
+    if len(payload.requests) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SIZE} sub-requests per batch")
+    for sub in payload.requests:
+        _validate(sub)
+
+    transport = httpx.ASGITransport(app=request.app)
+    with snapshot_store.shared_fetches():
+        async with httpx.AsyncClient(transport=transport, base_url="http://batch.internal",
+                                     headers=SUB_REQUEST_HEADERS) as client:
+            responses = await asyncio.gather(*(_dispatch(client, sub) for sub in payload.requests))
+    return {"responses": list(responses)}
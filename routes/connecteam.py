@@ -1,12 +1,28 @@
-from fastapi import APIRouter, Query, Body, HTTPException, status
-from typing import Any, Dict
+from fastapi import APIRouter, Query, Body, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
 from enum import Enum
 from services import connecteam_api_client
-from middle_layer import conneteam_bridge
+from utils import metrics
+from middle_layer import bulk_tasks, connecteam_sources, conneteam_bridge, dashboard_events, http_cache, job_directory, pagination, shift_intervals, snapshot_store, task_writes, time_activity, user_directory
+import asyncio
+import hmac
 import logging
+import os
 
 router = APIRouter()
 
+class BulkTaskItem(BaseModel):
+    task_id: Optional[str] = Field(None, description="Update this task; omit to create a new one")
+    payload: Dict[str, Any]
+
+
+class BulkTaskRequest(BaseModel):
+    batch_id: Optional[str] = Field(None, description="Resume this batch: items that already succeeded are skipped")
+    items: List[BulkTaskItem]
+
+
 class TaskStatus(str, Enum):
     """Valid task status values for Connecteam API"""
     draft = "draft"
@@ -34,81 +50,186 @@ def _unwrap_result(resp: Dict[str, Any]) -> Any:
     return resp
 
 
+def _serve_snapshot(dataset: str, build=None):
+    """Serve last-known-good data when both the primary and the MCP fallback failed."""
+    snapshot = snapshot_store.load_snapshot(dataset)
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Both primary and fallback Connecteam services failed.")
+
+    content = build(snapshot["payload"]) if build else snapshot["payload"]
+    logging.warning("Serving last-known-good snapshot for %s", dataset)
+    metrics.record_cache(dataset, "stale")
+    content, headers = snapshot_store.mark_stale(content, snapshot["saved_at"])
+    return JSONResponse(content=content, headers=headers)
+
+
 
 @router.get("/tenants")
 async def get_tenants():
     try:
-        resp = connecteam_api_client.retrieve_tenants()
+        resp = await asyncio.to_thread(snapshot_store.fetch_dataset, "users", connecteam_api_client.list_all_users)
         return _unwrap_result(resp)
-    except (ConnectionError, TimeoutError, ValueError):
+    except (ConnectionError, TimeoutError, ValueError, HTTPException):
         logging.info("Primary Connecteam API failed, trying fallback service...")
         try:
             retrieve_tenants = services.ConnecteamClient()
-            tenants_info = retrieve_tenants.retrieve_tenants()
+            tenants_info = await retrieve_tenants.retrieve_tenants()
             if isinstance(tenants_info, dict):
                 return _unwrap_result(tenants_info)
-        except HTTPException:
+        except Exception:
             logging.exception("Fallback retrieve_tenants failed")
-            raise HTTPException(status_code=500, detail="Both primary and fallback Connecteam services failed.")
+        return _serve_snapshot("users")
+
+
+def _tasks_to_process(result):
+    """Normalize a list_tasks payload into the {"data": {"tasks": [...]}} shape get_times expects."""
+    # If the API already returned a list, wrap it for the bridge
+    if isinstance(result, list):
+        return {"data": {"tasks": result}}
+    # If the API returned a dict with data.tasks, pass that through
+    if isinstance(result, dict) and isinstance(result.get("data", {}).get("tasks"), list):
+        return result
+    return None
 
 
 @router.get("/tasks")
 async def get_tasks(
+    request: Request,
+    response: Response,
     limit: int = Query(100, ge=1, le=100, description="Number of tasks to return (1-100)"),
     offset: int = Query(0, ge=0, description="Number of tasks to skip for pagination"),
     status: TaskStatus = Query(TaskStatus.all, description="Task status filter"),
     user_id: str = Query(None, description="Filter by user ID(s) - comma separated list (optional)"),
     title: str = Query(None, description="Filter by task title - partial match (optional)"),
     duedate: str = Query(None, description="Filter by due date - YYYY-MM-DD format (optional)"),
+    cursor: str = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header (optional)"),
+    fields: str = Query(None, description="Comma-separated fields to return, e.g. title,status (optional)"),
 ):
+    # The whole task list for a status is cached once; pages, filters and
+    # projections are cut from it locally instead of one vendor call per page
+    dataset = f"tasks:{status.value}"
+    try:
+        pagination.decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Repeat polls: answer 304 from the cached task list's generation
+    generations = snapshot_store.fresh_generation_key(dataset)
+    if generations:
+        etag = http_cache.make_etag(request, generations)
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag)
+    page_kwargs = dict(
+        status=status.value if status.value != "all" else None,
+        user_id=user_id,
+        title=title,
+        duedate=duedate,
+        cursor=cursor,
+        limit=limit,
+        offset=offset,
+        fields=pagination.parse_fields(fields),
+    )
+
+    def _page_headers(page):
+        headers = {"X-Total-Count": str(page["total"])}
+        if page["next_cursor"]:
+            headers["X-Next-Cursor"] = page["next_cursor"]
+        return headers
+
     try:
-        resp = connecteam_api_client.list_tasks(limit=limit, offset=offset, status=status.value)
+        resp = await asyncio.to_thread(
+            snapshot_store.fetch_dataset,
+            dataset,
+            lambda: connecteam_sources.list_all_tasks(status=status.value),
+        )
         result = _unwrap_result(resp)
 
         if not result:
             return []
 
-        # If the API already returned a list, wrap it for the bridge
-        if isinstance(result, list):
-            data_to_process = {"data": {"tasks": result}}
-        # If the API returned a dict with data.tasks, pass that through
-        elif isinstance(result, dict) and isinstance(result.get("data", {}).get("tasks"), list):
-            data_to_process = result
-        else:
+        data_to_process = _tasks_to_process(result)
+        if data_to_process is None:
             # Unknown shape; return raw
             return result
 
-        processed = conneteam_bridge.get_times(
+        generations = snapshot_store.generation_key(dataset)
+        page = await asyncio.to_thread(
+            conneteam_bridge.get_task_page,
             data_to_process,
             get_user=connecteam_api_client.get_user,
-            status=status.value if status.value != "all" else None,
-            user_id=user_id,
-            title=title,
-            duedate=duedate,
+            get_jobs=job_directory.get_directory,
+            get_people=user_directory.get_directory,
+            index_key=(dataset, generations) if generations else None,
+            **page_kwargs,
         )
-        return processed if processed is not None else result
-    except (ConnectionError, TimeoutError, ValueError) as e:
-        logging.warning(f"Primary Connecteam API failed: {e}")
+        if page is None:
+            return result
+        response.headers.update(_page_headers(page))
+        if generations:
+            http_cache.set_etag(response, http_cache.make_etag(request, generations))
+        return page["data"]
+    except (ConnectionError, TimeoutError, ValueError, HTTPException) as e:
+        logging.warning("Primary Connecteam API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             list_task = services.ConnecteamClient()
             tasks_info = await list_task.list_tasks(limit=limit, offset=offset, status=status)
             if isinstance(tasks_info, dict):
                 return _unwrap_result(tasks_info)
-        except HTTPException as e:
+        except Exception:
             logging.exception("Fallback list_tasks failed")
-            raise HTTPException(status_code=500, detail="Both primary and fallback Connecteam services failed.")
+
+        snapshot = snapshot_store.load_snapshot(dataset)
+        data_to_process = _tasks_to_process(_unwrap_result(snapshot["payload"])) if snapshot else None
+        if data_to_process is None:
+            return _serve_snapshot(dataset)
+        # No get_user here: the upstream is down, so names are left empty
+        page = conneteam_bridge.get_task_page(data_to_process, get_user=None, **page_kwargs) or {"data": [], "total": 0, "next_cursor": None}
+        content, headers = snapshot_store.mark_stale(page["data"], snapshot["saved_at"])
+        logging.warning("Serving last-known-good snapshot for %s", dataset)
+        metrics.record_cache(dataset, "stale")
+        return JSONResponse(content=content, headers={**headers, **_page_headers(page)})
             
                 
 
 
+@router.post("/webhook")
+async def connecteam_webhook(payload: Dict[str, Any] = Body(...), token: str = Query(None)):
+    """Connecteam webhook: drop the cached task lists and push the change to dashboards.
+
+    Register the webhook URL with ``?token=<CONNECTEAM_WEBHOOK_TOKEN>``. Calls
+    without the matching token are rejected, and the endpoint is disabled
+    (404) while no token is configured, since every call forces a re-crawl.
+    """
+    expected = os.getenv("CONNECTEAM_WEBHOOK_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not configured")
+    if not token or not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook token")
+
+    event_type = payload.get("eventType") or payload.get("type") or "unknown"
+    snapshot_store.invalidate("tasks")
+
+    data = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+    task_id = data.get("taskId") or data.get("id")
+    if task_id is not None and data.get("status") is not None:
+        dashboard_events.publish_task_statuses(
+            [{"task_id": task_id, "title": data.get("title"), "status": data.get("status"), "previous": None}],
+            source="webhook",
+        )
+    else:
+        dashboard_events.publish_dataset_invalidated("tasks")
+    logging.info("Connecteam webhook %s processed", event_type)
+    return {"status": "ok"}
+
+
 @router.get("/task/{task_id}")
 async def get_a_task(task_id: str):
     try:
-        resp = connecteam_api_client.get_task(task_id)
+        resp = await asyncio.to_thread(connecteam_api_client.get_task, task_id)
         return _unwrap_result(resp)
     except (ConnectionError, TimeoutError, ValueError) as e:
-        logging.warning(f"Primary Connecteam API failed: {e}")
+        logging.warning("Primary Connecteam API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             get_task = services.ConnecteamClient()
@@ -125,34 +246,55 @@ async def get_a_task(task_id: str):
 @router.post("/task", status_code=status.HTTP_201_CREATED)
 async def create_task(payload: Dict[str, Any] = Body(...)):
     try:
-        resp = connecteam_api_client.create_task(payload)
-        return _unwrap_result(resp)
+        resp = await asyncio.to_thread(connecteam_api_client.create_task, payload)
+        result = _unwrap_result(resp)
+        await asyncio.to_thread(task_writes.apply_task_write, "created", None, resp, payload)
+        return result
     except (ConnectionError, TimeoutError, ValueError) as e:
-        logging.warning(f"Primary Connecteam API failed: {e}")
+        logging.warning("Primary Connecteam API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             create_task = services.ConnecteamClient()
             task_created = await create_task.create_task(payload=payload)
             if isinstance(task_created, dict):
-                return _unwrap_result(task_created)
+                result = _unwrap_result(task_created)
+                await asyncio.to_thread(task_writes.apply_task_write, "created", None, task_created, payload)
+                return result
         except HTTPException as e:
             logging.error("Fallback create_task failed")
             raise HTTPException(status_code=500, detail="Both primary and fallback Connecteam services failed.")
 
 
+@router.post("/tasks/bulk")
+async def bulk_tasks_write(request: BulkTaskRequest):
+    """Create / update many tasks with bounded concurrency; returns per-item results and a resumable batch_id."""
+    if len(request.items) > bulk_tasks.MAX_BULK_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {bulk_tasks.MAX_BULK_ITEMS} items per batch")
+    return await bulk_tasks.run_bulk(
+        [item.model_dump() for item in request.items],
+        create=connecteam_api_client.create_task,
+        update=connecteam_api_client.update_task,
+        batch_id=request.batch_id,
+    )
+
+
 @router.put("/task/{task_id}")
 async def update_task(task_id: str, payload: Dict[str, Any] = Body(...)):
     try:
-        resp = connecteam_api_client.update_task(task_id, payload)
-        return _unwrap_result(resp)
+        resp = await asyncio.to_thread(connecteam_api_client.update_task, task_id, payload)
+        result = _unwrap_result(resp)
+        await asyncio.to_thread(task_writes.apply_task_write, "updated", task_id, resp, payload)
+        return result
     except (ConnectionError, TimeoutError, ValueError) as e:
-        logging.warning(f"Primary Connecteam API failed: {e}")
+        logging.warning("Primary Connecteam API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             update_task = services.ConnecteamClient()
             task_created = await update_task.update_task(task_id=task_id,payload=payload)
             if isinstance(task_created, dict):
-                return _unwrap_result(task_created) # not sure if we need this 
+                result = _unwrap_result(task_created)
+                await asyncio.to_thread(task_writes.apply_task_write, "updated", task_id, task_created, payload)
+                return result
         except HTTPException as e:
             logging.error("Fallback update_task failed")
             raise HTTPException(status_code=500, detail="Both primary and fallback Connecteam services failed.")
@@ -161,55 +303,103 @@ async def update_task(task_id: str, payload: Dict[str, Any] = Body(...)):
 
 @router.delete("/task/{task_id}")
 async def delete_task(task_id: str):
-    resp = connecteam_api_client.delete_task(task_id)
-    return _unwrap_result(resp)
+    resp = await asyncio.to_thread(connecteam_api_client.delete_task, task_id)
+    result = _unwrap_result(resp)
+    await asyncio.to_thread(task_writes.apply_task_write, "deleted", task_id, resp)
+    return result
 
 @router.get("/jobs")
-async def list_get_jobs():
-    resp = connecteam_api_client.list_get_jobs()
-    return _unwrap_result(resp)
+async def list_get_jobs(refresh: bool = Query(False, description="Re-crawl the job list instead of using the cached directory")):
+    """Every job and sub-job, from the cached job directory."""
+    directory = await asyncio.to_thread(job_directory.refresh if refresh else job_directory.get_directory)
+    return directory.payload
+
+
+@router.get("/users")
+async def list_users(
+    skill: str = Query(None, description="Only users with this skill tag, e.g. Housekeeping"),
+    active: bool = Query(True, description="Only active (non-archived) users"),
+    refresh: bool = Query(False, description="Re-crawl the user list instead of using the cached directory"),
+):
+    """Users from the synced user directory, optionally filtered by skill tag."""
+    directory = await asyncio.to_thread(user_directory.refresh if refresh else user_directory.get_directory)
+    if skill:
+        return directory.with_skill(skill, active_only=active)
+    return directory.to_list(active_only=active)
 
 
 @router.get("/taskboard")
 async def get_taskboard():
-    resp = connecteam_api_client.list_taskboards()
+    resp = await asyncio.to_thread(connecteam_api_client.list_taskboards)
     return _unwrap_result(resp)
 
 
 @router.get("/activity")
 async def get_time_activity(
-    startDate: str,
-    endDate: str,
+    startDate: str = Query(..., description="First day of the range - YYYY-MM-DD"),
+    endDate: str = Query(..., description="Last day of the range - YYYY-MM-DD"),
     user_id: str = Query(None, description="Filter by user ID(s) - comma separated list (optional)"),
-    title: str = Query(None, description="Filter by task title - partial match (optional)"),
-    duedate: str = Query(None, description="Filter by due date - YYYY-MM-DD format (optional)"),
+    job_id: str = Query(None, description="Filter by job ID(s) - comma separated list (optional)"),
+    time_clock_id: str = Query(None, description="Filter by time clock ID(s) - comma separated list (optional)"),
 ):
-    try:
-        resp = connecteam_api_client.get_time_activity(startDate=startDate, endDate=endDate)
-        result = _unwrap_result(resp)
+    """Hours worked in the range, across all time clocks: totals plus per-user, per-job and per-local-day summaries."""
+    def fetch(start_date, end_date):
+        return _unwrap_result(connecteam_sources.get_time_activity(startDate=start_date, endDate=end_date))
 
-        if not result:
-            return []
-
-        # If the API already returned a list, wrap it for the bridge
-        if isinstance(result, list):
-            data_to_process = {"data": {"tasks": result}}
-        # If the API returned a dict with data.tasks, pass that through
-        elif isinstance(result, dict) and isinstance(result.get("data", {}).get("tasks"), list):
-            data_to_process = result
-        else:
-            # Unknown shape; return raw
-            return result
+    try:
+        time_activity.parse_range(startDate, endDate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        processed = conneteam_bridge.get_times(
-            data_to_process,
-            get_user=connecteam_api_client.get_user,
-            user_id=user_id,
-            title=title,
-            duedate=duedate,
+    try:
+        shifts = time_activity.filter_ids(await time_activity.load_shifts(startDate, endDate, fetch),
+                                          "time_clock_id", time_clock_id)
+        summary = await asyncio.to_thread(
+            lambda: time_activity.summarize(time_activity.rollup(shifts), user_ids=user_id, job_ids=job_id)
         )
-        return processed if processed is not None else result
+        jobs = await asyncio.to_thread(job_directory.get_directory)
+        jobs.annotate(summary["by_job"])
+    except HTTPException:
+        raise
     except Exception:
         logging.exception("Error retrieving activity data")
         raise HTTPException(status_code=500, detail="Failed to retrieve activity data")
-    
\ No newline at end of file
+    return {"startDate": startDate, "endDate": endDate, **summary}
+    
+
+
+@router.get("/activity/audit")
+async def audit_time_activity(
+    startDate: str = Query(..., description="First day of the range - YYYY-MM-DD"),
+    endDate: str = Query(..., description="Last day of the range - YYYY-MM-DD"),
+    user_id: str = Query(None, description="Filter by user ID(s) - comma separated list (optional)"),
+    time_clock_id: str = Query(None, description="Filter by time clock ID(s) - comma separated list (optional)"),
+    min_gap_minutes: float = Query(shift_intervals.DEFAULT_MIN_GAP_MINUTES, ge=0, description="Shortest gap between shifts to flag"),
+    max_gap_hours: float = Query(shift_intervals.DEFAULT_MAX_GAP_HOURS, gt=0, description="Longest gap still treated as a break"),
+    at: int = Query(None, description="Epoch seconds; list users on the clock at that instant (optional)"),
+):
+    """Payroll audit: overlapping shifts, gaps, per-user coverage, auto clock-outs and open shifts."""
+    def fetch(start_date, end_date):
+        return _unwrap_result(connecteam_sources.get_time_activity(startDate=start_date, endDate=end_date))
+
+    try:
+        time_activity.parse_range(startDate, endDate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        shifts = await time_activity.load_shifts(startDate, endDate, fetch)
+        shifts = time_activity.filter_ids(shifts, "user_id", user_id)
+        shifts = time_activity.filter_ids(shifts, "time_clock_id", time_clock_id)
+        report = await asyncio.to_thread(
+            shift_intervals.audit, shifts, min_gap_minutes=min_gap_minutes, max_gap_hours=max_gap_hours, at=at
+        )
+        jobs = await asyncio.to_thread(job_directory.get_directory)
+        shift_rows = [o[key] for o in report["overlaps"] for key in ("shift", "overlaps_with")]
+        jobs.annotate(shift_rows + report["auto_clock_outs"] + report["open_shifts"], sub_key="sub_job_id")
+    except HTTPException:
+        raise
+    except Exception:
+        logging.exception("Error auditing activity data")
+        raise HTTPException(status_code=500, detail="Failed to audit activity data")
+    return {"startDate": startDate, "endDate": endDate, **report}
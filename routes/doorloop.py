@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException 
-from typing import Any, Dict, List
-import os , sys, logging
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from typing import Any, Dict, List, Optional
+import os , sys, logging, asyncio
 from services.doorloop_services import DoorloopClient
 from services import doorloop_api_client  # Pure HTTP API client (no MCP)
 from pathlib import Path
@@ -15,8 +16,10 @@ except Exception as e:
     logging.exception("there was an error loading mcp service file")
     
 
+from utils import metrics
+
 try:
-    from middle_layer import doorloop_bridge
+    from middle_layer import doorloop_bridge, doorloop_mirror, http_cache, pagination, snapshot_store
 except Exception as exc:
 	raise ImportError(f"Failed to import mcp_server. Ensure project root is correct: {PROJECT_ROOT}\nOriginal error: {exc}")
     
@@ -44,74 +47,236 @@ def _unwrap_result(resp: Any) -> Any:
     return resp or {"message": "Empty response from MCP service"}
 
 
+async def _fetch_dataset(dataset: str) -> Any:
+    """Fetch a whole DoorLoop dataset through the Redis cache / snapshot store.
+
+    Runs in a worker thread so a vendor crawl doesn't block other requests.
+    """
+    return _unwrap_result(await asyncio.to_thread(doorloop_bridge.fetch_doorloop_dataset, dataset))
+
+
+def _serve_snapshot(*datasets: str, build=None):
+    """Serve last-known-good data when both the primary and the MCP fallback failed.
+
+    `build` combines the snapshot payloads (in `datasets` order) into the route
+    response; by default the single payload is returned as-is.
+    """
+    snapshots = [snapshot_store.load_snapshot(name) for name in datasets]
+    if not all(snapshots):
+        raise HTTPException(status_code=500, detail="Both primary and fallback Doorloop services failed.")
+
+    payloads = [snap["payload"] for snap in snapshots]
+    content = build(*payloads) if build else payloads[0]
+    oldest = min(snap["saved_at"] for snap in snapshots)
+    logging.warning("Serving last-known-good snapshot for %s", ", ".join(datasets))
+    for name in datasets:
+        metrics.record_cache(name, "stale")
+    content, headers = snapshot_store.mark_stale(content, oldest)
+    if isinstance(content, dict) and content.get("next_cursor"):
+        headers["X-Next-Cursor"] = content["next_cursor"]
+    return JSONResponse(content=content, headers=headers)
+
+
+def _decode_cursor(cursor: Optional[str]) -> Dict[str, Any]:
+    try:
+        return pagination.decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _query_mirror(entity: str, filters: Dict[str, Any], sort: Optional[str], descending: bool,
+                  limit: int, offset: int, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Serve a list route from the SQLite mirror; None when the mirror can't serve it yet.
+
+    A cursor from the previous page continues right after its last row (keyset
+    pagination), so deep pages cost the same as the first one.
+    """
+    state = _decode_cursor(cursor)
+    after = None
+    if state.get("after") is not None:
+        if state.get("sort") != sort or bool(state.get("desc")) != descending:
+            raise HTTPException(status_code=400, detail="Cursor does not match the requested sort order")
+        after = tuple(state["after"])
+    start = state.get("offset", offset) if cursor else offset
+    try:
+        if doorloop_mirror.ensure_synced(entity):
+            result = doorloop_mirror.query(entity, filters=filters, sort=sort, descending=descending,
+                                           limit=limit, offset=start, after=after)
+        else:
+            return None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logging.exception("DoorLoop mirror query for %s failed; using the live API", entity)
+        return None
+
+    next_key = result.pop("next")
+    field_list = pagination.parse_fields(fields)
+    result["data"] = [pagination.project(item, field_list) for item in result["data"]]
+    result["next_cursor"] = pagination.encode_cursor({
+        "after": list(next_key),
+        "offset": start + len(result["data"]),
+        "sort": sort,
+        "desc": descending,
+    }) if next_key else None
+    return result
+
+
+def _page_payload(payload: Any, cursor: Optional[str], limit: int, fields: Optional[str], offset: int = 0):
+    """Cursor-paginate and project a whole cached DoorLoop list payload."""
+    items = payload.get("data") if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        return payload
+    start = _decode_cursor(cursor).get("offset", 0) if cursor else offset
+    return pagination.paginate(items, limit=limit, fields=pagination.parse_fields(fields), offset=start)
+
+
+def _filtered_page(entity: str, payload: Any, filters: Dict[str, Any], sort: Optional[str], descending: bool,
+                   cursor: Optional[str], limit: int, fields: Optional[str], offset: int = 0):
+    """`_page_payload` for when the mirror can't serve: filters and sort are applied in memory."""
+    items = payload.get("data") if isinstance(payload, dict) else payload
+    if isinstance(items, list):
+        try:
+            payload = {"data": doorloop_mirror.filter_objects(entity, items, filters, sort, descending)}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return _page_payload(payload, cursor, limit, fields, offset)
+
+
+def _unfiltered(filters: Dict[str, Any], sort: Optional[str]) -> bool:
+    """True when a list request has no filters or sort, so the MCP fallback's whole list answers it."""
+    return not sort and all(value is None for value in filters.values())
+
+
+def _with_cursor_header(response: Response, page: Any) -> Any:
+    """Expose the next page cursor as X-Next-Cursor too, for clients that only read headers."""
+    if isinstance(page, dict) and page.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page
+
+
+def _mirror_etag(request: Request, entity: str) -> Optional[str]:
+    """ETag for a mirror-served list; None until the entity has been mirrored."""
+    mirror_generation = doorloop_mirror.generation(entity)
+    return http_cache.make_etag(request, entity, mirror_generation) if mirror_generation else None
+
+
+def _mirror_not_modified(request: Request, entity: str):
+    """304 response when the client already has the current mirror generation, else None."""
+    etag = _mirror_etag(request, entity)
+    return http_cache.not_modified(etag) if http_cache.etag_matches(request, etag) else None
+
+
+def _mirror_response(request: Request, response: Response, entity: str, page: Dict[str, Any]):
+    http_cache.set_etag(response, _mirror_etag(request, entity))
+    return _with_cursor_header(response, page)
+
+
+TENANT_DATASETS = ("tenants", "properties", "leases", "lease_payments")
+
+
+def _tenant_overview(tenants_data, property_data, lease_data, payment_data, tenant_list):
+    """Combine tenant rows with the portfolio overview numbers for /tenants."""
+    overview = doorloop_bridge.portfolio_overview(
+        prop_raw_data=property_data,
+        tenant_raw_data=tenants_data,
+        lease_raw_data=lease_data,
+        payment_raw_data=payment_data,
+    )
+    total_rent_due = overview["total_rent_due"]
+    return {
+        "tenants": tenant_list if isinstance(tenant_list, list) else [],
+        "total_properties": overview["total_properties"],
+        "active_tenants_count": len(overview["active_tenant_ids"]),
+        "total_rent_due": f"${total_rent_due:,.2f}",
+        "active_leases_count": len(overview["active_lease_ids"]),
+        "vacant_units": overview["vacant_units"],
+        "outstanding_balance": total_rent_due,
+        "overdue_balance": overview["overdue_balance"],
+        "month_list": overview["month_list"],
+        "rent_list": overview["rent_list"],
+        "profit": sum(overview["rent_list"])
+    }
+
+
 @router.get("/tenants")
-async def get_tenants():
+async def get_tenants(request: Request, response: Response):
     _require_api_key()
     
+    # Repeat polls: answer 304 from the cached generations without building anything
+    generations = snapshot_store.fresh_generation_key(*TENANT_DATASETS)
+    if generations:
+        etag = http_cache.make_etag(request, generations)
+        if http_cache.etag_matches(request, etag):
+            return http_cache.not_modified(etag)
+    
     # Use pure HTTP API client instead of MCP to avoid pipe errors
     try:
-        # Fetch all data
-        tenants_data = doorloop_api_client.retrieve_tenants()
-        property_data = doorloop_api_client.retrieve_properties()
-        lease_data = doorloop_api_client.retrieve_leases()
-           
-        # Get aggregated overview information first
-        total_properties, active_tenants_list, total_rent_due, active_leases_list, month_list, rent_list = doorloop_bridge.fetch_accumulative_info(
-            prop_raw_data=property_data,
-            tenant_raw_data=tenants_data,
-            lease_raw_data=lease_data,
-         
+        # Fetch all data (Redis first, vendor on a miss)
+        tenants_data, property_data, lease_data, payment_data = await asyncio.gather(
+            *(_fetch_dataset(name) for name in TENANT_DATASETS)
         )
         
         # Get filtered tenant info for the list
-        tenant_list, _, _ = doorloop_bridge.get_doorloop_tenants(tenants_data)
+        tenant_list = doorloop_bridge.get_doorloop_tenants(tenants_data, lease_data=lease_data, property_data=property_data)
         
         # Build combined response with overview data
-        response = {
-            "tenants": tenant_list if isinstance(tenant_list, list) else [],
-            "total_properties": total_properties,
-            "active_tenants_count": len(active_tenants_list) if isinstance(active_tenants_list, list) else 0,
-            "total_rent_due": f"${total_rent_due:,.2f}",
-            "active_leases_count": len(active_leases_list) if isinstance(active_leases_list, list) else 0,
-            "vacant_units": 0,  # Calculate based on your business logic
-            "outstanding_balance": total_rent_due,
-            "month_list": month_list,
-            "rent_list":rent_list,
-            "profit": sum(rent_list)
-        }
-        
-        return response
+        overview = _tenant_overview(tenants_data, property_data, lease_data, payment_data, tenant_list)
+        generations = snapshot_store.generation_key(*TENANT_DATASETS)
+        if generations:
+            http_cache.set_etag(response, http_cache.make_etag(request, generations))
+        return overview
         
-    except(ConnectionError, TimeoutError, ValueError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
+    except(ConnectionError, TimeoutError, ValueError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             tenants = services.DoorloopClient()
-            tenants_info = tenants.retrieve_tenants()
+            tenants_info = await tenants.retrieve_tenants()
             if isinstance(tenants_info, dict):
                 return _unwrap_result(tenants_info)
-        except HTTPException as e:
+        except Exception:
             logging.exception("an error occur the retrieve_tenants server is down. check connecteam_service")
-            raise  HTTPException(status_code=500,detail="Both primary and fallback Doorloop services failed.")
+        return _serve_snapshot("tenants", "properties", "leases", "lease_payments", "tenant_rows", build=_tenant_overview)
             
             
 @router.get("/properties")
-async def get_properties():
+async def get_properties(
+    request: Request,
+    response: Response,
+    city: str = Query(None, description="Filter by city (optional)"),
+    sort: str = Query(None, description="Sort column, e.g. name (optional)"),
+    descending: bool = Query(False, description="Sort descending"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of properties to return"),
+    offset: int = Query(0, ge=0, description="Number of properties to skip"),
+    cursor: str = Query(None, description="Opaque cursor from the previous page's next_cursor (optional)"),
+    fields: str = Query(None, description="Comma-separated fields to return, e.g. id,name,address.city (optional)"),
+):
     _require_api_key()
+    filters = {"city": city}
+    not_modified = _mirror_not_modified(request, "properties")
+    if not_modified is not None:
+        return not_modified
+    mirrored = _query_mirror("properties", filters, sort, descending, limit, offset, cursor, fields)
+    if mirrored is not None:
+        return _mirror_response(request, response, "properties", mirrored)
+    build = lambda payload: _filtered_page("properties", payload, filters, sort, descending, cursor, limit, fields, offset)
     try:
-        resp = doorloop_api_client.retrieve_properties()
-        return _unwrap_result(resp)
-    except(ConnectionError, ValueError, TimeoutError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
-        logging.info("Trying fallback service...")
-        try:
-            properties = services.DoorloopClient()
-            properties_info  = properties.retrieve_properties()
-            if isinstance(properties_info, dict):
-                return _unwrap_result(properties_info)
-        except HTTPException as e:
-            logging.error(f"Fallback Connecteam service also failed: {e}")
-            raise  HTTPException(status_code=500,detail="Both primary and fallback Doorloop services failed.")
+        payload = await _fetch_dataset("properties")
+    except (ConnectionError, ValueError, TimeoutError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
+        # The MCP fallback returns the whole list; only use it when nothing needs filtering
+        if _unfiltered(filters, sort):
+            logging.info("Trying fallback service...")
+            try:
+                properties = services.DoorloopClient()
+                properties_info  = await properties.retrieve_properties()
+                if isinstance(properties_info, dict):
+                    return _unwrap_result(properties_info)
+            except Exception as e:
+                logging.error("Fallback Doorloop service also failed: %s", e)
+        return _serve_snapshot("properties", build=build)
+    return _with_cursor_header(response, build(payload))
                        
 
 
@@ -119,118 +284,188 @@ async def get_properties():
 async def get_tenant(tenant_id: str):
     _require_api_key()
     try:
-        resp = doorloop_api_client.retrieve_a_tenants(tenant_id)
+        resp = await asyncio.to_thread(doorloop_api_client.retrieve_a_tenants, tenant_id)
         return _unwrap_result(resp)
-    except (ConnectionError, ValueError, TimeoutError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
+    except (ConnectionError, ValueError, TimeoutError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             each__tenant = services.DoorloopClient()
-            tenant_info  = each__tenant.retrieve_a_tenant(tenant_id= tenant_id)
+            tenant_info  = await each__tenant.retrieve_a_tenant(tenant_id= tenant_id)
             if isinstance(tenant_info, dict):
                 return _unwrap_result(tenant_info)
-        except HTTPException as e:
-            logging.error(f"Fallback Connecteam service also failed: {e}")
-            raise  HTTPException(status_code=500,detail="Both primary and fallback Doorloop services failed.")
+        except Exception as e:
+            logging.error("Fallback Doorloop service also failed: %s", e)
+        raise  HTTPException(status_code=500,detail="Both primary and fallback Doorloop services failed.")
         
 
 @router.get("/leases")
-async def get_leases():
+async def get_leases(
+    request: Request,
+    response: Response,
+    property_id: str = Query(None, description="Filter by property ID (optional)"),
+    tenant_id: str = Query(None, description="Filter by tenant ID (optional)"),
+    lease_status: str = Query(None, alias="status", description="Filter by lease status, e.g. ACTIVE (optional)"),
+    overdue: bool = Query(None, description="Only leases with (true) or without (false) an overdue balance"),
+    sort: str = Query(None, description="Sort column, e.g. overdue_balance or end_date (optional)"),
+    descending: bool = Query(False, description="Sort descending"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of leases to return"),
+    offset: int = Query(0, ge=0, description="Number of leases to skip"),
+    cursor: str = Query(None, description="Opaque cursor from the previous page's next_cursor (optional)"),
+    fields: str = Query(None, description="Comma-separated fields to return, e.g. id,name,address.city (optional)"),
+):
     _require_api_key()
+    filters = {"property_id": property_id, "tenant_id": tenant_id, "status": lease_status, "overdue": overdue}
+    not_modified = _mirror_not_modified(request, "leases")
+    if not_modified is not None:
+        return not_modified
+    mirrored = _query_mirror("leases", filters, sort, descending, limit, offset, cursor, fields)
+    if mirrored is not None:
+        return _mirror_response(request, response, "leases", mirrored)
+    build = lambda payload: _filtered_page("leases", payload, filters, sort, descending, cursor, limit, fields, offset)
     try:
-        resp = doorloop_api_client.retrieve_leases()
-        data_list, lease_status = doorloop_bridge.get_lease_info(resp)
-        return _unwrap_result(data_list)
-    except (ConnectionError, ValueError, TimeoutError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
-        logging.info("Trying fallback service...")
-        try:
-            lease = services.DoorloopClient()
+        payload = await _fetch_dataset("leases")
+    except (ConnectionError, ValueError, TimeoutError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
+        # The MCP fallback returns the whole list; only use it when nothing needs filtering
+        if _unfiltered(filters, sort):
+            logging.info("Trying fallback service...")
+            try:
+                lease = services.DoorloopClient()
             
-            get_lease  = lease.retrieve_leases()
-            filtered_data = doorloop_bridge.get_lease_info(get_lease)
-            if isinstance(filtered_data, dict):
-                return _unwrap_result(filtered_data)
-        except HTTPException as e:
-            logging.error(f"Fallback Connecteam service also failed: {e}")
-            raise  HTTPException(status_code=500,detail="Both primary and fallback Doorloop services failed.")
+                get_lease  = await lease.retrieve_leases()
+                if isinstance(get_lease, dict):
+                    return _unwrap_result(get_lease)
+            except Exception as e:
+                logging.error("Fallback Doorloop service also failed: %s", e)
+        return _serve_snapshot("leases", build=build)
+    return _with_cursor_header(response, build(payload))
 
 
 @router.get("/communications")
-async def get_communications():
+async def get_communications(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Number of communications to return"),
+    cursor: str = Query(None, description="Opaque cursor from the previous page's next_cursor (optional)"),
+    fields: str = Query(None, description="Comma-separated fields to return, e.g. id,name,address.city (optional)"),
+):
     """Retrieve DoorLoop communications data."""
     _require_api_key()
+    _decode_cursor(cursor)  # reject a malformed cursor with 400 before any fetch
     try:
-        resp = doorloop_api_client.retrieve_doorloop_communication()
-        return _unwrap_result(resp)
-    except (ConnectionError, ValueError, TimeoutError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
+        return _with_cursor_header(response, _page_payload(await _fetch_dataset("communications"), cursor, limit, fields))
+    except (ConnectionError, ValueError, TimeoutError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             comms = services.DoorloopClient()
             get_comms = await comms.retrieve_doorloop_communication()
             if isinstance(get_comms, dict):
                 return _unwrap_result(get_comms)
-        except HTTPException as e:
-            logging.error(f"Fallback Doorloop service also failed: {e}")
-            raise HTTPException(status_code=500, detail="Both primary and fallback Doorloop services failed.")
+        except Exception as e:
+            logging.error("Fallback Doorloop service also failed: %s", e)
+        return _serve_snapshot("communications", build=lambda payload: _page_payload(payload, cursor, limit, fields))
 
 @router.get("/tasks")
 async def retrieve_doorloop_tasks():
     """Retrieve DoorLoop tasks data."""
     _require_api_key()
     try:
-        resp = doorloop_api_client.retrieve_doorloop_tasks()
-        return _unwrap_result(resp)
-    except (ConnectionError, ValueError, TimeoutError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
+        return await _fetch_dataset("doorloop_tasks")
+    except (ConnectionError, ValueError, TimeoutError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
         logging.info("Trying fallback service...")
         try:
             tasks = services.DoorloopClient()
             get_tasks = await tasks.retrieve_doorloop_tasks()
             if isinstance(get_tasks, dict):
                 return _unwrap_result(get_tasks)
-        except HTTPException as e:
-            logging.error(f"Fallback Doorloop service also failed: {e}")
-            raise HTTPException(status_code=500, detail="Both primary and fallback Doorloop services failed.")
+        except Exception as e:
+            logging.error("Fallback Doorloop service also failed: %s", e)
+        return _serve_snapshot("doorloop_tasks")
 
 @router.get("/lease-payments")
-async def retrieve_doorloop_lease_payment():
+async def retrieve_doorloop_lease_payment(
+    request: Request,
+    response: Response,
+    lease_id: str = Query(None, description="Filter by lease ID (optional)"),
+    property_id: str = Query(None, description="Filter by property ID (optional)"),
+    date_from: str = Query(None, description="Payments on or after YYYY-MM-DD (optional)"),
+    date_to: str = Query(None, description="Payments on or before YYYY-MM-DD (optional)"),
+    sort: str = Query(None, description="Sort column, e.g. date or amount (optional)"),
+    descending: bool = Query(False, description="Sort descending"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of payments to return"),
+    offset: int = Query(0, ge=0, description="Number of payments to skip"),
+    cursor: str = Query(None, description="Opaque cursor from the previous page's next_cursor (optional)"),
+    fields: str = Query(None, description="Comma-separated fields to return, e.g. id,name,address.city (optional)"),
+):
     """Retrieve DoorLoop lease payments data."""
     _require_api_key()
+    filters = {"lease_id": lease_id, "property_id": property_id, "date_from": date_from, "date_to": date_to}
+    not_modified = _mirror_not_modified(request, "lease_payments")
+    if not_modified is not None:
+        return not_modified
+    mirrored = _query_mirror("lease_payments", filters, sort, descending, limit, offset, cursor, fields)
+    if mirrored is not None:
+        return _mirror_response(request, response, "lease_payments", mirrored)
+    build = lambda payload: _filtered_page("lease_payments", payload, filters, sort, descending, cursor, limit, fields, offset)
     try:
-        resp = doorloop_api_client.retrieve_doorloop_lease_payment()
-        return _unwrap_result(resp)
-    except (ConnectionError, ValueError, TimeoutError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
-        logging.info("Trying fallback service...")
-        try:
-            payments = services.DoorloopClient()
-            get_payments = await payments.retrieve_doorloop_lease_payment()
-            if isinstance(get_payments, dict):
-                return _unwrap_result(get_payments)
-        except HTTPException as e:
-            logging.error(f"Fallback Doorloop service also failed: {e}")
-            raise HTTPException(status_code=500, detail="Both primary and fallback Doorloop services failed.")
+        payload = await _fetch_dataset("lease_payments")
+    except (ConnectionError, ValueError, TimeoutError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
+        # The MCP fallback returns the whole list; only use it when nothing needs filtering
+        if _unfiltered(filters, sort):
+            logging.info("Trying fallback service...")
+            try:
+                payments = services.DoorloopClient()
+                get_payments = await payments.retrieve_doorloop_lease_payment()
+                if isinstance(get_payments, dict):
+                    return _unwrap_result(get_payments)
+            except Exception as e:
+                logging.error("Fallback Doorloop service also failed: %s", e)
+        return _serve_snapshot("lease_payments", build=build)
+    return _with_cursor_header(response, build(payload))
 
 @router.get("/expenses")
-async def retrieve_doorloop_expenses():
+async def retrieve_doorloop_expenses(
+    request: Request,
+    response: Response,
+    property_id: str = Query(None, description="Filter by property ID (optional)"),
+    date_from: str = Query(None, description="Expenses on or after YYYY-MM-DD (optional)"),
+    date_to: str = Query(None, description="Expenses on or before YYYY-MM-DD (optional)"),
+    sort: str = Query(None, description="Sort column, e.g. date or amount (optional)"),
+    descending: bool = Query(False, description="Sort descending"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of expenses to return"),
+    offset: int = Query(0, ge=0, description="Number of expenses to skip"),
+    cursor: str = Query(None, description="Opaque cursor from the previous page's next_cursor (optional)"),
+    fields: str = Query(None, description="Comma-separated fields to return, e.g. id,name,address.city (optional)"),
+):
     """Retrieve DoorLoop expenses data."""
     _require_api_key()
+    filters = {"property_id": property_id, "date_from": date_from, "date_to": date_to}
+    not_modified = _mirror_not_modified(request, "expenses")
+    if not_modified is not None:
+        return not_modified
+    mirrored = _query_mirror("expenses", filters, sort, descending, limit, offset, cursor, fields)
+    if mirrored is not None:
+        return _mirror_response(request, response, "expenses", mirrored)
+    build = lambda payload: _filtered_page("expenses", payload, filters, sort, descending, cursor, limit, fields, offset)
     try:
-        resp = doorloop_api_client.retrieve_doorloop_expenses()
-        return _unwrap_result(resp)
-    except (ConnectionError, ValueError, TimeoutError) as e:
-        logging.warning(f"Primary Doorloop API failed: {e}")
-        logging.info("Trying fallback service...")
-        try:
-            expenses = services.DoorloopClient()
-            get_expenses = await expenses.retrieve_doorloop_expenses()
-            if isinstance(get_expenses, dict):
-                return _unwrap_result(get_expenses)
-        except HTTPException as e:
-            logging.error(f"Fallback Doorloop service also failed: {e}")
-            raise HTTPException(status_code=500, detail="Both primary and fallback Doorloop services failed.")
+        payload = await _fetch_dataset("expenses")
+    except (ConnectionError, ValueError, TimeoutError, HTTPException) as e:
+        logging.warning("Primary Doorloop API failed: %s", e)
+        # The MCP fallback returns the whole list; only use it when nothing needs filtering
+        if _unfiltered(filters, sort):
+            logging.info("Trying fallback service...")
+            try:
+                expenses = services.DoorloopClient()
+                get_expenses = await expenses.retrieve_doorloop_expenses()
+                if isinstance(get_expenses, dict):
+                    return _unwrap_result(get_expenses)
+            except Exception as e:
+                logging.error("Fallback Doorloop service also failed: %s", e)
+        return _serve_snapshot("expenses", build=build)
+    return _with_cursor_header(response, build(payload))
 
 @router.get("/balance-sheet/report")
 async def balance_sheet_report():
@@ -7,6 +7,8 @@ import asyncio
 from typing import Dict, Any
 from abc import ABC
 import logging
+import time
+from utils import metrics, tracing
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +27,10 @@ class BaseMCPserver(ABC):
         self.server_script = str(sp)
         self.session = None
         self.stdio = None
+        self._counted_open = False
 
     async def __aenter__(self):
+        metrics.MCP_SESSIONS.labels(server=self.server_name, state="connecting").inc()
         try:
             params = StdioServerParameters(
                 command=sys.executable,
@@ -38,13 +42,20 @@ class BaseMCPserver(ABC):
             self.session = ClientSession(stdio_transport[0], stdio_transport[1])
 
             await self.session.initialize()
+            metrics.MCP_SESSIONS.labels(server=self.server_name, state="open").inc()
+            self._counted_open = True
             return self
 
         except Exception:
             await self.__aexit__(None, None, None)
             raise
+        finally:
+            metrics.MCP_SESSIONS.labels(server=self.server_name, state="connecting").dec()
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._counted_open:
+            metrics.MCP_SESSIONS.labels(server=self.server_name, state="open").dec()
+            self._counted_open = False
         try:
             if self.session:
                 await self.session.close()
@@ -56,12 +67,21 @@ class BaseMCPserver(ABC):
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
         if not self.session:
             raise RuntimeError(f"{self.server_name} service not connected")
+        started = time.perf_counter()
+        outcome = "ok"
         try:
-            result = await self.session.call_tool(tool_name, arguments)
+            with tracing.span(f"mcp {self.server_name}.{tool_name}", **{"mcp.server": self.server_name, "mcp.tool": tool_name}) as span:
+                # The server parents its tool span on this one (see tracing.traced_tool)
+                meta = {"traceparent": span.traceparent} if span.traceparent else None
+                result = await self.session.call_tool(tool_name, arguments, meta=meta)
             return {"result": getattr(result, 'content', result)}
         except Exception as e:
+            outcome = "error"
             logger.error(f"Tool {tool_name} execution failed: {e}")
             return {"error": str(e)}
+        finally:
+            metrics.MCP_TOOL_SECONDS.labels(server=self.server_name, tool=tool_name, outcome=outcome).observe(
+                time.perf_counter() - started)
 
     async def list_tools(self):
         if not self.session:
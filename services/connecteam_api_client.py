@@ -5,10 +5,14 @@ Eliminates MCP stdio pipe issues by making direct HTTP requests.
 import os
 import requests
 from typing import Any, Dict, Optional
+from services import http_session
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Pooled, retrying and instrumented (see services/http_session.py)
+_session = http_session.get_session("connecteam")
+
 
 def _get_headers() -> Dict[str, str]:
     """Build authorization headers for Connecteam API."""
@@ -36,20 +40,35 @@ def _get_taskboard_id() -> str:
     return taskboard_id
 
 
-def retrieve_tenants() -> Dict[str, Any]:
+def retrieve_tenants(limit: int = 10, offset: int = 0) -> Dict[str, Any]:
     """Retrieve tenant/user data from Connecteam API."""
     base_url = os.getenv("CONNECTTEAM_API_BASE", "https://app.connecteam.com")
-    endpoint = f"{base_url.rstrip('/')}/users/v1/users?limit=10&offset=0&order=asc&userStatus=active"
+    endpoint = f"{base_url.rstrip('/')}/users/v1/users"
+    params = {"limit": limit, "offset": offset, "order": "asc", "userStatus": "active"}
     headers = _get_headers()
     
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
 
+def list_all_users(page_size: int = 100, max_pages: int = 200) -> Dict[str, Any]:
+    """Crawl every page of retrieve_tenants and return them as one {"data": {"users": [...]}} payload."""
+    users = []
+    for page in range(max_pages):
+        resp = retrieve_tenants(limit=page_size, offset=page * page_size)
+        if not isinstance(resp, dict) or "error" in resp:
+            return resp
+        batch = (resp.get("data") or {}).get("users") or []
+        users.extend(batch)
+        if len(batch) < page_size:
+            break
+    return {"data": {"users": users}}
+
+
 def list_tasks(status: str = "all", limit: int = 10, offset: int = 0, taskboard_id: Optional[str] = None) -> Dict[str, Any]:
     """List tasks with pagination and status filter."""
     if not taskboard_id:
@@ -61,13 +80,27 @@ def list_tasks(status: str = "all", limit: int = 10, offset: int = 0, taskboard_
     headers = _get_headers()
     
     try:
-        response = requests.get(endpoint, headers=headers, params=params, timeout=10)
+        response = _session.get(endpoint, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
 
+def list_all_tasks(status: str = "all", page_size: int = 100, max_pages: int = 500, taskboard_id: Optional[str] = None) -> Dict[str, Any]:
+    """Crawl every page of list_tasks and return them as one {"data": {"tasks": [...]}} payload."""
+    tasks = []
+    for page in range(max_pages):
+        resp = list_tasks(status=status, limit=page_size, offset=page * page_size, taskboard_id=taskboard_id)
+        if not isinstance(resp, dict) or "error" in resp:
+            return resp
+        batch = (resp.get("data") or {}).get("tasks") or []
+        tasks.extend(batch)
+        if len(batch) < page_size:
+            break
+    return {"data": {"tasks": tasks}}
+
+
 def get_task(task_id: str) -> Dict[str, Any]:
     """Get a single task by ID."""
     base_url = _get_base_url()
@@ -75,7 +108,7 @@ def get_task(task_id: str) -> Dict[str, Any]:
     headers = _get_headers()
     
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
@@ -89,7 +122,7 @@ def create_task(payload: Dict[str, Any]) -> Dict[str, Any]:
     headers = _get_headers()
     
     try:
-        response = requests.post(endpoint, headers=headers, json=payload, timeout=10)
+        response = _session.post(endpoint, headers=headers, json=payload, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
@@ -103,7 +136,7 @@ def update_task(task_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
     headers = _get_headers()
     
     try:
-        response = requests.put(endpoint, headers=headers, json=payload, timeout=10)
+        response = _session.put(endpoint, headers=headers, json=payload, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
@@ -117,7 +150,7 @@ def delete_task(task_id: str) -> Dict[str, Any]:
     headers = _get_headers()
     
     try:
-        response = requests.delete(endpoint, headers=headers, timeout=10)
+        response = _session.delete(endpoint, headers=headers, timeout=10)
         if response.status_code in (200, 204):
             return {"ok": True, "status": response.status_code}
         response.raise_for_status()
@@ -133,26 +166,42 @@ def list_taskboards() -> Dict[str, Any]:
     headers = _get_headers()
     
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
 
 
-def list_get_jobs() -> Dict[str, Any]:
-    """List all available jobs from Connecteam."""
+def list_get_jobs(limit: int = 10, offset: int = 0) -> Dict[str, Any]:
+    """List one page of jobs from Connecteam."""
     base_url = _get_base_url()
-    endpoint = f"{base_url.rstrip('/')}/jobs/v1/jobs?includeDeleted=true&order=asc&limit=10&offset=0"
+    endpoint = f"{base_url.rstrip('/')}/jobs/v1/jobs"
     headers = _get_headers()
+    params = {"includeDeleted": "true", "order": "asc", "limit": limit, "offset": offset}
     
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
-    
+
+
+def list_all_jobs(page_size: int = 100, max_pages: int = 100) -> Dict[str, Any]:
+    """Crawl every page of list_get_jobs and return them as one {"data": {"jobs": [...]}} payload."""
+    jobs = []
+    for page in range(max_pages):
+        resp = list_get_jobs(limit=page_size, offset=page * page_size)
+        if not isinstance(resp, dict) or "error" in resp:
+            return resp
+        batch = (resp.get("data") or {}).get("jobs") or []
+        jobs.extend(batch)
+        if len(batch) < page_size:
+            break
+    return {"data": {"jobs": jobs}}
+
+
 def list_get_assignments(user_id:int, asset_types: list[str]) -> Dict[str, Any]:
     """List all available jobs from Connecteam."""
     base_url = _get_base_url()
@@ -162,7 +211,7 @@ def list_get_assignments(user_id:int, asset_types: list[str]) -> Dict[str, Any]:
         "assetTypes":asset_types
     }
     try:
-        response = requests.get(endpoint, headers=headers,params=params, timeout=10)
+        response = _session.get(endpoint, headers=headers,params=params, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
@@ -176,17 +225,38 @@ def get_user(user_id:int) -> Dict[str, Any]:
     headers = _get_headers()
    
     try:
-        response = requests.get(endpoint, headers=headers, timeout=10)
+        response = _session.get(endpoint, headers=headers, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
     
 
-def get_time_activity(startDate:str,endDate:str) -> Dict[str, Any]:
-    """List all available user from Connecteam."""
+def _get_time_clock_id() -> str:
+    """Time clock used when none is given (the original single clock)."""
+    return os.getenv("CONNECTEAM_TIME_CLOCK_ID", "9886223")
+
+
+def list_time_clocks() -> Dict[str, Any]:
+    """List all time clocks."""
+    base_url = _get_base_url()
+    endpoint = f"{base_url.rstrip('/')}/time-clock/v1/time-clocks"
+    headers = _get_headers()
+
+    try:
+        response = _session.get(endpoint, headers=headers, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    except requests.exceptions.RequestException as exc:
+        return {"error": "Request failed", "exception": str(exc)}
+
+
+def get_time_activity(startDate:str,endDate:str, time_clock_id: Optional[str] = None) -> Dict[str, Any]:
+    """Time activities (shifts per user) of one time clock for a date range."""
+    if not time_clock_id:
+        time_clock_id = _get_time_clock_id()
     base_url = _get_base_url()
-    endpoint = f"{base_url.rstrip('/')}/time-clock/v1/time-clocks/9886223/time-activities"
+    endpoint = f"{base_url.rstrip('/')}/time-clock/v1/time-clocks/{time_clock_id}/time-activities"
     headers = _get_headers()
     params = {
         "startDate":startDate,
@@ -194,7 +264,7 @@ def get_time_activity(startDate:str,endDate:str) -> Dict[str, Any]:
     }
 
     try:
-        response = requests.get(endpoint, headers=headers, params=params, timeout=10)
+        response = _session.get(endpoint, headers=headers, params=params, timeout=10)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as exc:
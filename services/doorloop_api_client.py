@@ -5,10 +5,14 @@ Use this for in-process calls to avoid MCP stdio pipe issues.
 import os, logging
 import requests
 from typing import Dict, Any
+from services import http_session
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Pooled, retrying and instrumented (see services/http_session.py)
+_session = http_session.get_session("doorloop")
+
 try:
     from services import doorloop_services as services
 except Exception as e:
@@ -37,7 +41,7 @@ def retrieve_tenants() -> Dict[str, Any]:
     """Retrieve all tenants from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/tenants"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -56,7 +60,7 @@ def retrieve_properties() -> Dict[str, Any]:
     """Retrieve all properties from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/properties"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -73,7 +77,7 @@ def retrieve_properties_id(property_id: str) -> Dict[str, Any]:
     """Retrieve a single property by ID from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/properties/{property_id}"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -90,7 +94,7 @@ def retrieve_leases() -> Dict[str, Any]:
     """Retrieve all leases from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/leases"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -107,7 +111,7 @@ def retrieve_a_tenants(tenant_id: str) -> Dict[str, Any]:
     """Retrieve a single tenant by ID from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/tenants/{tenant_id}"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -124,7 +128,7 @@ def retrieve_doorloop_communication() -> Dict[str, Any]:
     """Retrieve communications from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/communications"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -141,7 +145,7 @@ def retrieve_doorloop_tasks() -> Dict[str, Any]:
     """Retrieve communications from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/tasks"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -157,7 +161,7 @@ def retrieve_doorloop_lease_payment() -> Dict[str, Any]:
     """Retrieve communications from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/lease-payments"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -173,7 +177,7 @@ def retrieve_doorloop_expenses() -> Dict[str, Any]:
     """Retrieve communications from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/expenses"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -189,7 +193,7 @@ def retrieve_profit_loss() -> Dict[str, Any]:
     """Retrieve communications from DoorLoop API."""
     endpoint = f"{_get_base_url()}/api/reports/profit-and-loss-summary?filter_accountingMethod=CASH"
     try:
-        response = requests.get(endpoint, headers=_get_headers(), timeout=10)
+        response = _session.get(endpoint, headers=_get_headers(), timeout=10)
         if response.ok:
             return response.json()
         else:
@@ -201,6 +205,44 @@ def retrieve_profit_loss() -> Dict[str, Any]:
     except requests.exceptions.RequestException as exc:
         return {"error": "Request failed", "exception": str(exc)}
     
+def retrieve_page(resource: str, page_number: int = 1, page_size: int = 500, **params) -> Dict[str, Any]:
+    """Retrieve one page of a DoorLoop list endpoint (e.g. resource="leases")."""
+    endpoint = f"{_get_base_url()}/api/{resource}"
+    query = {"page_number": page_number, "page_size": page_size, **params}
+    try:
+        response = _session.get(endpoint, headers=_get_headers(), params=query, timeout=10)
+        if response.ok:
+            return response.json()
+        else:
+            return {
+                "error": f"Failed to fetch {resource} page {page_number}",
+                "status": response.status_code,
+                "response": response.json() if response.headers.get("Content-Type", "").startswith("application/json") else response.text[:1000],
+            }
+    except requests.exceptions.RequestException as exc:
+        return {"error": "Request failed", "exception": str(exc)}
+
+
+def retrieve_all(resource: str, page_size: int = 500, max_pages: int = 1000, **params) -> Dict[str, Any]:
+    """Walk every page of a DoorLoop list endpoint and return {"data": [...], "total": N}.
+    
+    The plain retrieve_* helpers only return the first page; use this when the
+    whole portfolio is needed (mirror syncs, reconciles).
+    """
+    items = []
+    for page_number in range(1, max_pages + 1):
+        resp = retrieve_page(resource, page_number=page_number, page_size=page_size, **params)
+        if "error" in resp:
+            return resp
+        batch = resp.get("data") or []
+        items.extend(batch)
+        total = resp.get("total")
+        if len(batch) < page_size or (total is not None and len(items) >= total):
+            break
+    else:
+        logging.warning("Stopped crawling %s after %d pages", resource, max_pages)
+    return {"data": items, "total": len(items)}
+    
 __all__ = [
     "retrieve_tenants",
     "retrieve_properties",
@@ -208,4 +250,6 @@ __all__ = [
     "retrieve_leases",
     "retrieve_a_tenants",
     "retrieve_doorloop_communication",
+    "retrieve_page",
+    "retrieve_all",
 ]
@@ -0,0 +1,125 @@
+"""
+Shared ``requests`` sessions for the vendor API clients.
+
+One pooled session per vendor keeps TCP/TLS connections alive between calls,
+retries idempotent requests on connection errors and 429/5xx (honouring
+Retry-After), and records latency, status, size and retries of every call
+in the upstream metrics.
+
+Calls are also paced by a per-vendor token bucket, so fan-out (bulk task
+writes, concurrent crawls) stays under the vendor's rate limit instead of
+collecting 429s. Tune with <VENDOR>_RATE_LIMIT_PER_SECOND (0 disables).
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import metrics, tracing
+
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 20
+# Requests per second allowed per vendor (burst = one second's worth)
+DEFAULT_RATE_LIMITS = {"connecteam": 10.0}
+
+_sessions = {}
+_lock = threading.Lock()
+
+
+def _record_response(vendor: str):
+    def hook(response, *args, **kwargs):
+        metrics.UPSTREAM_REQUEST_SECONDS.labels(
+            vendor=vendor, method=response.request.method, status=str(response.status_code),
+        ).observe(response.elapsed.total_seconds())
+        length = response.headers.get("Content-Length")
+        metrics.UPSTREAM_RESPONSE_BYTES.labels(vendor=vendor).observe(
+            int(length) if length and length.isdigit() else len(response.content))
+        retries = getattr(getattr(response.raw, "retries", None), "history", None)
+        if retries:
+            metrics.UPSTREAM_RETRIES.labels(vendor=vendor).inc(len(retries))
+        return response
+    return hook
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` calls per second, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def rate_limit(vendor: str) -> float:
+    value = os.getenv(f"{vendor.upper()}_RATE_LIMIT_PER_SECOND")
+    return float(value) if value else DEFAULT_RATE_LIMITS.get(vendor, 0.0)
+
+
+class _InstrumentedSession(requests.Session):
+    """Session tracing every call and counting calls that fail before any response arrived."""
+
+    def __init__(self, vendor: str, rate: float = 0.0):
+        super().__init__()
+        self.vendor = vendor
+        self.bucket = TokenBucket(rate) if rate > 0 else None
+
+    def request(self, method, url, *args, **kwargs):
+        if self.bucket is not None:
+            waited = self.bucket.acquire()
+            if waited:
+                metrics.UPSTREAM_THROTTLE_SECONDS.labels(vendor=self.vendor).observe(waited)
+        with tracing.span(f"{self.vendor} {method}", **{"http.method": method, "http.url": url.split("?", 1)[0]}) as span:
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except requests.exceptions.RequestException as exc:
+                metrics.UPSTREAM_ERRORS.labels(vendor=self.vendor, error=type(exc).__name__).inc()
+                raise
+            span.set_attribute("http.status_code", response.status_code)
+            return response
+
+
+def get_session(vendor: str) -> requests.Session:
+    """The shared session for `vendor` (created on first use)."""
+    session = _sessions.get(vendor)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(vendor)
+        if session is None:
+            session = _InstrumentedSession(vendor, rate=rate_limit(vendor))
+            retry = Retry(
+                total=RETRY_TOTAL,
+                backoff_factor=RETRY_BACKOFF,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset({"GET", "PUT", "DELETE", "HEAD", "OPTIONS"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.hooks["response"].append(_record_response(vendor))
+            _sessions[vendor] = session
+    return session
@@ -0,0 +1,38 @@
+import pytest
+
+from middle_layer import (
+    connecteam_redit_layer,
+    connecteam_sources,
+    doorloop_join_index,
+    doorloop_mirror,
+    job_directory,
+    portfolio_aggregates,
+    redis_layer,
+    snapshot_diff,
+    snapshot_store,
+    task_index,
+    user_directory,
+)
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch, tmp_path):
+    """Keep tests off the shared Redis instance and the real snapshot directory."""
+    monkeypatch.setattr(redis_layer, "redis", None)
+    monkeypatch.setattr(connecteam_redit_layer, "redis", None)
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", tmp_path / "snapshots")
+    monkeypatch.setattr(doorloop_mirror, "MIRROR_PATH", tmp_path / "mirror.sqlite3")
+    snapshot_store._loaded.clear()
+    snapshot_store._verified.clear()
+    doorloop_join_index._memo.update(key=None, index=None, rows=None)
+    portfolio_aggregates._memo.update(key=None, overview=None)
+    task_index.clear()
+    snapshot_diff.clear()
+    # An empty, fresh job directory so enrichment never crawls the real vendor
+    job_directory._cache.reset(job_directory.JobDirectory())
+    user_directory._cache.reset(user_directory.UserDirectory())
+    # One taskboard and the default time clock, without discovery calls
+    connecteam_sources.reset(boards=[{"id": "board-1"}], clocks=[])
+    yield
+    snapshot_store._loaded.clear()
+    snapshot_store._verified.clear()
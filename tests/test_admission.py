@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app import admission
+
+
+def _app(limiters):
+    inner = FastAPI()
+    release = asyncio.Event()
+
+    @inner.get("/api/doorloop/balance-sheet/report")
+    async def report():
+        await release.wait()
+        return {"ok": True}
+
+    @inner.get("/api/doorloop/leases")
+    async def leases():
+        return {"ok": True}
+
+    @inner.get("/")
+    async def health():
+        return {"ok": True}
+
+    return admission.AdmissionMiddleware(inner, limiters=limiters, enabled=True), release
+
+
+def test_classify_routes():
+    assert admission.classify("/") is None
+    assert admission.classify("/metrics") is None
+    assert admission.classify("/api/batch") is None
+    assert admission.classify("/api/doorloop/balance-sheet/report") == "heavy"
+    assert admission.classify("/api/connecteam/activity") == "heavy"
+    assert admission.classify("/api/doorloop/leases") == "default"
+
+
+def test_heavy_burst_is_shed_while_cheap_routes_keep_answering():
+    async def scenario():
+        limiters = {
+            "heavy": admission.RouteClassLimiter("heavy", concurrency=1, queue=1, deadline=0.2),
+            "default": admission.RouteClassLimiter("default", concurrency=4, queue=4, deadline=1),
+        }
+        app, release = _app(limiters)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            running = asyncio.create_task(client.get("/api/doorloop/balance-sheet/report"))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(client.get("/api/doorloop/balance-sheet/report"))
+            await asyncio.sleep(0.05)
+
+            rejected = await client.get("/api/doorloop/balance-sheet/report")
+            assert rejected.status_code == 503
+            assert rejected.headers["retry-after"] == "1"
+            assert rejected.json()["reason"] == "queue_full"
+
+            assert (await client.get("/api/doorloop/leases")).status_code == 200
+            assert (await client.get("/")).status_code == 200
+
+            timed_out = await queued
+            assert timed_out.status_code == 503 and timed_out.json()["reason"] == "deadline"
+
+            release.set()
+            assert (await running).status_code == 200
+        assert limiters["heavy"].active == 0 and limiters["heavy"].waiting == 0
+
+    asyncio.run(scenario())
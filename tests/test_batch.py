@@ -0,0 +1,76 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware
+from app.main import app
+from middle_layer import snapshot_store
+from services import doorloop_api_client
+
+COMMS = {"data": [{"id": f"c{i}", "subject": f"Notice {i}"} for i in range(5)], "total": 5}
+
+
+def test_batch_shares_dataset_fetches(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    calls = []
+    monkeypatch.setattr(doorloop_api_client, "retrieve_all", lambda resource, **kw: calls.append(resource) or COMMS)
+
+    client = TestClient(app)
+    r = client.post("/api/batch", json={"requests": [
+        {"id": "first", "path": "/api/doorloop/communications", "params": {"limit": 2}},
+        {"id": "fields", "path": "/api/doorloop/communications", "params": {"fields": "subject"}},
+        {"id": "root", "path": "/"},
+    ]})
+
+    assert r.status_code == 200
+    first, fields, root = r.json()["responses"]
+    assert first["id"] == "first" and first["status"] == 200
+    assert [c["id"] for c in first["body"]["data"]] == ["c0", "c1"]
+    assert first["headers"]["x-next-cursor"]
+    assert fields["body"]["data"][0] == {"subject": "Notice 0"}
+    assert root["body"]["ok"] is True
+    assert calls == ["communications"]
+
+
+def test_sub_requests_are_not_compressed(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    rows = {"data": [{"id": f"c{i}", "subject": f"Notice {i}"} for i in range(100)], "total": 100}
+    monkeypatch.setattr(doorloop_api_client, "retrieve_all", lambda resource, **kw: rows)
+    compressed = []
+    compress = CompressionMiddleware.compress
+    monkeypatch.setattr(CompressionMiddleware, "compress",
+                        lambda self, body, encoding: compressed.append(len(body)) or compress(self, body, encoding))
+
+    r = TestClient(app).post("/api/batch", headers={"Accept-Encoding": "identity"}, json={"requests": [
+        {"path": "/api/doorloop/communications", "headers": {"Accept-Encoding": "gzip"}},
+    ]})
+
+    assert len(r.json()["responses"][0]["body"]["data"]) == 100
+    assert compressed == []
+
+
+def test_batch_rejects_writes_and_streams():
+    client = TestClient(app)
+    assert client.post("/api/batch", json={"requests": [{"method": "POST", "path": "/api/connecteam/task"}]}).status_code == 400
+    assert client.post("/api/batch", json={"requests": [{"path": "/api/events"}]}).status_code == 400
+
+
+def test_concurrent_fetches_share_one_upstream_call():
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"data": [1, 2, 3]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(snapshot_store.fetch_dataset("leases", slow_fetch)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [{"data": [1, 2, 3]}] * 4
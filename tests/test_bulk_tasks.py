@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import bulk_tasks
+from services import connecteam_api_client, http_session
+
+
+def test_bulk_route_reports_per_item_and_resumes_failed_items(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "fail": {"Inspect 3"}}
+
+    def fake_create(payload):
+        with lock:
+            calls.append(payload["title"])
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.01)
+        with lock:
+            state["active"] -= 1
+        if payload["title"] in state["fail"]:
+            return {"error": "Request failed", "exception": "429 Too Many Requests"}
+        return {"data": {"task": {"id": f"t-{payload['title']}"}}}
+
+    monkeypatch.setattr(connecteam_api_client, "create_task", fake_create)
+    monkeypatch.setattr(connecteam_api_client, "update_task", lambda task_id, payload: {"data": {"id": task_id}})
+    monkeypatch.setattr(bulk_tasks, "BULK_CONCURRENCY", 3)
+    client = TestClient(app)
+    items = [{"payload": {"title": f"Inspect {i}"}} for i in range(12)] + [{"task_id": "99", "payload": {"status": "completed"}}]
+
+    body = client.post("/api/connecteam/tasks/bulk", json={"items": items}).json()
+    assert (body["succeeded"], body["failed"], body["skipped"]) == (12, 1, 0)
+    assert body["results"][3] == {"status": "failed", "task_id": None, "error": "429 Too Many Requests", "index": 3}
+    assert body["results"][0]["task_id"] == "t-Inspect 0"
+    assert body["results"][12]["status"] == "updated"
+    assert state["peak"] <= 3
+
+    calls.clear()
+    state["fail"] = set()
+    resumed = client.post("/api/connecteam/tasks/bulk", json={"batch_id": body["batch_id"], "items": items}).json()
+    assert calls == ["Inspect 3"]
+    assert (resumed["succeeded"], resumed["failed"], resumed["skipped"]) == (13, 0, 12)
+    assert resumed["results"][3]["task_id"] == "t-Inspect 3"
+
+
+def test_token_bucket_paces_calls_after_burst():
+    bucket = http_session.TokenBucket(rate=50, burst=2)
+    started = time.monotonic()
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert time.monotonic() - started >= 0.03
+
+
+def test_concurrent_runs_of_one_batch_create_each_task_once():
+    calls = []
+
+    def fake_create(payload):
+        calls.append(payload["title"])
+        time.sleep(0.01)
+        return {"data": {"task": {"id": f"t-{payload['title']}"}}}
+
+    items = [{"payload": {"title": f"Inspect {i}"}} for i in range(5)]
+
+    async def run_twice():
+        return await asyncio.gather(*(bulk_tasks.run_bulk(items, fake_create, None, batch_id="b-1") for _ in range(2)))
+
+    first, second = asyncio.run(run_twice())
+    assert sorted(calls) == sorted(item["payload"]["title"] for item in items)
+    assert (first["skipped"], second["skipped"]) == (0, 5)
+    assert set(bulk_tasks.load_batch("b-1")) == {bulk_tasks.item_key(None, item["payload"]) for item in items}
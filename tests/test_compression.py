@@ -0,0 +1,63 @@
+import gzip
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware, choose_encoding
+
+ROWS = [{"id": f"l{i}", "name": f"Unit {i}", "status": "ACTIVE"} for i in range(200)]
+
+
+def _client(**kwargs):
+    app = FastAPI()
+    middleware = CompressionMiddleware(app, **kwargs)
+
+    @app.get("/big")
+    async def big(response: Response):
+        response.headers["ETag"] = '"v1"'
+        return ROWS
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    return TestClient(middleware), middleware
+
+
+def test_choose_encoding_respects_q_values():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, identity") is None
+    assert choose_encoding("") is None
+
+
+def test_large_json_is_gzipped_and_small_is_not():
+    client, _ = _client(minimum_size=500)
+
+    big = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert big.headers["content-encoding"] == "gzip"
+    assert big.headers["vary"] == "Accept-Encoding"
+    assert big.json() == ROWS
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_etagged_bodies_are_compressed_once(monkeypatch):
+    client, middleware = _client(minimum_size=500)
+    calls = []
+    compress = middleware.compress
+    monkeypatch.setattr(middleware, "compress", lambda body, encoding: calls.append(encoding) or compress(body, encoding))
+
+    for _ in range(3):
+        r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+        assert r.json() == ROWS
+
+    assert calls == ["gzip"]
+    assert gzip.decompress(middleware._cache[('"v1"', "gzip")][1])
+
+
+def test_compressed_responses_get_their_own_etag():
+    client, _ = _client(minimum_size=500)
+
+    assert client.get("/big", headers={"Accept-Encoding": "gzip"}).headers["etag"] == '"v1-gzip"'
+    assert client.get("/big", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"v1"'
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import connecteam_sources
+from services import connecteam_api_client
+
+BOARDS = {"data": {"taskboards": [{"taskboardId": "b1"}, {"taskboardId": "b2"}, {"taskboardId": "old", "isArchived": True}]}}
+CLOCKS = {"data": {"timeClocks": [{"id": 11}, {"id": 12}]}}
+
+
+def test_discovery_is_cached_and_skips_archived(monkeypatch):
+    calls = []
+    monkeypatch.setattr(connecteam_api_client, "list_taskboards", lambda: calls.append(1) or BOARDS)
+    connecteam_sources.reset()
+
+    assert connecteam_sources.taskboard_ids() == ["b1", "b2"]
+    assert connecteam_sources.taskboard_ids() == ["b1", "b2"]
+    assert len(calls) == 1
+
+
+def test_tasks_fetched_concurrently_and_tagged_by_board(monkeypatch):
+    connecteam_sources.reset(boards=BOARDS)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fake_list_all_tasks(status="all", taskboard_id=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {"data": {"tasks": [{"id": f"{taskboard_id}-1", "title": f"Task on {taskboard_id}", "status": "published"}]}}
+
+    monkeypatch.setattr(connecteam_api_client, "list_all_tasks", fake_list_all_tasks)
+
+    payload = connecteam_sources.list_all_tasks()
+    assert [(t["id"], t["taskboardId"]) for t in payload["data"]["tasks"]] == [("b1-1", "b1"), ("b2-1", "b2")]
+    assert peak[0] == 2
+
+    r = TestClient(app).get("/api/connecteam/tasks", params={"fields": "title,taskboard_id"})
+    assert r.json() == [{"title": "Task on b1", "taskboard_id": "b1"}, {"title": "Task on b2", "taskboard_id": "b2"}]
+
+
+def test_one_failing_board_fails_the_merged_list(monkeypatch):
+    connecteam_sources.reset(boards=BOARDS)
+    monkeypatch.setattr(
+        connecteam_api_client, "list_all_tasks",
+        lambda status="all", taskboard_id=None: {"error": "Request failed", "exception": "boom"} if taskboard_id == "b2"
+        else {"data": {"tasks": []}},
+    )
+
+    assert connecteam_sources.list_all_tasks() == {"error": "Request failed", "exception": "boom"}
+
+
+def test_activity_merges_time_clocks(monkeypatch):
+    connecteam_sources.reset(clocks=CLOCKS)
+
+    def fake_activity(startDate, endDate, time_clock_id=None):
+        shift = {"id": f"s{time_clock_id}", "start": {"timestamp": 1759917600}, "end": {"timestamp": 1759921200}}
+        return {"data": {"timeActivitiesByUsers": [{"userId": 1, "shifts": [shift]}]}}
+
+    monkeypatch.setattr(connecteam_api_client, "get_time_activity", fake_activity)
+
+    payload = connecteam_sources.get_time_activity("2025-10-08", "2025-10-08")
+    shifts = [s for entry in payload["data"]["timeActivitiesByUsers"] for s in entry["shifts"]]
+    assert [(s["id"], s["timeClockId"]) for s in shifts] == [("s11", "11"), ("s12", "12")]
+
+    client = TestClient(app)
+    params = {"startDate": "2025-10-08", "endDate": "2025-10-08"}
+    assert client.get("/api/connecteam/activity", params=params).json()["totals"]["hours"] == 2.0
+    assert client.get("/api/connecteam/activity", params={**params, "time_clock_id": "12"}).json()["totals"]["hours"] == 1.0
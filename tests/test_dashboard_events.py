@@ -0,0 +1,64 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import dashboard_events, doorloop_mirror, event_bus, snapshot_store
+
+
+def _leases(overdue):
+    return {"data": [{"id": "l1", "tenants": ["t1"], "overdueBalance": overdue},
+                     {"id": "l2", "tenants": ["t2"], "overdueBalance": 50.0}]}
+
+
+def test_tenant_balance_deltas_only_report_changes():
+    before = dashboard_events.tenant_balances(_leases(100.0))
+    after = dashboard_events.tenant_balances(_leases(0))
+
+    assert dashboard_events.tenant_balance_deltas(before, after) == [
+        {"tenant_id": "t1", "overdue_balance": 0.0, "previous": 100.0}
+    ]
+
+
+def test_snapshot_refresh_publishes_task_status_changes():
+    last_id = event_bus.publish("test_marker", {})["id"]
+    snapshot_store.save_snapshot("tasks:all", {"data": {"tasks": [{"id": 1, "status": "draft"}, {"id": 2, "status": "draft"}]}})
+    snapshot_store.save_snapshot("tasks:all", {"data": {"tasks": [{"id": 1, "status": "completed"}, {"id": 2, "status": "draft"}]}})
+
+    status_events = [e for e in event_bus.events_since(last_id) if e["type"] == "task_status"]
+    assert [e["data"]["changes"] for e in status_events] == [
+        [{"task_id": 1, "title": None, "status": "completed", "previous": "draft"}]
+    ]
+
+
+def test_mirror_sync_publishes_tenant_balance_deltas():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: _leases(100.0))
+    last_id = event_bus.publish("test_marker", {})["id"]
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: _leases(25.0))
+
+    balance_events = [e for e in event_bus.events_since(last_id) if e["type"] == "tenant_balances"]
+    assert balance_events[0]["data"] == {
+        "source": "mirror", "changes": [{"tenant_id": "t1", "overdue_balance": 25.0, "previous": 100.0}]
+    }
+
+
+def test_webhook_is_pushed_to_websocket_clients(monkeypatch):
+    monkeypatch.setenv("CONNECTEAM_WEBHOOK_TOKEN", "secret")
+    client = TestClient(app)
+
+    assert client.post("/api/connecteam/webhook", json={"data": {}}).status_code == 401
+
+    with client.websocket_connect("/ws") as ws:
+        assert ws.receive_json()["type"] == "connected"
+        r = client.post("/api/connecteam/webhook", params={"token": "secret"},
+                        json={"eventType": "task_updated", "data": {"taskId": "t-9", "status": "completed"}})
+        assert r.status_code == 200
+
+        event = ws.receive_json()
+        assert event["type"] == "task_status"
+        assert event["data"]["changes"][0]["task_id"] == "t-9"
+
+
+def test_webhook_is_disabled_without_a_token(monkeypatch):
+    monkeypatch.delenv("CONNECTEAM_WEBHOOK_TOKEN", raising=False)
+
+    r = TestClient(app).post("/api/connecteam/webhook", json={"data": {"taskId": "t-9", "status": "completed"}})
+    assert r.status_code == 404
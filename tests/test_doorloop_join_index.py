@@ -0,0 +1,77 @@
+from middle_layer import doorloop_bridge, doorloop_join_index, snapshot_store
+
+
+TENANTS = {"data": [
+    {"id": "t1", "fullName": "Ada Park", "emails": [{"address": "ada@example.com"}]},
+    {"id": "t2", "fullName": "Ada Park", "phones": [{"number": "204-555-0100"}]},
+    {"id": "t3", "fullName": "Prospect Pat",
+     "prospectInfo": {"interests": [{"property": "p2"}]}},
+    {"id": "t4", "fullName": "No Lease"},
+]}
+LEASES = {"data": [
+    {"id": "l1", "name": "Ada Park", "property": "p1", "units": ["u1"], "tenants": ["t1"], "overdueBalance": 100},
+    {"id": "l2", "name": "Ada Park", "property": "p2", "units": ["u7"], "tenants": ["t1"], "overdueBalance": 50.5},
+    {"id": "l3", "name": "Ada Park", "property": "p1", "units": ["u2"], "tenants": ["t2"], "overdueBalance": 0},
+]}
+PROPERTIES = {"data": [
+    {"id": "p1", "address": {"street1": "1 Main St"}},
+    {"id": "p2", "address": {"street1": "9 Elm Ave"}},
+]}
+
+
+def test_index_joins_on_ids_not_names():
+    index = doorloop_join_index.TenantJoinIndex(TENANTS, LEASES, PROPERTIES)
+
+    # Two tenants share a display name; each only gets their own leases
+    assert index.lease_ids("t1") == ["l1", "l2"]
+    assert index.lease_ids("t2") == ["l3"]
+    assert index.property_ids("t1") == ["p1", "p2"]
+    assert index.unit_ids("t1") == ["u1", "u7"]
+    assert index.overdue_balance("t1") == 150.5
+
+
+def test_prospects_fall_back_to_interests():
+    index = doorloop_join_index.TenantJoinIndex(TENANTS, LEASES, PROPERTIES)
+
+    assert index.property_ids("t3") == ["p2"]
+    assert index.property_ids("t4") == []
+
+
+def test_tenant_rows():
+    rows = {row["email"] or row["Phone Number"] or row["name"]: row
+            for row in doorloop_join_index.TenantJoinIndex(TENANTS, LEASES, PROPERTIES).tenant_rows()}
+
+    assert rows["ada@example.com"]["properties"] == "1 Main St, 9 Elm Ave"
+    assert rows["ada@example.com"]["rent_due"] == "$150.50"
+    assert rows["204-555-0100"]["rent_due"] == "$0.00"
+    assert rows["Prospect Pat"]["properties"] == "9 Elm Ave"
+    assert rows["No Lease"]["properties"] == "N/A"
+
+
+def test_index_is_reused_per_generation():
+    first = doorloop_join_index.get_join_index(TENANTS, LEASES, PROPERTIES, generation_key=(1, 1, 1))
+    again = doorloop_join_index.get_join_index({"data": []}, {"data": []}, {"data": []}, generation_key=(1, 1, 1))
+    rebuilt = doorloop_join_index.get_join_index(TENANTS, LEASES, PROPERTIES, generation_key=(1, 2, 1))
+
+    assert again is first
+    assert rebuilt is not first
+
+
+def test_bridge_builds_rows_without_vendor_calls():
+    rows = doorloop_bridge.get_doorloop_tenants(TENANTS, lease_data=LEASES, property_data=PROPERTIES)
+
+    assert len(rows) == 4
+    assert {"name", "Phone Number", "email", "properties", "rent_due", "status"} <= set(rows[0])
+
+
+def test_memoized_rows_are_not_resaved(monkeypatch):
+    for name, payload in (("tenants", TENANTS), ("leases", LEASES), ("properties", PROPERTIES)):
+        snapshot_store.save_snapshot(name, payload)
+    saved = []
+    monkeypatch.setattr(snapshot_store, "save_snapshot", lambda dataset, payload: saved.append(dataset))
+
+    first = doorloop_bridge.get_doorloop_tenants(TENANTS, lease_data=LEASES, property_data=PROPERTIES)
+    again = doorloop_bridge.get_doorloop_tenants(TENANTS, lease_data=LEASES, property_data=PROPERTIES)
+
+    assert again is first
+    assert saved == ["tenant_rows"]
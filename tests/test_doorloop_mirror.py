@@ -0,0 +1,234 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import doorloop_bridge, doorloop_mirror
+
+
+LEASES = {
+    "data": [
+        {"id": "l1", "name": "Unit 1", "property": "p1", "status": "ACTIVE", "overdueBalance": 250.0,
+         "tenants": ["t1"], "end": "2026-12-31"},
+        {"id": "l2", "name": "Unit 2", "property": "p1", "status": "ACTIVE", "overdueBalance": 0,
+         "tenants": ["t2"], "end": "2026-06-30"},
+        {"id": "l3", "name": "Unit 3", "property": "p2", "status": "INACTIVE", "overdueBalance": 900.0,
+         "tenants": ["t1", "t3"], "end": "2025-01-31"},
+    ],
+    "total": 3,
+}
+
+
+def test_sync_and_query_with_filters():
+    assert doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES) == 3
+
+    overdue_at_p1 = doorloop_mirror.query("leases", {"property_id": "p1", "overdue": True})
+    assert [lease["id"] for lease in overdue_at_p1["data"]] == ["l1"]
+    assert overdue_at_p1["total"] == 1
+
+    by_tenant = doorloop_mirror.query("leases", {"tenant_id": "t1"}, sort="overdue_balance", descending=True)
+    assert [lease["id"] for lease in by_tenant["data"]] == ["l3", "l1"]
+
+
+def test_pagination_and_total():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES)
+
+    page = doorloop_mirror.query("leases", sort="end_date", limit=2, offset=1)
+    assert [lease["id"] for lease in page["data"]] == ["l2", "l1"]
+    assert page["total"] == 3
+
+
+def test_keyset_pages_cover_every_row_once():
+    data = LEASES["data"] + [{"id": "l4", "name": "Unit 4", "property": "p2", "overdueBalance": 250.0, "tenants": []},
+                             {"id": "l5", "name": "Unit 5", "property": "p2", "tenants": []}]
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: {"data": data})
+
+    for descending in (False, True):
+        seen, after = [], None
+        while True:
+            page = doorloop_mirror.query("leases", sort="overdue_balance", descending=descending, limit=2, after=after)
+            seen.extend(lease["id"] for lease in page["data"])
+            after = page["next"]
+            if after is None:
+                break
+        full = doorloop_mirror.query("leases", sort="overdue_balance", descending=descending, limit=10)
+        assert seen == [lease["id"] for lease in full["data"]]
+        assert len(seen) == 5
+
+
+def test_keyset_pages_descending_by_id():
+    properties = [{"id": f"p{i}", "name": f"Property {i}"} for i in range(5)]
+    doorloop_mirror.sync_entity("properties", fetch_fn=lambda: {"data": properties})
+
+    seen, after = [], None
+    while True:
+        page = doorloop_mirror.query("properties", sort="id", descending=True, limit=2, after=after)
+        seen.extend(prop["id"] for prop in page["data"])
+        after = page["next"]
+        if after is None:
+            break
+    assert seen == ["p4", "p3", "p2", "p1", "p0"]
+
+
+def test_full_sync_deletes_missing_rows():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES)
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: {"data": LEASES["data"][:1]})
+
+    assert doorloop_mirror.query("leases")["total"] == 1
+    assert doorloop_mirror.query("leases", {"tenant_id": "t3"})["total"] == 0
+
+
+def test_failed_sync_keeps_existing_rows():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES)
+
+    assert doorloop_mirror.sync_entity("leases", fetch_fn=lambda: {"error": "Request failed"}) is None
+    assert doorloop_mirror.query("leases")["total"] == 3
+
+
+def test_unknown_filter_is_rejected():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES)
+    try:
+        doorloop_mirror.query("leases", {"data": "x"})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_leases_route_queries_mirror(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES)
+
+    client = TestClient(app)
+    r = client.get("/api/doorloop/leases", params={"property_id": "p1", "overdue": "true"})
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["total"] == 1
+    assert body["data"][0]["id"] == "l1"
+
+    r = client.get("/api/doorloop/leases", params={"sort": "data"})
+    assert r.status_code == 400
+
+
+def test_leases_route_cursor_and_fields(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES)
+    client = TestClient(app)
+
+    first = client.get("/api/doorloop/leases", params={"sort": "end_date", "limit": 2, "fields": "id,status"})
+    assert first.status_code == 200
+    assert first.json()["data"] == [{"id": "l3", "status": "INACTIVE"}, {"id": "l2", "status": "ACTIVE"}]
+    assert first.headers["X-Next-Cursor"] == first.json()["next_cursor"]
+
+    second = client.get("/api/doorloop/leases", params={"sort": "end_date", "limit": 2, "fields": "id",
+                                                        "cursor": first.json()["next_cursor"]})
+    assert second.json()["data"] == [{"id": "l1"}]
+    assert second.json()["next_cursor"] is None
+
+    mismatched = client.get("/api/doorloop/leases", params={"sort": "name", "cursor": first.json()["next_cursor"]})
+    assert mismatched.status_code == 400
+    assert client.get("/api/doorloop/leases", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_in_memory_filter_matches_the_mirror_query():
+    data = LEASES["data"] + [{"id": "l4", "name": "Unit 4", "property": "p2", "tenants": ["t1"]}]
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: {"data": data})
+
+    for filters, sort, descending in (({"tenant_id": "t1"}, "end_date", False), ({"tenant_id": "t1"}, "end_date", True),
+                                      ({"property_id": "p1", "overdue": False}, None, False),
+                                      ({"status": "ACTIVE"}, "overdue_balance", True)):
+        expected = [lease["id"] for lease in doorloop_mirror.query("leases", filters, sort, descending)["data"]]
+        assert [lease["id"] for lease in doorloop_mirror.filter_objects("leases", data, filters, sort, descending)] == expected
+
+
+def test_leases_route_filters_cached_list_without_mirror(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    monkeypatch.setattr(doorloop_mirror, "ensure_synced", lambda entity: False)
+    monkeypatch.setattr(doorloop_bridge, "fetch_doorloop_dataset", lambda dataset: LEASES)
+    client = TestClient(app)
+
+    r = client.get("/api/doorloop/leases", params={"tenant_id": "t1", "sort": "overdue_balance", "descending": "true"})
+    assert [lease["id"] for lease in r.json()["data"]] == ["l3", "l1"]
+    assert r.json()["total"] == 2
+    assert client.get("/api/doorloop/leases", params={"sort": "data"}).status_code == 400
+
+
+STAMPED = {
+    "data": [
+        {"id": "l1", "property": "p1", "overdueBalance": 0, "updatedAt": "2026-10-01T00:00:00Z"},
+        {"id": "l2", "property": "p1", "overdueBalance": 0, "updatedAt": "2026-10-02T00:00:00Z"},
+    ]
+}
+
+
+def test_incremental_sync_merges_only_changes():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: STAMPED)
+    state = doorloop_mirror.get_sync_state("leases")
+    assert state["high_water"] == "2026-10-02T00:00:00Z"
+    assert state["generation"] == 1
+
+    pages_requested = []
+
+    def fetch_page(page_number):
+        pages_requested.append(page_number)
+        # newest first, as requested with sort_descending
+        return {"data": [
+            {"id": "l3", "property": "p2", "overdueBalance": 50, "updatedAt": "2026-10-05T00:00:00Z"},
+            {"id": "l1", "property": "p1", "overdueBalance": 75, "updatedAt": "2026-10-04T00:00:00Z"},
+            STAMPED["data"][1],
+            STAMPED["data"][0],
+        ]}
+
+    assert doorloop_mirror.sync_entity_incremental("leases", fetch_page=fetch_page, page_size=4) == 2
+    assert pages_requested == [1]
+    assert doorloop_mirror.query("leases", {"overdue": True})["total"] == 2
+
+    state = doorloop_mirror.get_sync_state("leases")
+    assert state["high_water"] == "2026-10-05T00:00:00Z"
+    assert state["generation"] == 2
+
+
+def test_incremental_sync_refuses_unsorted_pages():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: STAMPED)
+
+    unsorted = {"data": [
+        {"id": "l8", "updatedAt": "2026-10-03T00:00:00Z"},
+        {"id": "l9", "updatedAt": "2026-10-09T00:00:00Z"},
+    ]}
+    assert doorloop_mirror.sync_entity_incremental("leases", fetch_page=lambda n: unsorted) is None
+
+
+def test_sync_catches_edits_to_records_without_updated_at(monkeypatch):
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: LEASES)
+    assert doorloop_mirror.get_sync_state("leases")["high_water_field"] == "id"
+
+    edited = {"data": [dict(lease) for lease in LEASES["data"]]}
+    edited["data"][1]["overdueBalance"] = 125.0
+    monkeypatch.setattr(doorloop_mirror.doorloop_api, "retrieve_all", lambda resource: edited)
+    # Newest id first: an id watermark would stop before l2 and miss the edit
+    monkeypatch.setattr(doorloop_mirror.doorloop_api, "retrieve_page",
+                        lambda resource, **kwargs: {"data": edited["data"][::-1]})
+
+    doorloop_mirror.sync("leases")
+
+    assert [lease["id"] for lease in doorloop_mirror.query("leases", {"overdue": True})["data"]] == ["l1", "l2", "l3"]
+    assert doorloop_mirror.generation("leases") == 2
+
+
+def test_unchanged_full_sync_keeps_generation():
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: STAMPED)
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: STAMPED)
+
+    assert doorloop_mirror.generation("leases") == 1
+
+
+def test_sync_runs_full_reconcile_when_due(monkeypatch):
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: STAMPED)
+    calls = []
+    monkeypatch.setattr(doorloop_mirror, "sync_entity_incremental", lambda entity: calls.append("incremental") or 0)
+    monkeypatch.setattr(doorloop_mirror, "sync_entity", lambda entity: calls.append("full") or 2)
+
+    doorloop_mirror.sync("leases")
+    monkeypatch.setattr(doorloop_mirror, "FULL_RECONCILE_MINUTES", 0)
+    doorloop_mirror.sync("leases")
+
+    assert calls == ["incremental", "full"]
@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import conneteam_bridge, doorloop_mirror
+from services import connecteam_api_client
+
+
+def test_tasks_repeat_poll_gets_304_without_rebuilding(monkeypatch):
+    monkeypatch.setattr(connecteam_api_client, "list_all_tasks",
+                        lambda status="all", taskboard_id=None: {"data": {"tasks": [{"title": "Task", "status": "published"}]}})
+    client = TestClient(app)
+
+    first = client.get("/api/connecteam/tasks", params={"limit": 10})
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('"')
+
+    builds = []
+    build_page = conneteam_bridge.get_task_page
+    monkeypatch.setattr(conneteam_bridge, "get_task_page", lambda *a, **k: builds.append(1) or build_page(*a, **k))
+
+    again = client.get("/api/connecteam/tasks", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert builds == []
+
+    # A different query is a different representation
+    other = client.get("/api/connecteam/tasks", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert builds == [1]
+
+
+def test_mirror_etag_changes_with_generation(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: {"data": [{"id": "l1", "status": "ACTIVE"}]})
+    client = TestClient(app)
+
+    etag = client.get("/api/doorloop/leases").headers["ETag"]
+    assert client.get("/api/doorloop/leases", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: {"data": [{"id": "l1", "status": "INACTIVE"}]})
+    changed = client.get("/api/doorloop/leases", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_compressed_etag_variant_revalidates(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    leases = [{"id": f"l{i}", "name": f"Unit {i}", "status": "ACTIVE"} for i in range(100)]
+    doorloop_mirror.sync_entity("leases", fetch_fn=lambda: {"data": leases})
+    client = TestClient(app)
+
+    first = client.get("/api/doorloop/leases", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"]
+    assert first.headers["content-encoding"] == "gzip" and etag.endswith('-gzip"')
+
+    again = client.get("/api/doorloop/leases", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
@@ -0,0 +1,65 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import conneteam_bridge, job_directory
+from services import connecteam_api_client
+
+JOBS = {"data": {"jobs": [
+    {"jobId": "j1", "title": "Cleaning", "subJobs": [{"jobId": "s1", "title": "Unit 4"}]},
+    {"jobId": "j2", "title": "Repairs", "isDeleted": True},
+    {"jobId": "s2", "title": "Roof", "parentId": "j2"},
+]}}
+
+
+def test_directory_indexes_jobs_and_sub_jobs():
+    directory = job_directory.JobDirectory(JOBS)
+
+    assert len(directory) == 4
+    assert directory.title("j1") == "Cleaning"
+    assert directory.label("j1", "s1") == "Cleaning / Unit 4"
+    assert directory.label("s2") == "Repairs / Roof"
+    assert directory.label("missing") is None
+    rows = directory.annotate([{"job_id": "j2"}, {"job_id": None}, {"other": 1}])
+    assert rows == [{"job_id": "j2", "job_title": "Repairs"}, {"job_id": None}, {"other": 1}]
+
+
+def test_get_directory_crawls_once_and_keeps_last_good():
+    job_directory._cache.reset()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return JOBS
+
+    assert job_directory.get_directory(fetch_fn=fetch).title("j1") == "Cleaning"
+    assert job_directory.get_directory(fetch_fn=fetch).title("j1") == "Cleaning"
+    assert len(calls) == 1
+
+    failing = lambda: {"error": "Request failed", "exception": "boom"}
+    assert job_directory.get_directory(max_age=0, fetch_fn=failing).title("j1") == "Cleaning"
+
+
+def test_list_all_jobs_crawls_pages(monkeypatch):
+    pages = [[{"jobId": str(i)} for i in range(100)], [{"jobId": "last"}]]
+    seen = []
+
+    def fake_page(limit=10, offset=0):
+        seen.append(offset)
+        return {"data": {"jobs": pages[offset // limit]}}
+
+    monkeypatch.setattr(connecteam_api_client, "list_get_jobs", fake_page)
+
+    payload = connecteam_api_client.list_all_jobs(page_size=100)
+    assert seen == [0, 100]
+    assert len(payload["data"]["jobs"]) == 101
+
+
+def test_jobs_route_and_task_enrichment():
+    job_directory._cache.reset(job_directory.JobDirectory(JOBS))
+
+    assert TestClient(app).get("/api/connecteam/jobs").json() == JOBS
+
+    tasks = {"data": {"tasks": [{"id": 1, "title": "Mop", "status": "published", "jobId": "j1"},
+                                {"id": 2, "title": "Call", "status": "published"}]}}
+    page = conneteam_bridge.get_task_page(tasks, get_jobs=job_directory.get_directory)
+    assert [row.get("job_title") for row in page["data"]] == ["Cleaning", None]
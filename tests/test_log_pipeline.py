@@ -0,0 +1,75 @@
+import json
+import logging
+
+import pytest
+
+from utils import log_pipeline, tracing
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+@pytest.fixture
+def pipeline():
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    sink = _Collect()
+    log_pipeline.configure_logging(level="INFO", fmt="json", handler=sink)
+    yield sink
+    log_pipeline.stop_logging()
+    for handler in saved_handlers:
+        root.addHandler(handler)
+    root.setLevel(saved_level)
+
+
+def _flush():
+    log_pipeline._listener.stop()
+    log_pipeline._listener.start()
+
+
+def test_records_are_written_as_json_by_the_listener(pipeline, monkeypatch, tmp_path):
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(tmp_path / "traces.jsonl"))
+    with tracing.span("request") as span:
+        logging.getLogger("app").info("Cached %s tasks", 3)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logging.getLogger("app").exception("Refresh failed")
+    _flush()
+
+    first, second = (json.loads(line) for line in pipeline.lines)
+    assert first["message"] == "Cached 3 tasks"
+    assert first["level"] == "INFO" and first["trace_id"] == span.trace_id
+    assert second["level"] == "ERROR" and "ValueError: boom" in second["exception"]
+
+
+def test_debug_arguments_are_not_rendered_below_level(pipeline):
+    class Expensive:
+        def __str__(self):
+            raise AssertionError("formatted a filtered record")
+
+    logging.debug("Processing item %s", Expensive())
+    _flush()
+    assert pipeline.lines == []
+
+
+def test_sampling_limits_a_chatty_call_site_but_not_warnings():
+    sampler = log_pipeline.SamplingFilter(rate=0.001, burst=2)
+
+    def record(level, lineno=10):
+        return logging.LogRecord("x", level, "bridge.py", lineno, "item", None, None)
+
+    kept = [sampler.filter(record(logging.INFO)) for _ in range(5)]
+    assert kept == [True, True, False, False, False]
+    assert sampler.filter(record(logging.INFO, lineno=11))
+    assert all(sampler.filter(record(logging.WARNING)) for _ in range(5))
+
+    sampler._buckets[("bridge.py", 10)][0] = 1
+    passed = record(logging.INFO)
+    assert sampler.filter(passed) and passed.suppressed == 3
@@ -0,0 +1,21 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from utils import metrics
+
+
+def test_metrics_endpoint_exposes_route_and_cache_metrics():
+    client = TestClient(app)
+    client.get("/")
+    metrics.record_cache("tasks:all", "stale")
+
+    r = client.get("/metrics")
+
+    assert r.status_code == 200
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"}' in r.text
+    assert 'cache_requests_total{family="tasks",result="stale"}' in r.text
+
+
+def test_cache_family_groups_parameterised_keys():
+    assert metrics.cache_family("tasks:published:0:100") == "tasks"
+    assert metrics.cache_family("users:42") == "users"
@@ -0,0 +1,70 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import conneteam_bridge, pagination
+from services import connecteam_api_client
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    cursor = pagination.encode_cursor({"offset": 40})
+    assert pagination.decode_cursor(cursor) == {"offset": 40}
+
+    for bad in ("not-a-cursor", pagination.encode_cursor({"offset": -1})):
+        with pytest.raises(ValueError):
+            pagination.decode_cursor(bad)
+
+
+def test_project_keeps_requested_and_nested_fields():
+    item = {"id": "p1", "name": "Maple", "address": {"city": "Austin", "street1": "1 Main"}}
+
+    assert pagination.project(item, ["id", "address.city", "missing"]) == {"id": "p1", "address": {"city": "Austin"}}
+    assert pagination.project(item, None) is item
+
+
+def test_paginate_walks_all_items():
+    items = [{"id": i, "n": i * 2} for i in range(5)]
+
+    first = pagination.paginate(items, limit=2, fields=["id"])
+    assert first["data"] == [{"id": 0}, {"id": 1}]
+    assert first["total"] == 5
+
+    last = pagination.paginate(items, cursor=pagination.paginate(items, cursor=first["next_cursor"], limit=2)["next_cursor"], limit=2)
+    assert last["data"] == [{"id": 4, "n": 8}]
+    assert last["next_cursor"] is None
+
+
+def test_task_page_looks_up_users_only_for_the_page():
+    tasks = {"data": {"tasks": [{"title": f"Task {i}", "status": "published", "userIds": [i + 1]} for i in range(10)]}}
+    looked_up = []
+
+    def fake_get_user(user_id):
+        looked_up.append(user_id)
+        return {"data": {"users": [{"firstName": "User", "lastName": str(user_id)}]}}
+
+    page = conneteam_bridge.get_task_page(tasks, get_user=fake_get_user, limit=3, fields=["title", "user_name"])
+
+    assert page["data"][0] == {"title": "Task 0", "user_name": "User 1"}
+    assert looked_up == [1, 2, 3]
+    assert page["total"] == 10
+
+
+def test_tasks_route_pages_from_one_cached_crawl(monkeypatch):
+    calls = []
+
+    def fake_list_all_tasks(status="all", taskboard_id=None):
+        calls.append(status)
+        return {"data": {"tasks": [{"title": f"Task {i}", "status": "published", "userIds": []} for i in range(5)]}}
+
+    monkeypatch.setattr(connecteam_api_client, "list_all_tasks", fake_list_all_tasks)
+    client = TestClient(app)
+
+    first = client.get("/api/connecteam/tasks", params={"limit": 2, "fields": "title"})
+    assert first.status_code == 200
+    assert first.json() == [{"title": "Task 0"}, {"title": "Task 1"}]
+    assert first.headers["X-Total-Count"] == "5"
+
+    second = client.get("/api/connecteam/tasks", params={"limit": 2, "fields": "title",
+                                                        "cursor": first.headers["X-Next-Cursor"]})
+    assert second.json() == [{"title": "Task 2"}, {"title": "Task 3"}]
+
@@ -0,0 +1,74 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import portfolio_aggregates
+from services import doorloop_api_client
+
+
+PROPERTIES = {"data": [
+    {"id": "p1", "numActiveUnits": 4, "address": {"street1": "1 Main St"}},
+    {"id": "p2", "numActiveUnits": 2, "address": {"street1": "9 Elm Ave"}},
+    {"id": "p3", "numActiveUnits": 5, "active": False},
+]}
+TENANTS = {"data": [{"id": "t1", "fullName": "Ada"}, {"id": "t2", "fullName": "Bo"}, {"id": "t3", "fullName": "Cy"}]}
+LEASES = {"data": [
+    {"id": "l1", "status": "ACTIVE", "property": "p1", "units": ["u1"], "tenants": ["t1"],
+     "totalBalanceDue": 1200, "overdueBalance": 200},
+    {"id": "l2", "status": "ACTIVE", "property": "p1", "units": ["u2", "u3"], "tenants": ["t1", "t2"],
+     "totalBalanceDue": "300.5", "overdueBalance": None},
+    {"id": "l3", "status": "INACTIVE", "property": "p2", "units": ["u4"], "tenants": ["t3"],
+     "totalBalanceDue": 999, "overdueBalance": 50},
+]}
+PAYMENTS = {"data": [
+    {"id": "y1", "date": "2026-08-03", "amountReceived": 1000},
+    {"id": "y2", "date": "2026-08-20", "amountReceived": 250},
+    {"id": "y3", "date": "2026-09-01", "amountReceived": 900},
+    {"id": "y4", "date": None, "amountReceived": 5},
+]}
+
+
+def test_compute_overview():
+    overview = portfolio_aggregates.compute_overview(PROPERTIES, TENANTS, LEASES, PAYMENTS)
+
+    assert overview["total_properties"] == 2
+    assert overview["active_lease_ids"] == ["l1", "l2"]
+    assert sorted(overview["active_tenant_ids"]) == ["t1", "t2"]
+    assert overview["total_rent_due"] == 1500.5
+    assert overview["overdue_balance"] == 250
+    assert overview["total_units"] == 6
+    assert overview["occupied_units"] == 3
+    assert overview["vacant_units"] == 3
+    assert overview["month_list"] == ["Aug 2026", "Sep 2026"]
+    assert overview["rent_list"] == [1250.0, 900.0]
+
+
+def test_compute_overview_handles_empty_payloads():
+    overview = portfolio_aggregates.compute_overview({"data": []}, {"data": []}, {"data": []}, None)
+
+    assert overview["vacant_units"] == 0
+    assert overview["active_lease_ids"] == []
+    assert overview["month_list"] == []
+
+
+def test_overview_is_memoized_per_generation():
+    first = portfolio_aggregates.get_overview(PROPERTIES, TENANTS, LEASES, PAYMENTS, generation_key=(7,))
+    again = portfolio_aggregates.get_overview({"data": []}, {"data": []}, {"data": []}, None, generation_key=(7,))
+
+    assert again is first
+
+
+def test_tenants_route_overview(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    payloads = {"tenants": TENANTS, "properties": PROPERTIES, "leases": LEASES, "lease-payments": PAYMENTS}
+    monkeypatch.setattr(doorloop_api_client, "retrieve_all", lambda resource: payloads[resource])
+
+    client = TestClient(app)
+    r = client.get("/api/doorloop/tenants")
+
+    assert r.status_code == 200
+    body = r.json()
+    assert body["vacant_units"] == 3
+    assert body["active_leases_count"] == 2
+    assert body["total_rent_due"] == "$1,500.50"
+    assert body["profit"] == 2150.0
+    assert len(body["tenants"]) == 3
@@ -0,0 +1,102 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.main import app
+
+
+def _busy(ms):
+    deadline = time.perf_counter() + ms / 1000
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def _profiled_app():
+    inner = FastAPI()
+
+    @inner.get("/busy")
+    def busy():
+        _busy(80)
+        return {"ok": True}
+
+    @inner.get("/slow")
+    def slow():
+        # Longer than the default sampler sleep, which may still be running from an earlier request
+        _busy(250)
+        return {"ok": True}
+
+    @inner.get("/stream")
+    def stream():
+        def events():
+            for n in range(3):
+                time.sleep(0.05)
+                yield f"data: {n}\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    inner.add_middleware(profiling.ProfilingMiddleware)
+    return inner
+
+
+def test_profile_requires_token(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    client = TestClient(_profiled_app())
+
+    assert "x-profile-report" not in client.get("/busy", headers={"X-Profile": "wrong"}).headers
+    assert "x-profile-report" not in client.get("/busy").headers
+    assert not list(tmp_path.glob("*.folded"))
+
+
+def test_profiled_request_stores_flame_report(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_INTERVAL_MS", 2)
+
+    r = TestClient(_profiled_app()).get("/busy?profile=secret")
+
+    report = (tmp_path / r.headers["x-profile-report"]).read_text()
+    assert "_busy (tests/test_profiling.py" in report
+    stack, count = report.splitlines()[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+
+def test_slow_request_logs_stack_samples(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_MS", 20)
+    monkeypatch.setattr(profiling, "SLOW_SAMPLE_INTERVAL_MS", 5)
+
+    TestClient(_profiled_app()).get("/slow")
+
+    record = json.loads((tmp_path / "slow_requests.jsonl").read_text().splitlines()[-1])
+    assert record["path"] == "/slow" and record["status"] == 200
+    assert any("_busy" in item["stack"] for item in record["top_stacks"])
+
+
+def test_event_stream_is_never_logged_as_slow(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "SLOW_REQUEST_MS", 20)
+    monkeypatch.setattr(profiling, "SLOW_SAMPLE_INTERVAL_MS", 5)
+
+    response = TestClient(_profiled_app()).get("/stream")
+
+    assert response.text.count("data:") == 3
+    log = tmp_path / "slow_requests.jsonl"
+    assert not log.exists() or all(json.loads(line)["path"] != "/stream" for line in log.read_text().splitlines())
+
+
+def test_admin_profile_routes_are_token_gated(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    (tmp_path / "20260101-000000-abc123-get-api.folded").write_text("a;b 3\n")
+    client = TestClient(app)
+
+    assert client.get("/admin/profiles").status_code == 403
+    listed = client.get("/admin/profiles", headers={"X-Profile": "secret"}).json()
+    assert listed == {"reports": ["20260101-000000-abc123-get-api.folded"]}
+    body = client.get(f"/admin/profiles/{listed['reports'][0]}", headers={"X-Profile": "secret"}).text
+    assert body == "a;b 3\n"
+    assert client.get("/admin/profiles/..%2Fsecret.folded", headers={"X-Profile": "secret"}).status_code == 404
@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import shift_intervals, time_activity
+from services import connecteam_api_client
+
+HOUR = 3600
+BASE = 1759320000  # 2025-10-01 12:00 UTC
+
+
+def _shift(shift_id, start_hours, end_hours, auto=False):
+    shift = {"id": shift_id, "jobId": "j1", "isAutoClockOut": auto,
+             "start": {"timestamp": BASE + int(start_hours * HOUR), "timezone": "UTC"}}
+    if end_hours is not None:
+        shift["end"] = {"timestamp": BASE + int(end_hours * HOUR), "timezone": "UTC"}
+    return shift
+
+
+PAYLOAD = {"data": {"timeActivitiesByUsers": [
+    # a: 0-4 contains 1-2 (overlap), then 4.5-6 after a 30 minute gap, open shift next day
+    {"userId": 1, "shifts": [_shift("a", 0, 4), _shift("b", 1, 2), _shift("c", 4.5, 6, auto=True),
+                             _shift("d", 24, None)]},
+    # shifts back to back: no gap, no overlap; a long gap (overnight) is not flagged
+    {"userId": 2, "shifts": [_shift("e", 0, 2), _shift("f", 2, 3), _shift("g", 20, 21)]},
+]}}
+
+
+def _frame():
+    return time_activity.shift_frame(PAYLOAD)
+
+
+def test_audit_flags_overlaps_gaps_and_clock_outs():
+    report = shift_intervals.audit(_frame(), at=BASE + 1.5 * HOUR)
+
+    assert [(o["shift"]["shift_id"], o["overlaps_with"]["shift_id"], o["overlap_minutes"])
+            for o in report["overlaps"]] == [("b", "a", 60.0)]
+    assert [(g["user_id"], g["gap_minutes"]) for g in report["gaps"]] == [(1, 30.0)]
+    assert [s["shift_id"] for s in report["auto_clock_outs"]] == ["c"]
+    assert [s["shift_id"] for s in report["open_shifts"]] == ["d"]
+    assert report["coverage"][0] == {"user_id": 1, "shifts": 3, "worked_hours": 6.5,
+                                     "covered_hours": 5.5, "overlap_hours": 1.0}
+    assert sorted(report["on_clock"]["user_ids"]) == [1, 2]
+
+
+def test_interval_index_coverage_queries():
+    index = shift_intervals.ShiftIntervalIndex.from_shifts(_frame())
+
+    assert index.covered_seconds(1, BASE, BASE + 10 * HOUR) == 5.5 * HOUR
+    assert index.covered_seconds(1, BASE + 3 * HOUR, BASE + 5 * HOUR) == 1.5 * HOUR
+    assert index.covered_seconds(2, BASE + 1 * HOUR, BASE + 2.5 * HOUR) == 1.5 * HOUR
+    assert index.covered_seconds(3, BASE, BASE + HOUR) == 0.0
+    assert index.on_clock(BASE + 4.25 * HOUR) == []
+
+
+def test_audit_route(monkeypatch):
+    monkeypatch.setattr(connecteam_api_client, "get_time_activity", lambda startDate, endDate, time_clock_id=None: PAYLOAD)
+
+    r = TestClient(app).get("/api/connecteam/activity/audit",
+                            params={"startDate": "2025-10-01", "endDate": "2025-10-02", "user_id": "1"})
+
+    assert r.status_code == 200
+    body = r.json()
+    assert len(body["overlaps"]) == 1 and [c["user_id"] for c in body["coverage"]] == [1]
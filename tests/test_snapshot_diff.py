@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import snapshot_diff, snapshot_store
+
+
+def _tasks(*tasks):
+    return {"data": {"tasks": [{"id": task_id, "status": status} for task_id, status in tasks]}}
+
+
+def test_diff_matches_records_by_id_and_content():
+    change = snapshot_diff.diff("tasks:all", _tasks((1, "draft"), (2, "draft"), (3, "draft")),
+                                _tasks((1, "draft"), (2, "completed"), (4, "draft")))
+
+    assert change["added"] == [{"id": 4, "status": "draft"}]
+    assert change["removed"] == [{"id": 3, "status": "draft"}]
+    assert change["changed"] == [({"id": 2, "status": "draft"}, {"id": 2, "status": "completed"})]
+    assert snapshot_diff.diff("tenant_rows", [{"name": "A"}], [{"name": "B"}]) is None
+
+
+def test_since_folds_generations_into_net_deltas():
+    first = snapshot_store.save_snapshot("tasks:all", _tasks((1, "draft"), (2, "draft")))
+    snapshot_store.save_snapshot("tasks:all", _tasks((1, "completed"), (2, "draft"), (3, "draft")))
+    snapshot_store.save_snapshot("tasks:all", _tasks((1, "completed"), (2, "draft"), (3, "published")))
+    current = snapshot_store.save_snapshot("tasks:all", _tasks((1, "completed"), (3, "published")))
+
+    delta = TestClient(app).get("/api/changes/tasks:all", params={"since": first}).json()
+    assert (delta["generation"], delta["reset"]) == (current, False)
+    assert delta["added"] == [{"id": 3, "status": "published"}]
+    assert delta["changed"] == [{"id": 1, "status": "completed"}]
+    assert delta["removed"] == [2]
+
+    assert snapshot_diff.since("tasks:all", current)["reset"] is False
+    assert snapshot_diff.since("tasks:all", 0)["reset"] is True
+
+
+def test_since_resets_when_the_log_no_longer_reaches_back(monkeypatch):
+    monkeypatch.setattr(snapshot_diff, "CHANGE_LOG_SIZE", 2)
+    generations = [snapshot_store.save_snapshot("leases", {"data": [{"id": "l1", "overdueBalance": n}]})
+                   for n in range(4)]
+
+    assert snapshot_diff.since("leases", generations[0])["reset"] is True
+    delta = snapshot_diff.since("leases", generations[2])
+    assert (delta["reset"], delta["changed"]) == (False, [{"id": "l1", "overdueBalance": 3}])
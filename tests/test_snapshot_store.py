@@ -0,0 +1,103 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import snapshot_store
+from services import doorloop_api_client
+from services.doorloop_services import DoorloopClient
+
+
+def test_save_and_load_roundtrip():
+    payload = {"data": [{"id": "p1", "name": "Maple Court"}], "total": 1}
+
+    assert snapshot_store.save_snapshot("properties", payload) == 1
+    snap = snapshot_store.load_snapshot("properties")
+
+    assert snap["payload"] == payload
+    assert snap["generation"] == 1
+    assert snapshot_store.read_header("properties")["length"] > 0
+
+
+def test_generation_only_bumps_on_change():
+    snapshot_store.save_snapshot("leases", {"data": [{"id": "l1"}]})
+    assert snapshot_store.save_snapshot("leases", {"data": [{"id": "l1"}]}) == 1
+    assert snapshot_store.save_snapshot("leases", {"data": [{"id": "l2"}]}) == 2
+    assert snapshot_store.generation("leases") == 2
+
+
+def test_error_payloads_are_not_saved():
+    assert snapshot_store.save_snapshot("tenants", {"error": "Request failed"}) == 0
+    assert snapshot_store.load_snapshot("tenants") is None
+
+
+def test_corrupt_snapshot_is_ignored():
+    snapshot_store.save_snapshot("users", {"data": {"users": []}})
+    path = snapshot_store._snapshot_path("users")
+    path.write_bytes(path.read_bytes()[:-3])
+    snapshot_store._loaded.clear()
+
+    assert snapshot_store.load_snapshot("users") is None
+
+
+def test_fetch_dataset_saves_successful_payloads():
+    payload = {"data": [{"id": "t1"}]}
+
+    assert snapshot_store.fetch_dataset("tenants", lambda: payload) == payload
+    assert snapshot_store.load_snapshot("tenants")["payload"] == payload
+
+
+def test_properties_route_serves_stale_snapshot(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+    snapshot_store.save_snapshot("properties", {"data": [{"id": "p1"}]})
+
+    async def failing_fallback(self):
+        raise RuntimeError("MCP server down")
+
+    monkeypatch.setattr(doorloop_api_client, "retrieve_all", lambda resource: {"error": "Request failed"})
+    monkeypatch.setattr(DoorloopClient, "retrieve_properties", failing_fallback)
+
+    client = TestClient(app)
+    r = client.get("/api/doorloop/properties")
+
+    assert r.status_code == 200
+    assert r.headers["x-data-stale"] == "true"
+    body = r.json()
+    assert body["stale"] is True
+    assert body["data"] == [{"id": "p1"}]
+
+
+def test_properties_route_without_snapshot_returns_500(monkeypatch):
+    monkeypatch.setenv("DOORLOOP_API_KEY", "test-key")
+
+    async def failing_fallback(self):
+        raise RuntimeError("MCP server down")
+
+    monkeypatch.setattr(doorloop_api_client, "retrieve_all", lambda resource: {"error": "Request failed"})
+    monkeypatch.setattr(DoorloopClient, "retrieve_properties", failing_fallback)
+
+    client = TestClient(app)
+    r = client.get("/api/doorloop/properties")
+
+    assert r.status_code == 500
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def exists(self, key):
+        return key in self.store
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+
+def test_warm_cache_seeds_namespaced_datasets(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(snapshot_store.redis_layer, "Redis", _FakeRedis)
+    monkeypatch.setattr(snapshot_store.redis_layer, "redis", fake)
+    snapshot_store.save_snapshot("tasks:all", {"data": {"tasks": [{"id": 1}]}})
+    snapshot_store.save_snapshot("leases", {"data": []})
+
+    assert snapshot_store.list_datasets() == ["leases", "tasks:all"]
+    assert snapshot_store.warm_cache() == 2
+    assert sorted(fake.store) == ["dataset:leases", "dataset:tasks:all"]
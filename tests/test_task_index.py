@@ -0,0 +1,67 @@
+from middle_layer import conneteam_bridge, task_index
+
+ROWS = [
+    {"user_id": 1, "status": "published", "title": "Clean unit 4", "date": "2024-05-01"},
+    {"user_id": 2, "status": "completed", "title": "Inspect roof", "date": "2024-05-01"},
+    {"user_id": 1, "status": "completed", "title": "Unit 4 deep clean", "date": "2024-05-02"},
+    {"user_id": 3, "status": "published", "title": None, "date": None},
+    {"user_id": 2, "status": "published", "title": "abc bcd", "date": "2024-05-03"},
+]
+
+
+def _scan(rows, filters):
+    """The list-comprehension semantics the index replaces."""
+    out = rows
+    if filters.get("status"):
+        wanted = filters["status"] if isinstance(filters["status"], list) else [filters["status"]]
+        out = [r for r in out if r["status"] in wanted]
+    if filters.get("user_id"):
+        out = [r for r in out if r["user_id"] in filters["user_id"]]
+    if filters.get("title"):
+        out = [r for r in out if filters["title"].lower() in (r["title"] or "").lower()]
+    if filters.get("duedate"):
+        out = [r for r in out if r["date"] == filters["duedate"]]
+    return out
+
+
+def test_index_matches_scan_semantics():
+    index = task_index.TaskIndex(ROWS)
+    cases = [
+        {"status": "completed"},
+        {"status": ["published", "completed"], "user_id": [1]},
+        {"title": "CLEAN"},
+        {"title": "un"},
+        {"title": "abcd"},
+        {"title": "unit 4", "user_id": [1], "duedate": "2024-05-02"},
+        {"duedate": "2024-06-01"},
+        {"user_id": [9]},
+    ]
+    for filters in cases:
+        assert index.select(filters) == _scan(ROWS, filters), filters
+    assert index.select(None) == ROWS
+    assert conneteam_bridge._apply_filters(ROWS, {"title": "roof"}) == [ROWS[1]]
+
+
+def test_get_task_index_reuses_index_per_key():
+    builds = []
+
+    def build():
+        builds.append(1)
+        return list(ROWS)
+
+    first = task_index.get_task_index(build, key=("tasks:all", (1,)))
+    assert task_index.get_task_index(build, key=("tasks:all", (1,))) is first
+    assert task_index.get_task_index(build, key=("tasks:all", (2,))) is not first
+    task_index.get_task_index(build)
+    assert len(builds) == 3
+
+
+def test_task_page_enrichment_does_not_leak_into_index():
+    tasks = {"data": {"tasks": [{"id": 1, "title": "Mop", "status": "published", "userIds": [7]}]}}
+    key = ("tasks:all", (1,))
+
+    page = conneteam_bridge.get_task_page(tasks, get_user=lambda user_id: {"data": {"users": [{"firstName": "Al"}]}},
+                                          index_key=key)
+    assert page["data"][0]["user_name"] == "Al"
+    page = conneteam_bridge.get_task_page(tasks, index_key=key)
+    assert page["data"][0]["user_name"] is None
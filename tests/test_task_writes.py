@@ -0,0 +1,94 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import conneteam_bridge, event_bus, snapshot_store, task_index, task_writes
+from services import connecteam_api_client
+
+TASKS = {"data": {"tasks": [
+    {"id": 1, "title": "Mop lobby", "status": "published", "userIds": [7]},
+    {"id": 2, "title": "Fix sink", "status": "published", "userIds": [8]},
+]}}
+
+
+def _published(payload):
+    return {"data": {"tasks": [t for t in payload["data"]["tasks"] if t["status"] == "published"]}}
+
+
+def test_patch_tasks_replaces_moves_and_removes():
+    payload, kept = task_writes.patch_tasks(TASKS, "all", "2", {"id": 2, "status": "completed"})
+    assert payload["data"]["tasks"][1] == {"id": 2, "title": "Fix sink", "status": "completed", "userIds": [8]}
+    assert kept["title"] == "Fix sink"
+
+    payload, kept = task_writes.patch_tasks(TASKS, "published", 2, {"id": 2, "status": "completed"})
+    assert [t["id"] for t in payload["data"]["tasks"]] == [1]
+    assert kept is None
+
+    payload, _ = task_writes.patch_tasks(TASKS, "all", 3, {"id": 3, "title": "New", "status": "draft"})
+    assert [t["id"] for t in payload["data"]["tasks"]] == [1, 2, 3]
+    assert [t["id"] for t in task_writes.patch_tasks(TASKS, "all", 1)[0]["data"]["tasks"]] == [2]
+    assert len(TASKS["data"]["tasks"]) == 2
+
+
+def test_update_route_writes_through_snapshot_index_and_events(monkeypatch):
+    snapshot_store.save_snapshot("tasks:all", TASKS)
+    snapshot_store.save_snapshot("tasks:published", _published(TASKS))
+    key = ("tasks:all", snapshot_store.generation_key("tasks:all"))
+    conneteam_bridge.get_task_page(TASKS, index_key=key)
+
+    monkeypatch.setattr(connecteam_api_client, "update_task",
+                        lambda task_id, payload: {"data": {"task": {"id": 2, "status": "completed"}}})
+    last_id = event_bus.publish("test_marker", {})["id"]
+
+    r = TestClient(app).put("/api/connecteam/task/2", json={"status": "completed"})
+    assert r.status_code == 200
+
+    tasks = snapshot_store.load_snapshot("tasks:all")["payload"]["data"]["tasks"]
+    assert [t["status"] for t in tasks] == ["published", "completed"]
+    assert [t["id"] for t in snapshot_store.load_snapshot("tasks:published")["payload"]["data"]["tasks"]] == [1]
+
+    new_key = ("tasks:all", snapshot_store.generation_key("tasks:all"))
+    assert key not in task_index._memo
+    index = task_index._memo[new_key]
+    assert [row["title"] for row in index.select({"status": "completed"})] == ["Fix sink"]
+    assert index.select({"status": "completed"}) == task_index.TaskIndex(conneteam_bridge.task_info(tasks)).select(
+        {"status": "completed"})
+
+    changes = [e["data"] for e in event_bus.events_since(last_id) if e["type"] == "task_changed"]
+    assert changes == [{"source": "write", "action": "updated", "task_id": 2,
+                        "task": conneteam_bridge.task_row(tasks[1])}]
+
+
+def test_delete_route_removes_task_from_index(monkeypatch):
+    snapshot_store.save_snapshot("tasks:all", TASKS)
+    key = ("tasks:all", snapshot_store.generation_key("tasks:all"))
+    conneteam_bridge.get_task_page(TASKS, index_key=key)
+    monkeypatch.setattr(connecteam_api_client, "delete_task", lambda task_id: {"ok": True, "status": 204})
+
+    assert TestClient(app).delete("/api/connecteam/task/1").status_code == 200
+
+    index = task_index._memo[("tasks:all", snapshot_store.generation_key("tasks:all"))]
+    assert len(index) == 1
+    assert [row["title"] for row in index.select(None)] == ["Fix sink"]
+    assert index.select({"title": "mop"}) == []
+
+
+def test_concurrent_patches_all_land():
+    snapshot_store.save_snapshot("tasks:all", TASKS)
+
+    def add(task_id):
+        def patch(payload):
+            time.sleep(0.01)
+            return task_writes.patch_tasks(payload, "all", task_id, {"id": task_id, "status": "draft"})[0]
+        snapshot_store.patch_dataset("tasks:all", patch)
+
+    threads = [threading.Thread(target=add, args=(task_id,)) for task_id in range(3, 8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    tasks = snapshot_store.load_snapshot("tasks:all")["payload"]["data"]["tasks"]
+    assert sorted(t["id"] for t in tasks) == [1, 2, 3, 4, 5, 6, 7]
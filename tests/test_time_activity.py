@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import redis_layer, time_activity
+from services import connecteam_api_client
+
+# 2025-10-01 22:00 in Winnipeg is already 2025-10-02 03:00 UTC
+WINNIPEG_EVENING = 1759374000
+PAYLOAD = {"data": {"timeActivitiesByUsers": [
+    {"userId": 1, "shifts": [
+        {"id": "s1", "jobId": "j1", "isAutoClockOut": False,
+         "start": {"timestamp": WINNIPEG_EVENING, "timezone": "America/Winnipeg"},
+         "end": {"timestamp": WINNIPEG_EVENING + 3 * 3600, "timezone": "America/Winnipeg"}},
+        {"id": "s2", "jobId": "j2", "isAutoClockOut": True,
+         "start": {"timestamp": WINNIPEG_EVENING + 86400, "timezone": "America/Winnipeg"},
+         "end": {"timestamp": WINNIPEG_EVENING + 86400 + 5400, "timezone": "America/Winnipeg"}},
+    ]},
+    {"userId": 2, "shifts": [
+        {"id": "s3", "jobId": "j1",
+         "start": {"timestamp": WINNIPEG_EVENING, "timezone": "UTC"},
+         "end": {"timestamp": WINNIPEG_EVENING + 2 * 3600, "timezone": "UTC"}},
+        {"id": "s4", "jobId": "j1", "start": {"timestamp": WINNIPEG_EVENING + 7200, "timezone": "UTC"}},
+    ]},
+]}}
+
+
+def test_rollup_uses_local_day_of_each_shift():
+    rows = time_activity.rollup_records(time_activity.rollup(time_activity.shift_frame(PAYLOAD)))
+
+    by_key = {(row["day"], row["user_id"], row["job_id"]): row for row in rows}
+    assert by_key[("2025-10-01", 1, "j1")]["hours"] == 3.0
+    assert by_key[("2025-10-02", 1, "j2")]["auto_clock_outs"] == 1
+    assert by_key[("2025-10-02", 2, "j1")] == {"day": "2025-10-02", "user_id": 2, "job_id": "j1",
+                                               "hours": 2.0, "shifts": 2, "auto_clock_outs": 0, "open_shifts": 1}
+
+
+def test_summarize_groups_and_filters():
+    rows = time_activity.rollup_records(time_activity.rollup(time_activity.shift_frame(PAYLOAD)))
+
+    summary = time_activity.summarize(rows)
+    assert summary["totals"] == {"hours": 6.5, "shifts": 4, "users": 2, "jobs": 2, "days": 2,
+                                 "auto_clock_outs": 1, "open_shifts": 1}
+    assert [(u["user_id"], u["hours"], u["days"]) for u in summary["by_user"]] == [(1, 4.5, 2), (2, 2.0, 1)]
+    assert [(j["job_id"], j["users"]) for j in summary["by_job"]] == [("j1", 2), ("j2", 1)]
+
+    only_j1 = time_activity.summarize(rows, user_ids="1", job_ids=["j1"])
+    assert only_j1["totals"]["hours"] == 3.0
+    assert time_activity.summarize([], user_ids="1")["totals"]["shifts"] == 0
+
+
+def test_activity_route_returns_summary(monkeypatch):
+    calls = []
+
+    def fake_activity(startDate, endDate, time_clock_id=None):
+        calls.append((startDate, endDate))
+        return PAYLOAD
+
+    monkeypatch.setattr(connecteam_api_client, "get_time_activity", fake_activity)
+
+    r = TestClient(app).get("/api/connecteam/activity",
+                            params={"startDate": "2025-10-01", "endDate": "2025-10-02", "user_id": "2"})
+
+    assert r.status_code == 200
+    body = r.json()
+    assert calls == [("2025-09-29", "2025-10-05")]
+    assert body["totals"]["hours"] == 2.0 and body["by_day"][0]["day"] == "2025-10-02"
+
+
+def test_activity_route_rejects_bad_ranges():
+    client = TestClient(app)
+    assert client.get("/api/connecteam/activity", params={"startDate": "2025-10-05", "endDate": "2025-10-01"}).status_code == 400
+    assert client.get("/api/connecteam/activity", params={"startDate": "yesterday", "endDate": "2025-10-01"}).status_code == 400
+
+
+def test_bucket_ranges_align_to_weeks():
+    buckets = time_activity.bucket_ranges(datetime.date(2025, 10, 1), datetime.date(2025, 10, 8))
+    assert buckets == [(datetime.date(2025, 9, 29), datetime.date(2025, 10, 5)),
+                       (datetime.date(2025, 10, 6), datetime.date(2025, 10, 12))]
+    assert len(time_activity.bucket_ranges(datetime.date(2025, 10, 1), datetime.date(2025, 10, 3), "day")) == 3
+
+
+def test_bucket_ttl_keeps_closed_buckets():
+    today = datetime.date(2025, 10, 20)
+    assert time_activity.bucket_ttl(datetime.date(2025, 10, 12), today) is None
+    assert time_activity.bucket_ttl(datetime.date(2025, 10, 19), today) == time_activity.ACTIVITY_RECENT_TTL
+
+
+def test_load_shifts_fetches_only_missing_buckets_and_dedupes(monkeypatch):
+    store, ttls, calls = {}, {}, []
+
+    def fake_cache(name, payload, ttl=900):
+        store[name], ttls[name] = payload, ttl
+        return True
+
+    monkeypatch.setattr(redis_layer, "cache_dataset", fake_cache)
+    monkeypatch.setattr(redis_layer, "get_cached_dataset", lambda name: store.get(name))
+    monkeypatch.setattr(time_activity, "_today", lambda: datetime.date(2025, 10, 8))
+
+    def fetch(start, end):
+        calls.append((start, end))
+        # The vendor returns the overnight shift s1 for both weeks
+        return PAYLOAD
+
+    first = asyncio.run(time_activity.load_shifts("2025-09-29", "2025-10-05", fetch))
+    assert sorted(first["shift_id"]) == ["s1", "s2", "s3", "s4"]
+    assert calls == [("2025-09-29", "2025-10-05")]
+    assert ttls["activity:v2:2025-09-29:2025-10-05"] is None
+
+    calls.clear()
+    second = asyncio.run(time_activity.load_shifts("2025-10-01", "2025-10-08", fetch))
+    assert calls == [("2025-10-06", "2025-10-12")]
+    assert ttls["activity:v2:2025-10-06:2025-10-12"] == time_activity.ACTIVITY_RECENT_TTL
+    assert sorted(second["shift_id"]) == ["s1", "s2", "s3", "s4"]
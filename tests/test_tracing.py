@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from services.base_mcp_client import BaseMCPserver
+from utils import tracing
+
+
+def _enable_file_export(monkeypatch, tmp_path):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_FILE", str(trace_file))
+    exported = []
+    monkeypatch.setattr(tracing, "_start_exporter", lambda: None)
+    monkeypatch.setattr(tracing._export_queue, "put_nowait", exported.append)
+    return exported
+
+
+def test_spans_nest_across_to_thread(monkeypatch, tmp_path):
+    exported = _enable_file_export(monkeypatch, tmp_path)
+
+    @tracing.traced("worker")
+    def worker():
+        return tracing.current_traceparent()
+
+    async def handler():
+        with tracing.span("root"):
+            return await asyncio.to_thread(worker)
+
+    asyncio.run(handler())
+
+    by_name = {span["name"]: span for span in exported}
+    assert by_name["worker"]["parent_id"] == by_name["root"]["span_id"]
+    assert by_name["worker"]["trace_id"] == by_name["root"]["trace_id"]
+
+
+def test_request_continues_incoming_traceparent(monkeypatch, tmp_path):
+    exported = _enable_file_export(monkeypatch, tmp_path)
+    incoming = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+    r = TestClient(app).get("/", headers={"traceparent": incoming})
+
+    assert r.headers["X-Trace-Id"] == "0af7651916cd43dd8448eb211c80319c"
+    root = next(span for span in exported if span["name"] == "GET /")
+    assert root["parent_id"] == "b7ad6b7169203331"
+    assert root["attributes"]["http.status_code"] == 200
+
+
+def test_mcp_tool_call_is_a_child_of_the_callers_span(monkeypatch, tmp_path):
+    exported = _enable_file_export(monkeypatch, tmp_path)
+    server = SimpleNamespace(request=None)
+    server.get_context = lambda: SimpleNamespace(request_context=server.request)
+
+    @tracing.traced_tool(server)
+    def retrieve_leases():
+        with tracing.span("doorloop GET"):
+            return {"data": []}
+
+    class StubSession:
+        async def call_tool(self, name, arguments, meta=None):
+            # The server runs in another process: no span context, only the request _meta
+            server.request = SimpleNamespace(meta=SimpleNamespace(**(meta or {})))
+            return SimpleNamespace(content=contextvars.Context().run(retrieve_leases))
+
+    client = BaseMCPserver("doorloop", "mcp_server/doorloop_mcp_server.py")
+    client.session = StubSession()
+
+    async def handler():
+        with tracing.span("GET /api/doorloop/leases"):
+            return await client.call_tool("retrieve_leases", {})
+
+    assert asyncio.run(handler()) == {"result": {"data": []}}
+
+    by_name = {span["name"]: span for span in exported}
+    caller, tool = by_name["mcp doorloop.retrieve_leases"], by_name["tool retrieve_leases"]
+    assert tool["trace_id"] == caller["trace_id"] and tool["parent_id"] == caller["span_id"]
+    assert by_name["doorloop GET"]["parent_id"] == tool["span_id"]
+
+
+def test_file_export_writes_one_span_per_line(monkeypatch, tmp_path):
+    _enable_file_export(monkeypatch, tmp_path)
+    tracing.export([{"name": "x", "trace_id": "t", "span_id": "s"}])
+    assert json.loads((tmp_path / "traces.jsonl").read_text())["name"] == "x"
+
+
+def test_disabled_tracing_is_a_noop(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_FILE", None)
+    monkeypatch.setattr(tracing, "TRACE_OTLP_ENDPOINT", None)
+    with tracing.span("nothing") as span:
+        assert span.traceparent is None
@@ -0,0 +1,75 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from middle_layer import conneteam_bridge, user_directory
+from services import connecteam_api_client
+
+
+def _skill(*values):
+    return {"customFieldId": 7, "name": "Skills", "value": [{"id": i, "value": v} for i, v in enumerate(values)]}
+
+
+USERS = {"data": {"users": [
+    {"userId": 1, "firstName": "Ana", "lastName": "Diaz", "customFields": [_skill("Housekeeping", "Inspections")]},
+    {"userId": 2, "firstName": "Bo", "lastName": "Chen", "customFields": [_skill("Maintenance")]},
+    {"userId": 3, "firstName": "Cy", "lastName": "Ode", "isArchived": True, "customFields": [_skill("Housekeeping")]},
+    {"userId": 4, "firstName": "Di", "lastName": "Fox", "customFields": [{"name": "Notes", "value": "Driver"}]},
+]}}
+
+
+def test_directory_indexes_names_and_skill_tags():
+    directory = user_directory.UserDirectory(USERS)
+
+    assert len(directory) == 4
+    assert directory.name(1) == "Ana Diaz"
+    assert directory.name("2") == "Bo Chen"
+    assert directory.name(99) is None
+    assert [u["user_id"] for u in directory.with_skill("housekeeping")] == [1]
+    assert [u["user_id"] for u in directory.with_skill("Housekeeping", active_only=False)] == [1, 3]
+    assert directory.with_skill("Driver") == []
+    assert directory.profile(1) == {"firstname": "Ana", "lastname": "Diaz", "values": ["Housekeeping", "Inspections"]}
+    assert directory.profile(4)["values"] == []
+
+
+def test_list_all_users_crawls_pages(monkeypatch):
+    pages = [[{"userId": i} for i in range(100)], [{"userId": 100}]]
+    seen = []
+
+    def fake_page(limit=10, offset=0):
+        seen.append(offset)
+        return {"data": {"users": pages[offset // limit]}}
+
+    monkeypatch.setattr(connecteam_api_client, "retrieve_tenants", fake_page)
+
+    payload = connecteam_api_client.list_all_users(page_size=100)
+    assert seen == [0, 100]
+    assert len(payload["data"]["users"]) == 101
+
+
+def test_users_route_filters_by_skill():
+    user_directory._cache.reset(user_directory.UserDirectory(USERS))
+    client = TestClient(app)
+
+    r = client.get("/api/connecteam/users", params={"skill": "Housekeeping"})
+    assert r.status_code == 200
+    assert [u["name"] for u in r.json()] == ["Ana Diaz"]
+    assert len(client.get("/api/connecteam/users", params={"active": "false"}).json()) == 4
+
+
+def test_task_names_come_from_directory_before_get_user():
+    user_directory._cache.reset(user_directory.UserDirectory(USERS))
+    looked_up = []
+
+    def get_user(user_id):
+        looked_up.append(user_id)
+        return {"data": {"users": [{"firstName": "New", "lastName": "Hire"}]}}
+
+    tasks = {"data": {"tasks": [{"id": 1, "title": "Mop", "status": "published", "userIds": [1]},
+                                {"id": 2, "title": "Fix", "status": "published", "userIds": [42]}]}}
+    page = conneteam_bridge.get_task_page(tasks, get_user=get_user, get_people=user_directory.get_directory)
+
+    assert [row["user_name"] for row in page["data"]] == ["Ana Diaz", "New Hire"]
+    assert looked_up == [42]
+    assert conneteam_bridge.get_users(2, get_user, get_people=user_directory.get_directory) == [
+        {"firstname": "Bo", "lastname": "Chen", "values": ["Maintenance"]}
+    ]
@@ -0,0 +1,161 @@
+"""
+Non-blocking, sampled, structured logging.
+
+``configure_logging()`` puts a single QueueHandler on the root logger. Request
+threads and the event loop only enqueue records, and a QueueListener thread
+formats and writes them. So a slow stderr or log shipper never adds to
+request latency.
+
+Before a record is queued:
+- A per-call-site token bucket keeps chatty lines (a log call inside a
+  per-item loop) to LOG_SAMPLE_RATE records per second. The next record that
+  gets through reports how many were dropped in ``suppressed``. Warnings and
+  errors are never sampled.
+- The message is rendered from its ``%`` arguments, once, and only for
+  records that pass the level check and sampling.
+
+Output is one JSON object per line by default (LOG_FORMAT=text for plain
+lines). The object includes the trace id of the current span when tracing is
+on.
+
+    LOG_LEVEL=INFO  LOG_FORMAT=json  LOG_SAMPLE_RATE=20  LOG_SAMPLE_BURST=50
+"""
+import atexit
+import copy
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from utils import tracing
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Records per second allowed from one call site (0 disables sampling)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "20"))
+LOG_SAMPLE_BURST = float(os.getenv("LOG_SAMPLE_BURST", "50"))
+
+_listener = None
+_listener_lock = threading.Lock()
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+class SamplingFilter(logging.Filter):
+    """Token bucket per call site (file, line) for records below WARNING."""
+
+    def __init__(self, rate: float = None, burst: float = None):
+        super().__init__()
+        self.rate = LOG_SAMPLE_RATE if rate is None else rate
+        self.burst = LOG_SAMPLE_BURST if burst is None else burst
+        # (pathname, lineno) -> [tokens, last refill, suppressed since last emit]
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        site = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(site)
+            if bucket is None:
+                bucket = self._buckets[site] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that renders the message and captures the trace id in the calling thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        span = tracing.current_span()
+        if span is not None:
+            record.trace_id, record.span_id = span.trace_id, span.span_id
+        # The listener formats in another thread; drop what can't (or needn't) cross it
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName,
+        }
+        for key in ("trace_id", "span_id", "suppressed"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def _formatter(fmt: str) -> logging.Formatter:
+    return JsonFormatter() if fmt == "json" else logging.Formatter(_TEXT_FORMAT)
+
+
+def configure_logging(level: str = None, fmt: str = None, handler: logging.Handler = None):
+    """Route the root logger through a queue to `handler` (stderr by default). Idempotent."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+
+        output = handler or logging.StreamHandler()
+        output.setFormatter(_formatter((fmt or LOG_FORMAT).lower()))
+
+        log_queue = queue.Queue(-1)
+        queue_handler = ContextQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(queue_handler)
+        root.setLevel((level or LOG_LEVEL).upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            if isinstance(existing, ContextQueueHandler):
+                root.removeHandler(existing)
+        _listener = None
@@ -0,0 +1,118 @@
+"""
+Prometheus metrics shared by routes, upstream clients, caches and background jobs.
+
+prometheus_client is optional: without it every metric is a no-op and
+``/metrics`` reports that metrics are disabled, so instrumented code never has
+to check.
+"""
+import contextlib
+import logging
+import time
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+    METRICS_ENABLED = True
+except ImportError:
+    METRICS_ENABLED = False
+    CONTENT_TYPE_LATEST = "text/plain; charset=utf-8"
+
+    class _NoopMetric:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def labels(self, *args, **kwargs):
+            return self
+
+        def inc(self, amount=1):
+            pass
+
+        def dec(self, amount=1):
+            pass
+
+        def set(self, value):
+            pass
+
+        def observe(self, value):
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric
+
+    def generate_latest(registry=None):
+        return b"# prometheus_client is not installed; metrics are disabled\n"
+
+    logging.info("prometheus_client not installed; metrics are disabled")
+
+# Vendor APIs respond in tens of ms to tens of seconds (full crawls)
+_LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+_SIZE_BUCKETS = (512, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Latency of API routes",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS)
+
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "upstream_request_duration_seconds", "Latency of vendor API calls",
+    ["vendor", "method", "status"], buckets=_LATENCY_BUCKETS)
+UPSTREAM_RESPONSE_BYTES = Histogram(
+    "upstream_response_bytes", "Size of vendor API response bodies",
+    ["vendor"], buckets=_SIZE_BUCKETS)
+UPSTREAM_RETRIES = Counter(
+    "upstream_retries_total", "Vendor API calls retried by the HTTP adapter", ["vendor"])
+UPSTREAM_ERRORS = Counter(
+    "upstream_errors_total", "Vendor API calls that failed without a response", ["vendor", "error"])
+UPSTREAM_THROTTLE_SECONDS = Histogram(
+    "upstream_throttle_wait_seconds", "Time vendor API calls waited for the client-side rate limiter",
+    ["vendor"], buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by key family and result (hit, miss, stale)",
+    ["family", "result"])
+
+MCP_SESSIONS = Gauge(
+    "mcp_sessions", "MCP stdio sessions by server and state (open, connecting)", ["server", "state"])
+MCP_TOOL_SECONDS = Histogram(
+    "mcp_tool_call_duration_seconds", "Latency of MCP tool calls",
+    ["server", "tool", "outcome"], buckets=_LATENCY_BUCKETS)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight", "Requests admitted and running, by route class", ["route_class"])
+ADMISSION_QUEUED = Gauge(
+    "admission_queued", "Requests waiting for a slot, by route class", ["route_class"])
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_queue_wait_seconds", "Time requests waited for a slot", ["route_class"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+ADMISSION_SHED = Counter(
+    "admission_shed_total", "Requests rejected with 503 by admission control",
+    ["route_class", "reason"])
+
+REFRESH_SECONDS = Histogram(
+    "background_refresh_duration_seconds", "Duration of background refresh / sync jobs",
+    ["job", "outcome"], buckets=_LATENCY_BUCKETS)
+
+
+def cache_family(key: str) -> str:
+    """Key family for labels: ``tasks:all:0:100`` -> ``tasks`` (keeps label cardinality bounded)."""
+    return str(key).split(":", 1)[0] or "unknown"
+
+
+def record_cache(key: str, result: str):
+    CACHE_REQUESTS.labels(family=cache_family(key), result=result).inc()
+
+
+@contextlib.contextmanager
+def time_refresh(job: str):
+    """Time a background refresh/sync job into REFRESH_SECONDS, labelled by outcome."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        REFRESH_SECONDS.labels(job=job, outcome=outcome).observe(time.perf_counter() - started)
+
+
+def render():
+    """Body and content type for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,290 @@
+"""
+Lightweight OpenTelemetry-style tracing for request waterfalls.
+
+Spans form a tree through a ``contextvars`` context, so the current span
+follows the request across ``await`` and into ``asyncio.to_thread`` workers.
+Trace ids use the W3C ``traceparent`` format. That is how a trace continues
+from an incoming request header and into MCP servers (each tool call carries
+the caller's ``traceparent`` in its request ``_meta``, see ``traced_tool``).
+
+Tracing is off unless an exporter is configured:
+
+    TRACE_FILE=/path/traces.jsonl          one JSON span per line
+    TRACE_OTLP_ENDPOINT=http://host:4318   OTLP/HTTP JSON to a collector
+    TRACE_SLOW_MS=500                      only export traces whose root took >= 500 ms
+
+When it is off, ``span()`` and ``traced()`` cost a context-var lookup.
+"""
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT")
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "microservices-backend")
+EXPORT_INTERVAL_SECONDS = 5
+# Traces with spans still waiting for their root; oldest are dropped past this
+MAX_PENDING_TRACES = 1000
+
+_current = contextvars.ContextVar("trace_span", default=None)
+
+_export_queue = queue.Queue(maxsize=10000)
+_exporter_started = False
+_exporter_lock = threading.Lock()
+# trace id -> finished spans, held until the local root span ends
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(TRACE_FILE or TRACE_OTLP_ENDPOINT)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "is_local_root", "start", "end",
+                 "attributes", "status", "error")
+
+    def __init__(self, name, trace_id, parent_id, is_local_root, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.is_local_root = is_local_root
+        self.start = time.time()
+        self.end = None
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "service": SERVICE_NAME,
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    traceparent = None
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def parse_traceparent(header: str):
+    """(trace_id, parent span id) from a W3C traceparent header, or None if invalid."""
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32:
+        return None
+    return parts[1], parts[2]
+
+
+@contextlib.contextmanager
+def span(name: str, traceparent: str = None, **attributes):
+    """Record a span around the block; child of the current span, or of `traceparent` if given."""
+    if not enabled():
+        yield _NOOP
+        return
+
+    parent = _current.get()
+    remote = parse_traceparent(traceparent) if traceparent else None
+    if remote:
+        trace_id, parent_id, is_local_root = remote[0], remote[1], True
+    elif parent is not None:
+        trace_id, parent_id, is_local_root = parent.trace_id, parent.span_id, False
+    else:
+        trace_id, parent_id, is_local_root = secrets.token_hex(16), None, True
+
+    current = Span(name, trace_id, parent_id, is_local_root, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current.end = time.time()
+        _current.reset(token)
+        _finish(current)
+
+
+def traced(name: str = None, **attributes):
+    """Decorator form of span() for sync and async functions (name defaults to module.function)."""
+    def decorator(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span():
+    return _current.get()
+
+
+def current_traceparent():
+    current = _current.get()
+    return current.traceparent if current is not None else None
+
+
+def request_traceparent(server):
+    """The ``traceparent`` the caller put in the ``_meta`` of the MCP request `server` is handling."""
+    try:
+        meta = server.get_context().request_context.meta
+    except (LookupError, ValueError):
+        # Not inside a request
+        return None
+    return getattr(meta, "traceparent", None)
+
+
+def traced_tool(server, name: str = None):
+    """Decorator for the tool handlers of MCP `server`: one span per call, parented on the caller's span.
+
+    Place it under ``@mcp.tool()``. The parent comes from each request's
+    ``_meta`` (see services/base_mcp_client.py), so a long-lived server process
+    joins the trace of whichever request called it.
+    """
+    def decorator(func):
+        span_name = name or f"tool {func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, traceparent=request_traceparent(server), **{"mcp.tool": func.__name__}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _finish(finished: Span):
+    """Hold spans until their local root ends, then export the trace if it was slow enough."""
+    with _pending_lock:
+        if finished.trace_id not in _pending and len(_pending) >= MAX_PENDING_TRACES:
+            # Spans that outlived their root (e.g. abandoned worker threads) never flush
+            _pending.pop(next(iter(_pending)))
+        spans = _pending.setdefault(finished.trace_id, [])
+        spans.append(finished)
+        if not finished.is_local_root:
+            return
+        spans = _pending.pop(finished.trace_id)
+
+    if (finished.end - finished.start) * 1000 < TRACE_SLOW_MS:
+        return
+    _start_exporter()
+    for item in spans:
+        try:
+            _export_queue.put_nowait(item.to_dict())
+        except queue.Full:
+            logging.warning("Trace export queue full; dropping spans")
+            break
+
+
+def _start_exporter():
+    global _exporter_started
+    if _exporter_started:
+        return
+    with _exporter_lock:
+        if _exporter_started:
+            return
+
+        def export_loop():
+            while True:
+                batch = [_export_queue.get()]
+                deadline = time.time() + EXPORT_INTERVAL_SECONDS
+                while time.time() < deadline and len(batch) < 512:
+                    try:
+                        batch.append(_export_queue.get(timeout=max(0.0, deadline - time.time())))
+                    except queue.Empty:
+                        break
+                try:
+                    export(batch)
+                except Exception:
+                    logging.exception("Trace export failed")
+
+        # Daemon thread so it doesn't block app shutdown
+        threading.Thread(target=export_loop, daemon=True).start()
+        _exporter_started = True
+
+
+def export(spans: list):
+    """Write finished spans to the configured exporters."""
+    if TRACE_FILE:
+        with open(TRACE_FILE, "a", encoding="utf-8") as fh:
+            for item in spans:
+                fh.write(json.dumps(item, default=str) + "\n")
+    if TRACE_OTLP_ENDPOINT:
+        import requests
+        requests.post(f"{TRACE_OTLP_ENDPOINT.rstrip('/')}/v1/traces", json=_otlp_payload(spans), timeout=5)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(spans: list) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": "utils.tracing"},
+            "spans": [{
+                "traceId": item["trace_id"],
+                "spanId": item["span_id"],
+                "parentSpanId": item["parent_id"] or "",
+                "name": item["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(int(item["start"] * 1e9)),
+                "endTimeUnixNano": str(int(item["end"] * 1e9)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in item["attributes"].items()],
+                "status": {"code": 2, "message": item["error"]} if item["status"] == "error" else {"code": 1},
+            } for item in spans],
+        }],
+    }]}